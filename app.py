@@ -1,19 +1,44 @@
 # app.py
 import os
+import json
+import queue
 import random
-import requests
-from flask import Flask, render_template, jsonify, request, url_for, app
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, render_template, jsonify, request, send_file, url_for, redirect, app
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
 from flask_cors import CORS
-import boto3
 
 import config
+import catalog
+import metrics
+import quiz_pool
+import pixabay_cache
+import game_jobs
+import http_client
+import gen_executor
+import gemini_clients
+import singleflight
+import replenisher
+import variants
+import image_service
+import image_utils
+import storage
+import packfile
+import urls
 from config import Config
 from auth import auth_bp
 from extensions import mongo
 from datetime import datetime
 from ranking import get_ranking_data
-from crawling import generate_images_concurrent
+from crawling import generate_images_concurrent, get_upload_stage
+import crawling_async
+from categories import (
+    CATEGORY_CONFIG, LEGACY_CATEGORY_MAP, get_category_info, get_ai_prompts_for_category,
+    get_fixed_category_queries
+)
 from dotenv import load_dotenv
 import logging
 
@@ -24,145 +49,254 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 PIXABAY_API_KEY = os.getenv("PIXABAY_API_KEY")
 
-# S3 클라이언트 설정
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=Config.aws_access_key,
-    aws_secret_access_key=Config.aws_secret_key,
-    region_name=Config.region_name
-)
-S3_BUCKET_NAME = Config.bucket_name
-
-# 개선된 카테고리 매핑 시스템
-CATEGORY_CONFIG = {
-    "cat": {
-        "ko": "고양이",
-        "en": "cat",
-        "search_query": "cat",
-        "image": "cat.jpg"
-    },
-    "icecream": {
-        "ko": "아이스크림",
-        "en": "icecream",
-        "search_query": "icecream",
-        "image": "icecream.jpg"
-    },
-    "rose": {
-        "ko": "장미",
-        "en": "rose",
-        "search_query": "rose",
-        "image": "rose.jpg"
-    },
-    "fruit": {
-        "ko": "과일",
-        "en": "fruit",
-        "search_query": "fruit",
-        "image": "fruits.jpg"
-    },
-    "random": {
-        "ko": "랜덤",
-        "en": "random",
-        "search_query": "random",
-        "image": "random.jpg"
-    },
-    "custom": {
-        "ko": "나만퀴(나만의 퀴즈 만들기)",
-        "en": "custom",
-        "search_query": "custom",
-        "image": "question.png"
-    }
-}
-
-# 하위 호환성을 위한 기존 매핑 (한글 키 -> 영어 키)
-LEGACY_CATEGORY_MAP = {v["ko"]: k for k, v in CATEGORY_CONFIG.items()}
-
-# API에서 한글/영어 키를 모두 지원하는 헬퍼 함수
-def get_category_info(category_input):
-    """카테고리 입력(한글/영어)을 받아서 표준화된 정보를 반환"""
-    # 영어 키로 직접 조회 시도
-    if category_input in CATEGORY_CONFIG:
-        return category_input, CATEGORY_CONFIG[category_input]
-
-    # 한글 키로 조회 (하위 호환성)
-    english_key = LEGACY_CATEGORY_MAP.get(category_input)
-    if english_key:
-        return english_key, CATEGORY_CONFIG[english_key]
-
-    return None, None
-
-def get_ai_prompts_for_category(category):
-    """카테고리별 AI 이미지 생성 프롬프트 반환"""
-    prompts_map = {
-        "cat": [
-            "Photorealistic sunrise rooftop shot of a tabby cat sitting on a warm metal railing, 35mm, f/2.0, ISO 200, 1/800s, golden rim light, gentle haze, center big gemini watermark.",
-            "Photorealistic cat peeking out of a cardboard box on a living room floor, 50mm, f/1.8, ISO 400, 1/250s, side window light, soft bokeh, center big gemini watermark.",
-            "Photorealistic reflection of a black cat in a wall mirror, 35mm, f/2.2, ISO 800, 1/125s, tungsten lamp mixed with daylight, handheld, center big gemini watermark.",
-            "Photorealistic alley scene with a ginger cat near a puddle after rain, 28mm, f/2.8, ISO 320, 1/500s, overcast sky, subtle reflections, center big gemini watermark.",
-            "Photorealistic close-up of a cat's collar tag and fur texture, 85mm, f/2.8, ISO 200, 1/400s, diffused daylight, high micro-contrast, center big gemini watermark.",
-            "Photorealistic candid through houseplants showing a cat on a windowsill, 50mm, f/2.0, ISO 320, 1/250s, backlit greenery bokeh, center big gemini watermark.",
-            "Photorealistic top-down shot of a white cat lounging on tatami mat, 35mm, f/2.8, ISO 200, 1/160s, soft ambient light, natural colors, center big gemini watermark.",
-            "Photorealistic cat curled beside a space heater glow, 35mm, f/1.8, ISO 1600, 1/100s, warm white balance, slight grain, center big gemini watermark.",
-            "Photorealistic maine coon cat stretching on wooden deck at sunset, 85mm, f/2.0, ISO 100, 1/1000s, warm golden hour lighting, center big gemini watermark.",
-            "Photorealistic persian cat sleeping in a sunbeam through lace curtains, 50mm, f/1.4, ISO 200, 1/500s, soft diffused light, dreamy bokeh, center big gemini watermark."
-        ],
-        "icecream": [
-            "Photorealistic cafe window seat shot of a strawberry sundae with condensation on the glass, 50mm, f/2.2, ISO 200, 1/250s, side window light, center big gemini watermark.",
-            "Photorealistic close-up of soft-serve swirling out of a machine into a cone, 70mm, f/4, ISO 400, 1/500s, clean stainless backdrop, motion freeze, center big gemini watermark.",
-            "Photorealistic child's hands holding a chocolate-dipped cone at a park, 35mm, f/2.0, ISO 100, 1/1000s, bright daylight, gentle background blur, center big gemini watermark.",
-            "Photorealistic macro detail of waffle cone texture with tiny sugar crystals, 100mm macro, f/5.6, ISO 200, 1/200s, softbox bounce, center big gemini watermark.",
-            "Photorealistic two friends clinking ice cream cones on a city street, 28mm, f/2.8, ISO 400, 1/800s, late afternoon sun, lively bokeh, center big gemini watermark.",
-            "Photorealistic car interior shot of a vanilla cone near the dashboard, 35mm, f/2.2, ISO 800, 1/160s, mixed lighting, natural reflections, center big gemini watermark.",
-            "Photorealistic evening street festival with a mango sorbet cup under string lights, 50mm, f/1.8, ISO 2000, 1/200s, warm bokeh, handheld, center big gemini watermark.",
-            "Photorealistic freezer door opening with frost swirl and a pistachio pint visible, 24mm, f/3.5, ISO 1600, 1/60s, cool white balance, center big gemini watermark.",
-            "Photorealistic gelato display case with colorful scoops under warm display lights, 35mm, f/2.8, ISO 800, 1/125s, commercial lighting, center big gemini watermark.",
-            "Photorealistic melting ice cream on hot pavement creating a colorful puddle, 50mm, f/4, ISO 100, 1/2000s, harsh midday sun, high contrast, center big gemini watermark."
-        ],
-        "rose": [
-            "Photorealistic florist's cooler seen through fogged glass with red and white roses, 35mm, f/2.8, ISO 800, 1/125s, cool lighting, condensation detail, center big gemini watermark.",
-            "Photorealistic dried rose on linen fabric beside a window, 50mm, f/2.0, ISO 200, 1/200s, soft morning light, gentle shadows, center big gemini watermark.",
-            "Photorealistic rose silhouette projected on a wall by direct sunlight, 35mm, f/4, ISO 100, 1/2000s, strong contrast, crisp edges, center big gemini watermark.",
-            "Photorealistic candlelit macro of rose stamens and inner petals, 105mm macro, f/3.5, ISO 1600, 1/60s, warm flicker, handheld, center big gemini watermark.",
-            "Photorealistic rose crown woven into hair at an outdoor garden, 85mm, f/2.0, ISO 200, 1/640s, backlit strands, natural color, center big gemini watermark.",
-            "Photorealistic scattered rose petals on a marble staircase, 28mm, f/2.8, ISO 400, 1/250s, side light, subtle specular highlights, center big gemini watermark.",
-            "Photorealistic single yellow rose under a glass cloche on a wooden desk, 50mm, f/2.5, ISO 320, 1/160s, soft desk lamp, reflections controlled, center big gemini watermark.",
-            "Photorealistic raindrops sliding on a rose leaf with sharp vein detail, 100mm macro, f/5.6, ISO 400, 1/200s, overcast daylight, center big gemini watermark.",
-            "Photorealistic vintage rose bouquet in antique crystal vase, 85mm, f/2.8, ISO 200, 1/320s, window light with lace shadows, center big gemini watermark.",
-            "Photorealistic wild rose bush growing against old brick wall, 35mm, f/4, ISO 100, 1/1000s, natural outdoor lighting, textural detail, center big gemini watermark."
-        ],
-        "fruit": [
-            "Photorealistic breakfast counter with a bowl of berries and yogurt, 35mm, f/2.8, ISO 200, 1/200s, side window light, natural tones, center big gemini watermark.",
-            "Photorealistic pouring smoothie into a glass with banana and spinach beside, 50mm, f/3.2, ISO 400, 1/500s, motion freeze, kitchen light, center big gemini watermark.",
-            "Photorealistic apple picking in an orchard with sunlit leaves, 35mm, f/2.0, ISO 200, 1/1000s, backlit flare, candid hands, center big gemini watermark.",
-            "Photorealistic analog scale with a crate of oranges on a market counter, 28mm, f/4, ISO 400, 1/160s, ambient indoor light, center big gemini watermark.",
-            "Photorealistic picnic bench with a freshly cut watermelon wedge, 35mm, f/2.8, ISO 100, 1/640s, bright midday sun, crisp texture, center big gemini watermark.",
-            "Photorealistic fig cross-section on a ceramic plate, 85mm, f/4, ISO 200, 1/200s, window side-light, rich seeds detail, center big gemini watermark.",
-            "Photorealistic grapes on the vine with translucent backlight, 70mm, f/2.8, ISO 100, 1/1000s, vineyard ambience, center big gemini watermark.",
-            "Photorealistic stainless bowl reflection with assorted fruits on a counter, 24mm, f/3.5, ISO 800, 1/60s, cool kitchen light, subtle reflections, center big gemini watermark.",
-            "Photorealistic farmers market display of colorful seasonal fruits, 35mm, f/4, ISO 200, 1/500s, natural outdoor lighting, vibrant colors, center big gemini watermark.",
-            "Photorealistic tropical fruit salad in coconut bowl on beach sand, 50mm, f/2.8, ISO 100, 1/1000s, bright beach lighting, shallow depth of field, center big gemini watermark."
-        ],
+# 이미지 저장소 (STORAGE_BACKEND: S3 또는 로컬 디스크)
+image_storage = storage.get_storage()
+
+
+def image_url(key):
+    """이미지 키의 URL (팩 파일/CDN 호스트/버전 토큰/서명은 urls 설정을 따름)."""
+    return urls.build(key)
+
+
+# 즉석 썸네일 변환 동시 실행 상한 (이미지 처리 프로세스 풀을 한 요청 종류가 독점하지 않도록)
+_thumbnail_slots = threading.BoundedSemaphore(Config.IMAGE_SERVICE_PROCESSES * 2)
+
+# prepare_game의 짧은 I/O 단계(Pixabay/카탈로그 조회)를 요청 스레드와 동시에 실행하기 위한 공용 스레드 풀.
+# AI 이미지 생성처럼 오래 걸리는 작업은 넣지 않습니다 (몇 건의 생성이 워커를 모두 점유해 다른 요청이 밀리지 않도록).
+_stage_executor = ThreadPoolExecutor(max_workers=Config.QUIZ_STAGE_WORKERS, thread_name_prefix="quiz-stage")
+
+# 카테고리 설정/프롬프트는 categories.py에서 관리합니다.
+
+class QuizBuildError(Exception):
+    """퀴즈 세트를 만들 수 없을 때 발생. status는 API 응답 코드로 사용됩니다."""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def resolve_search_query(category_input, keyword=''):
+    """
+    카테고리 입력과 키워드로 (category_key, search_query)를 결정합니다.
+    '랜덤'은 고정 카테고리 중 하나를, '나만퀴'는 정규화한 키워드(대소문자/공백 통일)를 검색어로 사용합니다.
+    """
+    if not category_input:
+        raise QuizBuildError('카테고리 정보가 없습니다.', 400)
+
+    category_key, category_info = get_category_info(category_input)
+    if not category_key:
+        raise QuizBuildError(f"'{category_input}'에 대한 카테고리를 찾을 수 없습니다.", 404)
+
+    # '랜덤', '나만퀴' 모드에 따른 검색어 설정
+    if category_key == 'random':
+        available_categories = [k for k in CATEGORY_CONFIG.keys() if k not in ['random', 'custom']]
+        selected_category_key = random.choice(available_categories)
+        return category_key, CATEGORY_CONFIG[selected_category_key]['search_query']
+    if category_key == 'custom':
+        if not keyword:
+            raise QuizBuildError('나만퀴 모드에서는 키워드가 필요합니다.', 400)
+        # 생성 중복 방지 키, 카탈로그 카테고리, 퀴즈 풀이 모두 같은 값을 쓰도록 여기서 한 번만 정규화합니다.
+        return category_key, singleflight.normalize_key(keyword)
+    return category_key, category_info['search_query']
+
+
+def _run_stage(name, search_query, fn, *args, **kwargs):
+    """파이프라인 단계 하나를 실행하고 소요 시간을 로그/메트릭으로 남깁니다."""
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.observe(f"prepare_game.stage.{name}_ms", elapsed_ms)
+        logger.info(f"[stage] {search_query} {name}: {elapsed_ms:.0f}ms")
+
+
+def _fetch_real_image_urls(search_query):
+    """Pixabay 실제 이미지 URL 목록 (TTL 캐시 경유, 오래된 값은 백그라운드 갱신)."""
+    pixabay_hits = pixabay_cache.search(search_query, image_type='photo', per_page=50)
+    return [hit['largeImageURL'] for hit in pixabay_hits]
+
+
+def _collect_ai_image_keys(search_query, target=10):
+    """카탈로그에서 AI 이미지를 고르고, target장 미만이면 부족한 만큼만 생성합니다."""
+    # 1. 카탈로그에서 기존 이미지 선택 (S3 목록 조회 대신 인덱스 쿼리 1회)
+    ai_image_paths = _run_stage("catalog", search_query, catalog.sample_image_keys, search_query, target)
+
+    # 2. 이미지가 target장 미만이면 부족한 만큼만 생성
+    num_images_needed = target - len(ai_image_paths)
+    if num_images_needed > 0:
+        new_paths = _run_stage("generate", search_query, generate_missing_images, search_query, num_images_needed)
+        if new_paths is None:
+            # 다른 프로세스가 생성을 마쳤으므로 카탈로그를 다시 조회합니다.
+            ai_image_paths = catalog.sample_image_keys(search_query, target)
+        else:
+            ai_image_paths.extend(new_paths)
+    return ai_image_paths
+
+
+def generate_missing_images(search_query, num_images_needed, on_complete=None):
+    """
+    부족한 AI 이미지를 생성합니다. 같은 검색어로 이미 진행 중인 생성이 있으면 새로 시작하지 않고
+    그 생성에 합류해 결과를 함께 씁니다 (single-flight).
+    반환: 새로 생성된 S3 키 목록. 다른 프로세스의 생성을 기다린 경우 None (카탈로그 재조회 필요)
+    """
+    # 합류한 호출자가 같은 카테고리로 카탈로그를 다시 조회하도록, 생성 키와 카테고리를 같은 정규화 값으로 씁니다.
+    search_query = singleflight.normalize_key(search_query)
+
+    def run():
+        logger.info(f"{search_query}: S3에 이미지가 부족하여 {num_images_needed}장 추가 생성 시작")
+        ai_prompts = get_ai_prompts_for_category(search_query)
+
+        # 부족한 수 만큼만 프롬프트를 선택하여 생성 요청
+        if Config.GENERATION_BACKEND == 'async':
+            generate = crawling_async.generate_images_concurrent_sync
+        else:
+            generate = generate_images_concurrent
+        return generate(
+            prompts=random.sample(ai_prompts, k=min(num_images_needed, len(ai_prompts))),
+            category=search_query,
+            repeat_per_prompt=1,
+            max_workers=10,
+            on_complete=on_complete,
+            limit=num_images_needed
+        )
+
+    new_image_results = singleflight.get_flight().do(search_query, run)
+    if new_image_results is None:
+        return None
+    return [path for paths in new_image_results.values() for path in paths]
+
+
+def build_quiz_sets(search_query, difficulty):
+    """
+    검색어와 난이도로 퀴즈 세트(quizSets)를 만듭니다.
+    Pixabay 실제 이미지 조회는 공용 스테이지 풀에서, AI 이미지 준비(카탈로그 조회 -> 부족 시 생성)는
+    요청 스레드에서 동시에 진행하므로 전체 지연은 두 단계의 합이 아니라 더 느린 쪽에 가깝습니다.
+    """
+    start = time.perf_counter()
+
+    real_future = _stage_executor.submit(_run_stage, "pixabay", search_query, _fetch_real_image_urls, search_query)
+    ai_image_paths = _collect_ai_image_keys(search_query)
+    real_image_urls = real_future.result()
+    logger.info(f"[stage] {search_query} io_total: {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    # 최종적으로 이미지가 최소 요구치(6장) 미만이면 에러
+    min_required = 6
+    if len(ai_image_paths) < min_required:
+        raise QuizBuildError(f'AI 이미지 생성 부족 (생성: {len(ai_image_paths)}장, 최소: {min_required}장)', 500)
+
+    # --- 퀴즈 생성 로직 ---
+
+    # 퀴즈 생성
+    images_per_question = 6 if difficulty == 'hard' else 2
+    max_questions = min(10, len(ai_image_paths))
+    num_real_images_needed = (images_per_question - 1) * max_questions
+
+    if len(real_image_urls) < num_real_images_needed:
+        raise QuizBuildError('퀴즈 생성을 위한 실제 이미지가 부족합니다.', 409)
+
+    unique_real_images = random.sample(real_image_urls, num_real_images_needed)
+
+    quiz_sets = []
+    # AI 이미지를 10장 이상 생성되었더라도 10문제만 출제하도록 세어서 10장만 사용
+    selected_ai_images = random.sample(ai_image_paths, max_questions)
+    # 난이도(그리드 크기)에 맞는 크기의 변형본으로 교체 (없으면 원본)
+    selected_ai_images = variants.resolve_keys(selected_ai_images, difficulty)
+    # URL은 한 번에 만들어 서명이 필요한 경우 묶어서 처리
+    ai_image_urls = urls.build_many(selected_ai_images)
+
+    for i in range(max_questions):
+
+        real_images_for_question = unique_real_images[
+                                   i * (images_per_question - 1): (i + 1) * (images_per_question - 1)]
+
+        # 이미지 URL 목록 생성 (AI 이미지는 전체 URL로 변환)
+        quiz_sets.append(make_question(ai_image_urls[i], real_images_for_question))
+
+    return quiz_sets
+
+
+def make_question(ai_image_url, real_image_urls):
+    """AI 이미지 1장과 실제 이미지들을 섞어 문제 하나를 만듭니다."""
+    question_images = [ai_image_url] + list(real_image_urls)
+    random.shuffle(question_images)
+    return {
+        'images': question_images,
+        'correctAnswer': question_images.index(ai_image_url)
     }
 
-    custom_prompts = [
-        f"A lifelike {category} in a real park, trees swaying gently in the wind, candid composition",
-        f"A beautiful {category} under warm golden-hour sunlight, soft rim light, cinematic composition",
-        f"A realistic scene with a person naturally interacting with a {category}, captured in ultra-high-resolution with cinematic lighting and a professional lens.",
-        f"photographed in a workshop, believable wear and fingerprints",
-        f"A vintage {category} styled with authentic 19th-century props and wardrobe, film-like grain and slight halation",
-        f"A levitation shot of {category} captured with a clean background and believable physics (subtle motion blur)",
-        f"A hyper-realistic documentary photo featuring a person interacting with or representing '{category}', natural pose and expression",
-        f"A studio still-life of objects that embody '{category}', seamless backdrop, softbox lighting, crisp detail",
-        f"A detailed macro photo of textures linked to '{category}', shallow depth of field, tactile realism",
-        f"A sweeping landscape where '{category}' is the clear focal element, layered depth and atmospheric perspective",
-        f"A candid street-photography scene that naturally includes '{category}', off-guard moment, believable context",
-        f"A night scene centered on '{category}' with practical light sources (neon, streetlamps), controlled noise",
-        f"An editorial portrait that symbolizes '{category}', thoughtful styling and location, authentic skin texture"
-    ]
-
-    if category in ["cat", "icecream", "rose", "fruit"]:
-        return prompts_map.get(category, prompts_map["cat"])
+
+def stream_quiz_sets(search_query, difficulty, max_questions=10, min_required=6):
+    """
+    퀴즈 문제를 준비되는 대로 하나씩 내보내는 제너레이터. (event, data) 튜플을 yield 합니다.
+    - 'start': 예상 문제 수
+    - 'question': 문제 1개 (카탈로그에 있는 이미지는 즉시, 새로 생성하는 이미지는 완성되는 순서대로)
+    - 'done' / 'error': 스트림 종료
+    """
+    images_per_question = 6 if difficulty == 'hard' else 2
+
+    # 실제 이미지(오답 보기)와 카탈로그 이미지를 동시에 조회합니다.
+    real_future = _stage_executor.submit(_run_stage, "pixabay", search_query, _fetch_real_image_urls, search_query)
+    catalog_future = _stage_executor.submit(
+        _run_stage, "catalog", search_query, catalog.sample_image_keys, search_query, max_questions
+    )
+    real_image_urls = real_future.result()
+    num_real_images_needed = (images_per_question - 1) * max_questions
+    if len(real_image_urls) < num_real_images_needed:
+        raise QuizBuildError('퀴즈 생성을 위한 실제 이미지가 부족합니다.', 409)
+    unique_real_images = random.sample(real_image_urls, num_real_images_needed)
+
+    ready_keys = queue.Queue()
+    queued = set(catalog_future.result())
+    for key in queued:
+        ready_keys.put(key)
+
+    num_images_needed = max_questions - len(queued)
+    if num_images_needed > 0:
+        def enqueue(paths):
+            for path in paths:
+                if path not in queued:
+                    queued.add(path)
+                    ready_keys.put(path)
+
+        def generate():
+            try:
+                # 생성을 직접 실행하면 완료되는 순서대로, 다른 요청의 생성에 합류했다면 끝난 뒤 한꺼번에 받습니다.
+                new_paths = generate_missing_images(
+                    search_query, num_images_needed, on_complete=lambda prompt, paths: enqueue(paths)
+                )
+                if new_paths is None:
+                    new_paths = catalog.sample_image_keys(search_query, max_questions)
+                enqueue(new_paths)
+            except Exception as e:
+                logger.error(f"스트리밍 이미지 생성 중 오류: {e}")
+            finally:
+                ready_keys.put(None)
+
+        threading.Thread(target=generate, name="stream-generate", daemon=True).start()
+    else:
+        ready_keys.put(None)
+
+    yield 'start', {'totalQuestions': max_questions}
+
+    emitted = 0
+    while emitted < max_questions:
+        key = ready_keys.get()
+        if key is None:
+            break
+        real_images_for_question = unique_real_images[
+                                   emitted * (images_per_question - 1): (emitted + 1) * (images_per_question - 1)]
+        key = variants.resolve_keys([key], difficulty)[0]
+        question = make_question(image_url(key), real_images_for_question)
+        yield 'question', dict(question, index=emitted)
+        emitted += 1
+
+    if emitted < min_required:
+        yield 'error', {'message': f'AI 이미지 생성 부족 (생성: {emitted}장, 최소: {min_required}장)'}
     else:
-        return custom_prompts
+        yield 'done', {'totalQuestions': emitted}
+
 
 def create_app():
     app = Flask(__name__)
@@ -173,6 +307,31 @@ def create_app():
     CORS(app)
     app.register_blueprint(auth_bp, url_prefix='/auth')
 
+    # 퀴즈 풀 백그라운드 빌더 (고정 카테고리 x 난이도)
+    pool_builder = None
+    if app.config.get('QUIZ_POOL_ENABLED'):
+        pool_pairs = [
+            (query, difficulty)
+            for query in get_fixed_category_queries()
+            for difficulty in quiz_pool.DIFFICULTIES
+        ]
+        pool_builder = quiz_pool.QuizPoolBuilder(
+            build_fn=build_quiz_sets,
+            pairs=pool_pairs,
+            low_watermark=app.config['QUIZ_POOL_LOW_WATERMARK'],
+            high_watermark=app.config['QUIZ_POOL_HIGH_WATERMARK'],
+            interval=app.config['QUIZ_POOL_INTERVAL'],
+            lease_ttl=app.config['QUIZ_POOL_LEASE_TTL'],
+        )
+        pool_builder.start()
+
+    # 고정 카테고리 Pixabay 검색 결과를 미리 캐시에 채워둡니다.
+    threading.Thread(target=pixabay_cache.get_cache().warm, args=(get_fixed_category_queries(),), daemon=True).start()
+
+    # 카테고리/인기 키워드 이미지 풀 백그라운드 보충기 (단독 실행: python crawling.py replenish)
+    if app.config.get('REPLENISHER_ENABLED'):
+        replenisher.from_config().start()
+
     # --- 페이지 렌더링 라우트 ---
     @app.route('/')
     def index():
@@ -202,112 +361,34 @@ def create_app():
     def result():
         return render_template('result.html')
 
+    def prepare_quiz_sets(category_key, search_query, difficulty):
+        """고정 카테고리는 퀴즈 풀에서 먼저 꺼내고, 풀이 비어 있으면 인라인으로 생성합니다."""
+        if category_key == 'custom':
+            # 인기 키워드는 보충기가 미리 이미지를 채워둡니다.
+            replenisher.record_keyword_use(search_query)
+        else:
+            quiz_sets = quiz_pool.claim(search_query, difficulty)
+            if pool_builder:
+                # 이 프로세스의 빌더만 깨웁니다 (임대가 다른 프로세스에 있으면 그쪽 주기에 보충)
+                pool_builder.wake()
+            if quiz_sets:
+                # 풀에 오래 있던 세트일 수 있으므로 URL(서명 만료, CDN 설정)을 다시 만듭니다.
+                return urls.get_builder().refresh_quiz_sets(quiz_sets)
+        return build_quiz_sets(search_query, difficulty)
+
     # --- API 엔드포인트 ---
     @app.route('/api/prepare-game', methods=['POST'])
     def prepare_game():
         """
-        [개선] 게임 시작 전, S3 이미지를 먼저 확인하고 부족할 때만 AI 이미지를 생성합니다.
+        [개선] 게임 시작 전, 퀴즈 풀에서 미리 만든 세트를 먼저 꺼내고
+        풀이 비어 있을 때만 S3 이미지 확인/AI 이미지 생성 경로로 퀴즈를 만듭니다.
         """
         try:
             data = request.get_json()
-            category_input = data.get('category')
             difficulty = data.get('difficulty', 'easy')
-            keyword = data.get('keyword', '')
-
-            if not category_input:
-                return jsonify({'message': '카테고리 정보가 없습니다.'}), 400
-
-            category_key, category_info = get_category_info(category_input)
-            if not category_key:
-                return jsonify({'message': f"'{category_input}'에 대한 카테고리를 찾을 수 없습니다."}), 404
-
-            # '랜덤', '나만퀴' 모드에 따른 검색어 설정
-            search_query = ""
-            if category_key == 'random':
-                available_categories = [k for k in CATEGORY_CONFIG.keys() if k not in ['random', 'custom']]
-                selected_category_key = random.choice(available_categories)
-                search_query = CATEGORY_CONFIG[selected_category_key]['search_query']
-            elif category_key == 'custom':
-                if not keyword:
-                    return jsonify({'message': '나만퀴 모드에서는 키워드가 필요합니다.'}), 400
-                search_query = keyword
-            else:
-                search_query = category_info['search_query']
-
-            # --- S3 이미지 우선 확인 로직 ---
-            ai_image_paths = []
-            s3_prefix = f"generated/{search_query}/"
-            s3_base_url = f"https://{S3_BUCKET_NAME}.s3.{Config.region_name}.amazonaws.com/"
-
-            # 1. S3에서 기존 이미지 목록 가져오기
-            response = s3_client.list_objects_v2(Bucket=S3_BUCKET_NAME, Prefix=s3_prefix)
-            if 'Contents' in response:
-                for obj in response['Contents']:
-                    key = obj['Key']
-                    if not key.endswith('/'):
-                        # DB에 저장할 때는 S3 키(경로) 자체를 저장합니다.
-                        ai_image_paths.append(key)
-
-            # 2. 이미지가 10장 미만이면 부족한 만큼만 생성
-            num_images_needed = 10 - len(ai_image_paths)
-            if num_images_needed > 0:
-                logger.info(f"{search_query}: S3에 이미지가 부족하여 {num_images_needed}장 추가 생성 시작")
-                ai_prompts = get_ai_prompts_for_category(search_query)
-
-                # 부족한 수 만큼만 프롬프트를 선택하여 생성 요청
-                new_image_results = generate_images_concurrent(
-                    prompts=random.sample(ai_prompts, k=min(num_images_needed, len(ai_prompts))),
-                    category=search_query,
-                    repeat_per_prompt=1,
-                    max_workers=10
-                )
-                for prompt, paths in new_image_results.items():
-                    ai_image_paths.extend(paths)
-
-            # 최종적으로 이미지가 최소 요구치(6장) 미만이면 에러 반환
-            min_required = 6
-            if len(ai_image_paths) < min_required:
-                return jsonify({
-                    'message': f'AI 이미지 생성 부족 (생성: {len(ai_image_paths)}장, 최소: {min_required}장)',
-                }), 500
-
-            # --- 퀴즈 생성 로직 (기존과 유사) ---
-            # Pixabay 이미지 가져오기
-            api_url = f"https://pixabay.com/api/?key={PIXABAY_API_KEY}&q={requests.utils.quote(search_query)}&image_type=photo&per_page=50"
-            pixabay_response = requests.get(api_url)
-            pixabay_data = pixabay_response.json()
-            real_image_urls = [hit['largeImageURL'] for hit in pixabay_data.get('hits', [])]
+            category_key, search_query = resolve_search_query(data.get('category'), data.get('keyword', ''))
 
-            # 퀴즈 생성
-            images_per_question = 6 if difficulty == 'hard' else 2
-            max_questions = min(10, len(ai_image_paths))
-            num_real_images_needed = (images_per_question - 1) * max_questions
-
-            if len(real_image_urls) < num_real_images_needed:
-                return jsonify({'message': '퀴즈 생성을 위한 실제 이미지가 부족합니다.'}), 409
-
-            unique_real_images = random.sample(real_image_urls, num_real_images_needed)
-
-            quiz_sets = []
-            # AI 이미지를 10장 이상 생성되었더라도 10문제만 출제하도록 세어서 10장만 사용
-            selected_ai_images = random.sample(ai_image_paths, max_questions)
-
-            for i in range(max_questions):
-                ai_image_s3_key = selected_ai_images[i]
-
-                real_images_for_question = unique_real_images[
-                                           i * (images_per_question - 1): (i + 1) * (images_per_question - 1)]
-
-                # 이미지 URL 목록 생성 (AI 이미지는 전체 URL로 변환)
-                question_images = [s3_base_url + ai_image_s3_key] + real_images_for_question
-                random.shuffle(question_images)
-
-                correct_answer = question_images.index(s3_base_url + ai_image_s3_key)
-
-                quiz_sets.append({
-                    'images': question_images,
-                    'correctAnswer': correct_answer
-                })
+            quiz_sets = prepare_quiz_sets(category_key, search_query, difficulty)
 
             return jsonify({
                 'message': '게임 준비가 완료되었습니다.',
@@ -315,10 +396,105 @@ def create_app():
                 'totalQuestions': len(quiz_sets)
             })
 
+        except QuizBuildError as e:
+            return jsonify({'message': e.message}), e.status
         except Exception as e:
             logger.error(f"게임 준비 중 오류: {e}")
             return jsonify({'message': f'게임 준비 중 서버 오류 발생: {e}'}), 500
 
+    @app.route('/api/prepare-game/stream', methods=['GET'])
+    def prepare_game_stream():
+        """
+        게임 준비를 Server-Sent Events로 스트리밍합니다.
+        ?category=&difficulty=&keyword= 를 받아 문제가 준비되는 대로 'question' 이벤트를 보냅니다.
+        """
+        try:
+            difficulty = request.args.get('difficulty', 'easy')
+            category_key, search_query = resolve_search_query(
+                request.args.get('category'), request.args.get('keyword', '')
+            )
+            if category_key == 'custom':
+                replenisher.record_keyword_use(search_query)
+            events = stream_quiz_sets(search_query, difficulty)
+            first_event = next(events)
+        except QuizBuildError as e:
+            return jsonify({'message': e.message}), e.status
+        except Exception as e:
+            logger.error(f"게임 스트리밍 준비 중 오류: {e}")
+            return jsonify({'message': f'게임 준비 중 서버 오류 발생: {e}'}), 500
+
+        def sse():
+            try:
+                for event, payload in itertools.chain([first_event], events):
+                    yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            except Exception as e:
+                logger.error(f"게임 스트리밍 중 오류: {e}")
+                yield f"event: error\ndata: {json.dumps({'message': f'게임 준비 중 서버 오류 발생: {e}'}, ensure_ascii=False)}\n\n"
+
+        return Response(sse(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
+    @app.route('/api/prepare-game/jobs', methods=['POST'])
+    def create_prepare_game_job():
+        """
+        게임 준비를 비동기 작업으로 등록하고 job id를 즉시 반환합니다.
+        (나만퀴 모드처럼 AI 이미지 생성이 오래 걸릴 때 요청 워커를 붙잡지 않습니다.)
+        """
+        try:
+            data = request.get_json()
+            difficulty = data.get('difficulty', 'easy')
+            keyword = data.get('keyword', '')
+            category_key, search_query = resolve_search_query(data.get('category'), keyword)
+
+            job_id = game_jobs.submit(
+                lambda: prepare_quiz_sets(category_key, search_query, difficulty),
+                category=category_key,
+                search_query=search_query,
+                difficulty=difficulty,
+                keyword=keyword,
+            )
+            return jsonify({
+                'message': '게임 준비 작업이 등록되었습니다.',
+                'jobId': job_id,
+                'statusUrl': url_for('get_prepare_game_job', job_id=job_id)
+            }), 202
+
+        except QuizBuildError as e:
+            return jsonify({'message': e.message}), e.status
+        except game_jobs.JobQueueFull as e:
+            return jsonify({'message': e.message}), e.status, {'Retry-After': '5'}
+        except Exception as e:
+            logger.error(f"게임 준비 작업 등록 중 오류: {e}")
+            return jsonify({'message': f'게임 준비 작업 등록 중 서버 오류 발생: {e}'}), 500
+
+    @app.route('/api/prepare-game/jobs/<job_id>', methods=['GET'])
+    def get_prepare_game_job(job_id):
+        """
+        게임 준비 작업 상태를 조회합니다.
+        ?wait=N (초, 최대 30) 을 주면 작업이 끝날 때까지 최대 N초 기다립니다(long-poll).
+        """
+        try:
+            wait_seconds = request.args.get('wait', type=float) or 0
+            job = game_jobs.wait(job_id, wait_seconds) if wait_seconds > 0 else game_jobs.get(job_id)
+            if not job:
+                return jsonify({'message': '작업을 찾을 수 없습니다.'}), 404
+
+            payload = {'jobId': job_id, 'status': job['status']}
+            if job['status'] == game_jobs.STATUS_DONE:
+                payload.update({
+                    'message': '게임 준비가 완료되었습니다.',
+                    'quizSets': job['quizSets'],
+                    'totalQuestions': len(job['quizSets'])
+                })
+            elif job['status'] == game_jobs.STATUS_ERROR:
+                payload.update({'message': job.get('message'), 'statusCode': job.get('status_code', 500)})
+            return jsonify(payload), 200
+
+        except Exception as e:
+            return jsonify({'message': f'작업 조회 중 서버 오류 발생: {e}'}), 500
+
     # --- 게임 진행 상황 저장/복원 API ---
     @app.route('/api/save-progress', methods=['POST'])
     @jwt_required()
@@ -408,7 +584,7 @@ def create_app():
                     'score': progress['score'],
                     'keyword': progress.get('keyword', ''),  # 키워드 반환
                     # [추가] 저장된 퀴즈 데이터 반환
-                    'quizSets': progress.get('quizSets', [])
+                    'quizSets': urls.get_builder().refresh_quiz_sets(progress.get('quizSets', []))
                 }), 200
             else:
                 return jsonify({'hasProgress': False}), 200
@@ -449,42 +625,97 @@ def create_app():
         except Exception as e:
             return jsonify({'message': f'서버 오류: {e}'}), 500
 
-    # --- 새로운 API: S3에서 이미지 목록 가져오기 ---
+    # --- 새로운 API: 카탈로그에서 이미지 목록 가져오기 ---
     @app.route('/api/get-quiz-images', methods=['GET'])
     @jwt_required()
     def get_quiz_images():
-        """선택한 테마(카테고리)에 해당하는 이미지 URL 목록을 S3에서 가져옵니다."""
+        """선택한 테마(카테고리)에 해당하는 이미지 URL 목록을 카탈로그에서 가져옵니다."""
         theme = request.args.get('theme')  # ex: /api/get-quiz-images?theme=cat
         if not theme:
             return jsonify({"message": "테마(theme) 파라미터가 필요합니다."}), 400
 
-        image_urls = []
-        # S3 버킷의 'generated/테마명/' 경로를 prefix로 지정
-        prefix = f"generated/{theme}/"
-
         try:
-            # list_objects_v2를 사용해 해당 prefix를 가진 객체(파일) 목록 조회
-            response = s3_client.list_objects_v2(
-                Bucket=S3_BUCKET_NAME,
-                Prefix=prefix
-            )
-
-            # 'Contents'가 있는지 확인 (파일이 하나도 없을 수 있음)
-            if 'Contents' in response:
-                for obj in response['Contents']:
-                    # 객체 키(파일 경로)를 가져옴, ex: 'generated/cat/image-123.png'
-                    key = obj['Key']
-
-                    # 파일이 있는 경우에만 URL 생성 (폴더 자체는 제외)
-                    if not key.endswith('/'):
-                        # 공개적으로 접근 가능한 S3 URL 생성
-                        url = f"https://{S3_BUCKET_NAME}.s3.{Config.region_name}.amazonaws.com/{key}"
-                        image_urls.append(url)
+            # 카탈로그에서 해당 테마의 이미지 키 목록 조회 (S3 목록 조회 없음)
+            image_urls = urls.build_many(catalog.list_image_keys(theme))
 
             return jsonify({"image_urls": image_urls}), 200
 
         except Exception as e:
-            return jsonify({'message': f'S3 이미지 목록을 가져오는 중 오류 발생: {e}'}), 500
+            return jsonify({'message': f'이미지 목록을 가져오는 중 오류 발생: {e}'}), 500
+
+    @app.route('/api/images/thumbnail', methods=['GET'])
+    @jwt_required()
+    def image_thumbnail():
+        """
+        생성 이미지의 축소본을 반환합니다. (예: /api/images/thumbnail?key=generated/cat/a.png&w=320)
+        - 저장된 변형본(320/640/1024)이 있으면 그 URL로 리다이렉트합니다 (변환 없음).
+        - 없을 때만 image_service 프로세스 풀에서 변환하고, 결과를 변형본으로 저장해 다음 요청부터는 리다이렉트합니다.
+        동시에 변환하는 요청 수는 제한되며, 넘치면 503을 돌려줍니다.
+        """
+        key = request.args.get('key', '')
+        fmt = variants.variant_format()
+        try:
+            width = int(request.args.get('w', 320))
+        except ValueError:
+            return jsonify({"message": "w는 정수여야 합니다."}), 400
+        if not key.startswith(f"{catalog.S3_BASE_PATH}/") or '..' in key:
+            return jsonify({"message": "잘못된 이미지 키입니다."}), 400
+        if width not in variants.parse_widths(Config.VARIANT_WIDTHS):
+            return jsonify({"message": f"지원하지 않는 너비입니다: {width}"}), 400
+
+        variant_key = catalog.variant_keys([key], width).get(key)
+        if variant_key is None and image_storage.exists(variants.variant_key(key, width, fmt)):
+            variant_key = variants.variant_key(key, width, fmt)
+        if variant_key:
+            metrics.incr("thumbnail.variant_hit")
+            return redirect(urls.build(variant_key))
+
+        if not _thumbnail_slots.acquire(blocking=False):
+            metrics.incr("thumbnail.rejected")
+            return jsonify({"message": "썸네일 변환 요청이 많습니다. 잠시 후 다시 시도하세요."}), 503, {'Retry-After': '1'}
+        try:
+            try:
+                original = image_storage.get(key)
+            except storage.NotFound:
+                return jsonify({"message": "이미지를 찾을 수 없습니다."}), 404
+            thumbnail = image_service.get_service().transcode(original, width, fmt, Config.VARIANT_QUALITY)
+            variant_key = variants.variant_key(key, width, fmt)
+            image_storage.put(variant_key, thumbnail, content_type=image_utils.CONTENT_TYPES[fmt],
+                              cache_control=Config.IMAGE_CACHE_CONTROL)
+            catalog.record_variants(key, {str(width): variant_key})
+            metrics.incr("thumbnail.transcoded")
+        finally:
+            _thumbnail_slots.release()
+        return Response(thumbnail, mimetype=image_utils.CONTENT_TYPES[fmt],
+                        headers={'Cache-Control': Config.IMAGE_CACHE_CONTROL})
+
+    if isinstance(image_storage, storage.LocalStorage):
+        def local_image(key):
+            """로컬 저장소 이미지 서빙 (STORAGE_BACKEND=local)."""
+            try:
+                ref = image_storage.read_ref(key)
+            except (storage.NotFound, ValueError):
+                return jsonify({"message": "이미지를 찾을 수 없습니다."}), 404
+            response = send_file(image_storage.blob_path(ref['hash']), mimetype=ref.get('content_type'),
+                                 etag=ref['hash'], conditional=True)
+            if ref.get('cache_control'):
+                response.headers['Cache-Control'] = ref['cache_control']
+            return response
+
+        app.add_url_rule(Config.LOCAL_STORAGE_URL.rstrip('/') + '/<path:key>', 'local_image', local_image)
+
+    if Config.PACKS_ENABLED:
+        def packed_image(key):
+            """
+            팩 파일 이미지 서빙. mmap 구간을 잘라 응답하며 Range/ETag 조건부 요청을 지원합니다 (packfile.make_response).
+            """
+            reader = packfile.find(key)
+            if reader is None:
+                return jsonify({"message": "이미지를 찾을 수 없습니다."}), 404
+            metrics.incr("packfile.served")
+            return packfile.make_response(reader, key, request)
+
+        app.add_url_rule(Config.PACK_URL.rstrip('/') + '/<path:key>', 'packed_image', packed_image)
 
     # --- 기존 API ---
     @app.route('/api/save-score', methods=['POST'])
@@ -545,6 +776,21 @@ def create_app():
         except Exception as e:
             return jsonify({'message': f'랭킹 조회 중 서버 오류 발생: {e}'}), 500
 
+    @app.route('/api/metrics', methods=['GET'])
+    @jwt_required()
+    def get_metrics():
+        """
+        프로세스 내 메트릭(퀴즈 풀 claim 지연, 풀 깊이, 외부 HTTP 커넥션 풀 등) 스냅샷을 반환합니다.
+        키 라벨/큐 상태 등 내부 정보가 들어 있으므로 로그인한 사용자만 조회할 수 있습니다.
+        """
+        return jsonify(dict(
+            metrics.snapshot(),
+            http_pools=http_client.pool_stats(),
+            generation=gen_executor.get_executor().stats(),
+            upload_stage=get_upload_stage().stats(),
+            gemini_keys=gemini_clients.stats()
+        )), 200
+
     @app.errorhandler(404)
     def not_found(error):
         return jsonify({'message': '페이지를 찾을 수 없습니다'}), 404
@@ -0,0 +1,68 @@
+# bench_image_service.py
+"""
+이미지 변환 처리량 비교: 현재 스레드에서 바로 처리(inline) vs image_service(프로세스 풀 + 공유 메모리).
+
+    python bench_image_service.py --images 64 --threads 8 --processes 4
+
+합성 이미지(노이즈 PNG)를 만들어 각 방식으로 width로 줄이고 WebP로 인코딩한 뒤 초당 처리 수를 출력합니다.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+import image_service
+
+
+def make_png(size: int) -> bytes:
+    img = Image.effect_noise((size, size), 64).convert("RGB")
+    out = BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+def inline_transcode(data: bytes, width: int, fmt: str, quality: int) -> bytes:
+    img = Image.open(BytesIO(data))
+    img = image_service._resize(img, width)
+    return image_service._encode(img, fmt, quality)
+
+
+def run(label: str, fn, images, threads: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(fn, images))
+    elapsed = time.perf_counter() - start
+    out_bytes = sum(len(r) for r in results)
+    print(f"{label:>8}: {len(images) / elapsed:7.1f} images/s ({elapsed:.2f}s, 출력 {out_bytes / 1e6:.1f}MB)")
+    return elapsed
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="inline vs image_service 변환 처리량 비교")
+    parser.add_argument("--images", type=int, default=64, help="변환할 이미지 수")
+    parser.add_argument("--size", type=int, default=1024, help="원본 이미지 한 변 픽셀 수")
+    parser.add_argument("--width", type=int, default=640, help="축소 너비")
+    parser.add_argument("--format", default="webp", help="출력 포맷")
+    parser.add_argument("--threads", type=int, default=8, help="요청 스레드 수 (양쪽 동일)")
+    parser.add_argument("--processes", type=int, default=4, help="image_service 프로세스 수")
+    args = parser.parse_args(argv)
+
+    source = make_png(args.size)
+    images = [source] * args.images
+    print(f"원본 {args.size}x{args.size} PNG {len(source) / 1e6:.1f}MB x {args.images}장 -> "
+          f"{args.width}px {args.format}, 스레드 {args.threads}")
+
+    service = image_service.ImageService(processes=args.processes)
+    # 워커 프로세스 기동 시간은 측정에서 제외
+    service.transcode(source, args.width, args.format)
+
+    inline = run("inline", lambda d: inline_transcode(d, args.width, args.format, 80), images, args.threads)
+    pooled = run("service", lambda d: service.transcode(d, args.width, args.format, 80), images, args.threads)
+    print(f"service / inline 처리량 비율: {inline / pooled:.2f}x")
+    service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
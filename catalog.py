@@ -0,0 +1,185 @@
+# catalog.py
+"""
+생성 이미지 카탈로그.
+
+S3 `generated/` 아래 객체들의 메타데이터(key, category, size, created_at, prompt)를
+MongoDB `images` 컬렉션에 보관합니다. 게임 준비 시 매번 S3 목록을 조회하는 대신
+인덱스가 걸린 카탈로그 쿼리 한 번으로 이미지를 고릅니다.
+"""
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from pymongo import ASCENDING, UpdateOne
+
+from extensions import get_db
+
+CATALOG_COLLECTION = "images"
+S3_BASE_PATH = "generated"
+
+_indexes_ready = False
+
+
+def get_collection():
+    """카탈로그 컬렉션을 반환합니다. 최초 호출 시 인덱스를 보장합니다."""
+    global _indexes_ready
+    collection = get_db()[CATALOG_COLLECTION]
+    if not _indexes_ready:
+        ensure_indexes(collection)
+        _indexes_ready = True
+    return collection
+
+
+def ensure_indexes(collection=None):
+    """key 유니크 인덱스와 카테고리 조회용 인덱스를 생성합니다."""
+    collection = collection if collection is not None else get_db()[CATALOG_COLLECTION]
+    collection.create_index([("key", ASCENDING)], unique=True)
+    collection.create_index([("category", ASCENDING), ("created_at", ASCENDING)])
+
+
+def category_of_key(key: str) -> Optional[str]:
+    """'generated/{category}/{file}' 형태의 키에서 카테고리를 추출합니다."""
+    parts = key.split("/")
+    if len(parts) < 3 or parts[0] != S3_BASE_PATH or not parts[-1]:
+        return None
+    return "/".join(parts[1:-1])
+
+
+def record_image(
+    key: str,
+    category: str,
+    size: int,
+    prompt: Optional[str] = None,
+    created_at: Optional[datetime] = None,
+) -> None:
+    """업로드된 이미지 한 장을 카탈로그에 기록(upsert)합니다."""
+    get_collection().update_one(
+        {"key": key},
+        {
+            "$set": {"category": category, "size": size},
+            "$setOnInsert": {
+                "prompt": prompt,
+                "created_at": created_at or datetime.utcnow(),
+            },
+        },
+        upsert=True,
+    )
+
+
+def record_variants(key: str, variants: Dict[str, str]) -> None:
+    """원본 이미지의 크기별 변형본 키를 기록합니다 ({str(width): variant_key})."""
+    get_collection().update_one(
+        {"key": key},
+        {"$set": {f"variants.{width}": vkey for width, vkey in variants.items()}},
+    )
+
+
+def has_variants(key: str) -> bool:
+    """이미지에 변형본이 기록되어 있는지 확인합니다."""
+    return get_collection().count_documents({"key": key, "variants": {"$exists": True}}, limit=1) > 0
+
+
+def variant_keys(keys: List[str], width: int) -> Dict[str, str]:
+    """원본 키들 중 해당 너비의 변형본이 있는 것만 {원본 키: 변형본 키}로 반환합니다."""
+    field = f"variants.{width}"
+    cursor = get_collection().find(
+        {"key": {"$in": list(keys)}, field: {"$exists": True}}, {"_id": 0, "key": 1, field: 1}
+    )
+    return {doc["key"]: doc["variants"][str(width)] for doc in cursor}
+
+
+def sample_image_keys(category: str, count: int) -> List[str]:
+    """카테고리에서 최대 count장의 이미지 키를 무작위로 고릅니다 (인덱스 쿼리 1회)."""
+    pipeline = [
+        {"$match": {"category": category}},
+        {"$sample": {"size": count}},
+        {"$project": {"_id": 0, "key": 1}},
+    ]
+    return [doc["key"] for doc in get_collection().aggregate(pipeline)]
+
+
+def list_image_keys(category: str) -> List[str]:
+    """카테고리의 모든 이미지 키를 생성 순서대로 반환합니다."""
+    cursor = get_collection().find(
+        {"category": category}, {"_id": 0, "key": 1}
+    ).sort("created_at", ASCENDING)
+    return [doc["key"] for doc in cursor]
+
+
+def count_images(category: str) -> int:
+    """카테고리의 이미지 수를 반환합니다."""
+    return get_collection().count_documents({"category": category})
+
+
+def count_by_prompt(category: str) -> Dict[str, int]:
+    """카테고리 안에서 프롬프트별 이미지 수를 반환합니다 ({prompt: count})."""
+    pipeline = [
+        {"$match": {"category": category, "prompt": {"$ne": None}}},
+        {"$group": {"_id": "$prompt", "count": {"$sum": 1}}},
+    ]
+    return {row["_id"]: row["count"] for row in get_collection().aggregate(pipeline)}
+
+
+def aliased_keys() -> Set[str]:
+    """내용 해시 키로 옮겨진 옛 키 전체 (문서의 `aliases[].from`)."""
+    return {
+        alias["from"]
+        for doc in get_collection().find({"aliases": {"$exists": True}}, {"_id": 0, "aliases": 1})
+        for alias in doc["aliases"]
+    }
+
+
+def reconcile(store, category: Optional[str] = None, dry_run: bool = False) -> Dict[str, int]:
+    """
+    저장소(storage.Storage)와 카탈로그를 동기화합니다.
+    - 저장소에만 있는 객체는 카탈로그에 추가 (prompt는 알 수 없으므로 None)
+    - 카탈로그에만 있는 항목(삭제된 객체)은 카탈로그에서 제거
+    - 내용 해시 키로 옮겨진 옛 키(문서의 `aliases`)는 다시 추가하지 않습니다 (GC 정리 대상)
+    반환: {'added': n, 'removed': n, 'scanned': n}
+    """
+    prefix = f"{S3_BASE_PATH}/{category}/" if category else f"{S3_BASE_PATH}/"
+    collection = get_collection()
+
+    query = {"category": category} if category else {}
+    known_keys = {doc["key"] for doc in collection.find(query, {"_id": 0, "key": 1})}
+    moved_keys = aliased_keys()
+
+    ops = []
+    seen_keys = set()
+    for obj in store.list(prefix):
+        key = obj["key"]
+        seen_keys.add(key)
+        if key in known_keys or key in moved_keys:
+            continue
+        obj_category = category_of_key(key)
+        if obj_category is None:
+            continue
+        ops.append(UpdateOne(
+            {"key": key},
+            {
+                "$set": {"category": obj_category, "size": obj["size"]},
+                "$setOnInsert": {"prompt": None, "created_at": obj["last_modified"] or datetime.utcnow()},
+            },
+            upsert=True,
+        ))
+
+    stale_keys = list(known_keys - seen_keys)
+    if not dry_run:
+        if ops:
+            collection.bulk_write(ops, ordered=False)
+        if stale_keys:
+            collection.delete_many({"key": {"$in": stale_keys}})
+
+    return {"added": len(ops), "removed": len(stale_keys), "scanned": len(seen_keys)}
+
+
+if __name__ == "__main__":
+    import storage
+
+    parser = argparse.ArgumentParser(description="저장소 generated/ 와 이미지 카탈로그 동기화")
+    parser.add_argument("--category", help="특정 카테고리만 동기화 (생략 시 전체)")
+    parser.add_argument("--dry-run", action="store_true", help="변경 없이 결과만 출력")
+    args = parser.parse_args()
+
+    summary = reconcile(storage.get_storage(), category=args.category, dry_run=args.dry_run)
+    print(f"--- 카탈로그 동기화 완료: 스캔 {summary['scanned']}, 추가 {summary['added']}, 제거 {summary['removed']} ---")
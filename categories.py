@@ -0,0 +1,138 @@
+# categories.py
+"""게임 카테고리 설정과 카테고리별 AI 이미지 생성 프롬프트."""
+
+# 개선된 카테고리 매핑 시스템
+CATEGORY_CONFIG = {
+    "cat": {
+        "ko": "고양이",
+        "en": "cat",
+        "search_query": "cat",
+        "image": "cat.jpg"
+    },
+    "icecream": {
+        "ko": "아이스크림",
+        "en": "icecream",
+        "search_query": "icecream",
+        "image": "icecream.jpg"
+    },
+    "rose": {
+        "ko": "장미",
+        "en": "rose",
+        "search_query": "rose",
+        "image": "rose.jpg"
+    },
+    "fruit": {
+        "ko": "과일",
+        "en": "fruit",
+        "search_query": "fruit",
+        "image": "fruits.jpg"
+    },
+    "random": {
+        "ko": "랜덤",
+        "en": "random",
+        "search_query": "random",
+        "image": "random.jpg"
+    },
+    "custom": {
+        "ko": "나만퀴(나만의 퀴즈 만들기)",
+        "en": "custom",
+        "search_query": "custom",
+        "image": "question.png"
+    }
+}
+
+# 하위 호환성을 위한 기존 매핑 (한글 키 -> 영어 키)
+LEGACY_CATEGORY_MAP = {v["ko"]: k for k, v in CATEGORY_CONFIG.items()}
+
+# API에서 한글/영어 키를 모두 지원하는 헬퍼 함수
+def get_category_info(category_input):
+    """카테고리 입력(한글/영어)을 받아서 표준화된 정보를 반환"""
+    # 영어 키로 직접 조회 시도
+    if category_input in CATEGORY_CONFIG:
+        return category_input, CATEGORY_CONFIG[category_input]
+
+    # 한글 키로 조회 (하위 호환성)
+    english_key = LEGACY_CATEGORY_MAP.get(category_input)
+    if english_key:
+        return english_key, CATEGORY_CONFIG[english_key]
+
+    return None, None
+
+def get_ai_prompts_for_category(category):
+    """카테고리별 AI 이미지 생성 프롬프트 반환"""
+    prompts_map = {
+        "cat": [
+            "Photorealistic sunrise rooftop shot of a tabby cat sitting on a warm metal railing, 35mm, f/2.0, ISO 200, 1/800s, golden rim light, gentle haze, center big gemini watermark.",
+            "Photorealistic cat peeking out of a cardboard box on a living room floor, 50mm, f/1.8, ISO 400, 1/250s, side window light, soft bokeh, center big gemini watermark.",
+            "Photorealistic reflection of a black cat in a wall mirror, 35mm, f/2.2, ISO 800, 1/125s, tungsten lamp mixed with daylight, handheld, center big gemini watermark.",
+            "Photorealistic alley scene with a ginger cat near a puddle after rain, 28mm, f/2.8, ISO 320, 1/500s, overcast sky, subtle reflections, center big gemini watermark.",
+            "Photorealistic close-up of a cat's collar tag and fur texture, 85mm, f/2.8, ISO 200, 1/400s, diffused daylight, high micro-contrast, center big gemini watermark.",
+            "Photorealistic candid through houseplants showing a cat on a windowsill, 50mm, f/2.0, ISO 320, 1/250s, backlit greenery bokeh, center big gemini watermark.",
+            "Photorealistic top-down shot of a white cat lounging on tatami mat, 35mm, f/2.8, ISO 200, 1/160s, soft ambient light, natural colors, center big gemini watermark.",
+            "Photorealistic cat curled beside a space heater glow, 35mm, f/1.8, ISO 1600, 1/100s, warm white balance, slight grain, center big gemini watermark.",
+            "Photorealistic maine coon cat stretching on wooden deck at sunset, 85mm, f/2.0, ISO 100, 1/1000s, warm golden hour lighting, center big gemini watermark.",
+            "Photorealistic persian cat sleeping in a sunbeam through lace curtains, 50mm, f/1.4, ISO 200, 1/500s, soft diffused light, dreamy bokeh, center big gemini watermark."
+        ],
+        "icecream": [
+            "Photorealistic cafe window seat shot of a strawberry sundae with condensation on the glass, 50mm, f/2.2, ISO 200, 1/250s, side window light, center big gemini watermark.",
+            "Photorealistic close-up of soft-serve swirling out of a machine into a cone, 70mm, f/4, ISO 400, 1/500s, clean stainless backdrop, motion freeze, center big gemini watermark.",
+            "Photorealistic child's hands holding a chocolate-dipped cone at a park, 35mm, f/2.0, ISO 100, 1/1000s, bright daylight, gentle background blur, center big gemini watermark.",
+            "Photorealistic macro detail of waffle cone texture with tiny sugar crystals, 100mm macro, f/5.6, ISO 200, 1/200s, softbox bounce, center big gemini watermark.",
+            "Photorealistic two friends clinking ice cream cones on a city street, 28mm, f/2.8, ISO 400, 1/800s, late afternoon sun, lively bokeh, center big gemini watermark.",
+            "Photorealistic car interior shot of a vanilla cone near the dashboard, 35mm, f/2.2, ISO 800, 1/160s, mixed lighting, natural reflections, center big gemini watermark.",
+            "Photorealistic evening street festival with a mango sorbet cup under string lights, 50mm, f/1.8, ISO 2000, 1/200s, warm bokeh, handheld, center big gemini watermark.",
+            "Photorealistic freezer door opening with frost swirl and a pistachio pint visible, 24mm, f/3.5, ISO 1600, 1/60s, cool white balance, center big gemini watermark.",
+            "Photorealistic gelato display case with colorful scoops under warm display lights, 35mm, f/2.8, ISO 800, 1/125s, commercial lighting, center big gemini watermark.",
+            "Photorealistic melting ice cream on hot pavement creating a colorful puddle, 50mm, f/4, ISO 100, 1/2000s, harsh midday sun, high contrast, center big gemini watermark."
+        ],
+        "rose": [
+            "Photorealistic florist's cooler seen through fogged glass with red and white roses, 35mm, f/2.8, ISO 800, 1/125s, cool lighting, condensation detail, center big gemini watermark.",
+            "Photorealistic dried rose on linen fabric beside a window, 50mm, f/2.0, ISO 200, 1/200s, soft morning light, gentle shadows, center big gemini watermark.",
+            "Photorealistic rose silhouette projected on a wall by direct sunlight, 35mm, f/4, ISO 100, 1/2000s, strong contrast, crisp edges, center big gemini watermark.",
+            "Photorealistic candlelit macro of rose stamens and inner petals, 105mm macro, f/3.5, ISO 1600, 1/60s, warm flicker, handheld, center big gemini watermark.",
+            "Photorealistic rose crown woven into hair at an outdoor garden, 85mm, f/2.0, ISO 200, 1/640s, backlit strands, natural color, center big gemini watermark.",
+            "Photorealistic scattered rose petals on a marble staircase, 28mm, f/2.8, ISO 400, 1/250s, side light, subtle specular highlights, center big gemini watermark.",
+            "Photorealistic single yellow rose under a glass cloche on a wooden desk, 50mm, f/2.5, ISO 320, 1/160s, soft desk lamp, reflections controlled, center big gemini watermark.",
+            "Photorealistic raindrops sliding on a rose leaf with sharp vein detail, 100mm macro, f/5.6, ISO 400, 1/200s, overcast daylight, center big gemini watermark.",
+            "Photorealistic vintage rose bouquet in antique crystal vase, 85mm, f/2.8, ISO 200, 1/320s, window light with lace shadows, center big gemini watermark.",
+            "Photorealistic wild rose bush growing against old brick wall, 35mm, f/4, ISO 100, 1/1000s, natural outdoor lighting, textural detail, center big gemini watermark."
+        ],
+        "fruit": [
+            "Photorealistic breakfast counter with a bowl of berries and yogurt, 35mm, f/2.8, ISO 200, 1/200s, side window light, natural tones, center big gemini watermark.",
+            "Photorealistic pouring smoothie into a glass with banana and spinach beside, 50mm, f/3.2, ISO 400, 1/500s, motion freeze, kitchen light, center big gemini watermark.",
+            "Photorealistic apple picking in an orchard with sunlit leaves, 35mm, f/2.0, ISO 200, 1/1000s, backlit flare, candid hands, center big gemini watermark.",
+            "Photorealistic analog scale with a crate of oranges on a market counter, 28mm, f/4, ISO 400, 1/160s, ambient indoor light, center big gemini watermark.",
+            "Photorealistic picnic bench with a freshly cut watermelon wedge, 35mm, f/2.8, ISO 100, 1/640s, bright midday sun, crisp texture, center big gemini watermark.",
+            "Photorealistic fig cross-section on a ceramic plate, 85mm, f/4, ISO 200, 1/200s, window side-light, rich seeds detail, center big gemini watermark.",
+            "Photorealistic grapes on the vine with translucent backlight, 70mm, f/2.8, ISO 100, 1/1000s, vineyard ambience, center big gemini watermark.",
+            "Photorealistic stainless bowl reflection with assorted fruits on a counter, 24mm, f/3.5, ISO 800, 1/60s, cool kitchen light, subtle reflections, center big gemini watermark.",
+            "Photorealistic farmers market display of colorful seasonal fruits, 35mm, f/4, ISO 200, 1/500s, natural outdoor lighting, vibrant colors, center big gemini watermark.",
+            "Photorealistic tropical fruit salad in coconut bowl on beach sand, 50mm, f/2.8, ISO 100, 1/1000s, bright beach lighting, shallow depth of field, center big gemini watermark."
+        ],
+    }
+
+    custom_prompts = [
+        f"A lifelike {category} in a real park, trees swaying gently in the wind, candid composition",
+        f"A beautiful {category} under warm golden-hour sunlight, soft rim light, cinematic composition",
+        f"A realistic scene with a person naturally interacting with a {category}, captured in ultra-high-resolution with cinematic lighting and a professional lens.",
+        f"photographed in a workshop, believable wear and fingerprints",
+        f"A vintage {category} styled with authentic 19th-century props and wardrobe, film-like grain and slight halation",
+        f"A levitation shot of {category} captured with a clean background and believable physics (subtle motion blur)",
+        f"A hyper-realistic documentary photo featuring a person interacting with or representing '{category}', natural pose and expression",
+        f"A studio still-life of objects that embody '{category}', seamless backdrop, softbox lighting, crisp detail",
+        f"A detailed macro photo of textures linked to '{category}', shallow depth of field, tactile realism",
+        f"A sweeping landscape where '{category}' is the clear focal element, layered depth and atmospheric perspective",
+        f"A candid street-photography scene that naturally includes '{category}', off-guard moment, believable context",
+        f"A night scene centered on '{category}' with practical light sources (neon, streetlamps), controlled noise",
+        f"An editorial portrait that symbolizes '{category}', thoughtful styling and location, authentic skin texture"
+    ]
+
+    if category in ["cat", "icecream", "rose", "fruit"]:
+        return prompts_map.get(category, prompts_map["cat"])
+    else:
+        return custom_prompts
+
+
+def get_fixed_category_queries():
+    """'랜덤'/'나만퀴'를 제외한 고정 카테고리의 검색어 목록."""
+    return [info['search_query'] for key, info in CATEGORY_CONFIG.items() if key not in ['random', 'custom']]
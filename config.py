@@ -15,4 +15,122 @@ class Config:
     aws_access_key = os.environ.get("AWS_ACCESS_KEY")
     aws_secret_key = os.environ.get("AWS_SECRET_KEY")
     bucket_name = os.environ.get("AWS_S3_BUCKET_NAME")
-    region_name = os.environ.get("AWS_S3_REGION")
\ No newline at end of file
+    region_name = os.environ.get("AWS_S3_REGION")
+
+    # 퀴즈 풀 설정 (미리 만들어 둔 quizSets 개수 워터마크)
+    QUIZ_POOL_ENABLED = os.environ.get('QUIZ_POOL_ENABLED', '1') == '1'
+    QUIZ_POOL_LOW_WATERMARK = int(os.environ.get('QUIZ_POOL_LOW_WATERMARK', 3))
+    QUIZ_POOL_HIGH_WATERMARK = int(os.environ.get('QUIZ_POOL_HIGH_WATERMARK', 10))
+    QUIZ_POOL_INTERVAL = float(os.environ.get('QUIZ_POOL_INTERVAL', 30))
+    # 빌더는 배포 전체에서 하나만 돕니다 (Mongo 임대). 임대를 쥔 프로세스가 죽으면 이 시간(초) 뒤 다른 프로세스가 넘겨받음
+    QUIZ_POOL_LEASE_TTL = float(os.environ.get('QUIZ_POOL_LEASE_TTL', 300))
+
+
+    # Pixabay 검색 캐시 설정
+    PIXABAY_CACHE_BACKEND = os.environ.get('PIXABAY_CACHE_BACKEND', 'memory')  # 'memory' | 'disk'
+    PIXABAY_CACHE_DIR = os.environ.get('PIXABAY_CACHE_DIR', os.path.join('instance', 'pixabay_cache'))
+    PIXABAY_CACHE_TTL = float(os.environ.get('PIXABAY_CACHE_TTL', 3600))
+    PIXABAY_CACHE_STALE_TTL = float(os.environ.get('PIXABAY_CACHE_STALE_TTL', 86400))
+    PIXABAY_CACHE_MAX_ENTRIES = int(os.environ.get('PIXABAY_CACHE_MAX_ENTRIES', 256))
+
+    # 비동기 게임 준비 작업 워커 수
+    GAME_JOB_WORKERS = int(os.environ.get('GAME_JOB_WORKERS', 8))
+    # 워커를 기다릴 수 있는 작업 수 (넘으면 503)
+    GAME_JOB_QUEUE_SIZE = int(os.environ.get('GAME_JOB_QUEUE_SIZE', 32))
+    # 작업 임대 시간(초). 처리 중인 프로세스가 주기적으로 연장하며, 연장이 끊긴 작업은 실패로 처리
+    GAME_JOB_LEASE_SECONDS = float(os.environ.get('GAME_JOB_LEASE_SECONDS', 60))
+
+    # prepare_game의 짧은 I/O 단계(Pixabay/카탈로그 조회) 동시 실행용 스레드 수 (AI 생성은 이 풀을 쓰지 않음)
+    QUIZ_STAGE_WORKERS = int(os.environ.get('QUIZ_STAGE_WORKERS', 16))
+
+    # 외부 HTTP 호출 공용 설정 (커넥션 풀/타임아웃/재시도)
+    HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+    HTTP_POOL_SIZES = os.environ.get('HTTP_POOL_SIZES', '')  # 예: "pixabay.com=20,cdn.example.com=50"
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05))
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+    HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 3))
+    HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.3))
+    HTTP_BACKOFF_JITTER = float(os.environ.get('HTTP_BACKOFF_JITTER', 0.5))
+    GEMINI_TIMEOUT = float(os.environ.get('GEMINI_TIMEOUT', 120))
+
+    # 프로세스 공용 이미지 생성 실행기 (AIMD 동시성 제어)
+    GEN_MAX_CONCURRENCY = int(os.environ.get('GEN_MAX_CONCURRENCY', 32))
+    GEN_MIN_CONCURRENCY = int(os.environ.get('GEN_MIN_CONCURRENCY', 2))
+    GEN_INITIAL_CONCURRENCY = int(os.environ.get('GEN_INITIAL_CONCURRENCY', 8))
+    GEN_TARGET_LATENCY = float(os.environ.get('GEN_TARGET_LATENCY', 30))
+
+    # 같은 검색어의 동시 생성 방지용 프로세스 간 락 만료 시간(초)
+    GENERATION_LOCK_TTL = float(os.environ.get('GENERATION_LOCK_TTL', 300))
+
+    # 카테고리 이미지 풀 백그라운드 보충기
+    REPLENISHER_ENABLED = os.environ.get('REPLENISHER_ENABLED', '0') == '1'
+    REPLENISH_THRESHOLD = int(os.environ.get('REPLENISH_THRESHOLD', 30))
+    REPLENISH_BATCH_SIZE = int(os.environ.get('REPLENISH_BATCH_SIZE', 10))
+    REPLENISH_INTERVAL = float(os.environ.get('REPLENISH_INTERVAL', 300))
+    REPLENISH_BUDGET_PER_HOUR = int(os.environ.get('REPLENISH_BUDGET_PER_HOUR', 60))
+    REPLENISH_POPULAR_KEYWORDS = int(os.environ.get('REPLENISH_POPULAR_KEYWORDS', 5))
+    # 나만퀴 키워드 사용 기록(인기 키워드 선정용). 기본은 보충기 사용 여부를 따르며,
+    # 보충기를 `crawling.py replenish`로만 돌리는 배포는 앱에서 이 값만 켭니다.
+    REPLENISH_RECORD_KEYWORDS = os.environ.get(
+        'REPLENISH_RECORD_KEYWORDS', os.environ.get('REPLENISHER_ENABLED', '0')
+    ) == '1'
+    REPLENISH_MAX_WORKERS = int(os.environ.get('REPLENISH_MAX_WORKERS', 4))
+
+    # 생성/업로드 파이프라인의 업로드 단계 (워커 수, 대기 큐 크기)
+    UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 8))
+    UPLOAD_QUEUE_SIZE = int(os.environ.get('UPLOAD_QUEUE_SIZE', 32))
+
+    # 이미지 생성 방식: 'thread'(공용 생성 실행기 + 업로드 단계) 또는 'async'(asyncio, crawling_async)
+    GENERATION_BACKEND = os.environ.get('GENERATION_BACKEND', 'thread')
+    # async 방식의 프로세스 전체 동시 생성 상한
+    ASYNC_GEN_CONCURRENCY = int(os.environ.get('ASYNC_GEN_CONCURRENCY', 128))
+
+    # 영속 생성 작업 큐 (임대 시간, 최대 시도 횟수, 재시도 백오프 초, 워커 동시 처리 수)
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+    JOB_BACKOFF_BASE = float(os.environ.get('JOB_BACKOFF_BASE', 10))
+    JOB_BACKOFF_MAX = float(os.environ.get('JOB_BACKOFF_MAX', 600))
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 8))
+
+    # 일괄 생성 요약의 예상 비용 계산용 이미지 1장(요청 1건)당 비용 (USD)
+    GEMINI_COST_PER_IMAGE = float(os.environ.get('GEMINI_COST_PER_IMAGE', 0.039))
+
+    # 생성 이미지 객체의 Cache-Control (객체 키가 내용마다 고유하므로 immutable)
+    IMAGE_CACHE_CONTROL = os.environ.get('IMAGE_CACHE_CONTROL', 'public, max-age=31536000, immutable')
+
+    # 크기별 이미지 변형본 (업로드 시 생성, image_service에서 인코딩)
+    VARIANTS_ENABLED = os.environ.get('VARIANTS_ENABLED', '1') == '1'
+    VARIANT_WIDTHS = os.environ.get('VARIANT_WIDTHS', '320,640,1024')
+    VARIANT_FORMAT = os.environ.get('VARIANT_FORMAT', 'webp')  # 'webp' 또는 'avif'
+    VARIANT_QUALITY = int(os.environ.get('VARIANT_QUALITY', 80))
+    # 난이도별로 내려줄 변형본 너비 (hard는 6장 그리드라 더 작은 이미지)
+    VARIANT_WIDTH_BY_DIFFICULTY = os.environ.get('VARIANT_WIDTH_BY_DIFFICULTY', 'easy=1024,hard=640')
+
+    # 이미지 처리 서비스(디코딩/리사이즈/인코딩) 프로세스 수
+    IMAGE_SERVICE_PROCESSES = int(os.environ.get('IMAGE_SERVICE_PROCESSES', 2))
+
+    # Gemini API 키 풀: 여러 키(쉼표 구분, 없으면 GOOGLE_API_KEY), 키별 분당 요청 한도, 쿼터 초과 시 휴식 초
+    GOOGLE_API_KEYS = os.environ.get('GOOGLE_API_KEYS', '')
+    GEMINI_KEY_RPM = float(os.environ.get('GEMINI_KEY_RPM', 60))
+    GEMINI_KEY_COOLDOWN = float(os.environ.get('GEMINI_KEY_COOLDOWN', 30))
+
+    # 이미지 저장소: 's3'(기본) 또는 'local'(내용 해시 기반 로컬 디스크, /local-images/로 서빙)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 's3')
+    LOCAL_STORAGE_DIR = os.environ.get('LOCAL_STORAGE_DIR', 'local_storage')
+    LOCAL_STORAGE_URL = os.environ.get('LOCAL_STORAGE_URL', '/local-images/')
+    # S3 클라이언트 커넥션 풀 크기 (업로드/유지보수 워커 수 이상)
+    S3_MAX_POOL_CONNECTIONS = int(os.environ.get('S3_MAX_POOL_CONNECTIONS', 32))
+
+    # 팩 파일 서빙: 카테고리 이미지를 한 파일로 묶어 mmap으로 서빙 (maintenance.py build-pack으로 생성)
+    PACKS_ENABLED = os.environ.get('PACKS_ENABLED', '0') == '1'
+    PACK_DIR = os.environ.get('PACK_DIR', 'packs')
+    PACK_URL = os.environ.get('PACK_URL', '/packed/')
+
+    # 이미지 URL: CDN 호스트(예: https://cdn.example.com), 캐시 무효화용 버전 토큰(?v=)
+    IMAGE_CDN_ORIGIN = os.environ.get('IMAGE_CDN_ORIGIN', '')
+    IMAGE_URL_VERSION = os.environ.get('IMAGE_URL_VERSION', '')
+    # 서명 URL: ''(끄기), 'hmac'(CDN 엣지 검증용, SECRET 필요), 's3'(presigned). 유효 시간(초), 서명 캐시 크기
+    IMAGE_URL_SIGNING = os.environ.get('IMAGE_URL_SIGNING', '')
+    IMAGE_URL_SIGNING_SECRET = os.environ.get('IMAGE_URL_SIGNING_SECRET', '')
+    IMAGE_URL_TTL = int(os.environ.get('IMAGE_URL_TTL', 3600))
+    IMAGE_URL_SIGNER_CACHE = int(os.environ.get('IMAGE_URL_SIGNER_CACHE', 10000))
\ No newline at end of file
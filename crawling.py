@@ -1,131 +1,370 @@
-# app.py
-from google import genai
-from google.genai import types  # 필요시 사용
+# crawling.py
 from PIL import Image
 from io import BytesIO
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, as_completed
 from pathlib import Path
-from typing import List, Tuple, Dict, Any, Optional, Union  # ← Union 추가
+from typing import List, Tuple, Dict, Any, Iterator, Optional, Union, Callable  # ← Union 추가
+import argparse
+import hashlib
+import json
 import os
-import re
+import pickle
 import uuid
 import time
+import logging
+import threading
 import dotenv
 
-import boto3
 from config import Config
+import catalog
+import image_service
+import image_utils
+import metrics
+import gen_executor
+import gemini_clients
+import pipeline
+import storage
+import variants
+import http_client
+
+logger = logging.getLogger(__name__)
 
 dotenv.load_dotenv()
 DEFAULT_MODEL = "gemini-2.5-flash-image-preview"
 
-# S3 클라이언트 초기화 (config.py 값 사용)
-# 프로그램 시작 시 한 번만 생성하여 재사용합니다.
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=Config.aws_access_key,
-    aws_secret_access_key=Config.aws_secret_key,
-    region_name=Config.region_name
-)
-S3_BUCKET_NAME = Config.bucket_name
+# 이미지 저장은 storage.get_storage() (S3 또는 로컬 디스크)를 거칩니다.
 S3_BASE_PATH = "generated"
+# 객체 키에 쓰는 sha256 16진수 길이 (128비트)
+CONTENT_HASH_LENGTH = 32
 
-def _slugify(text: str) -> str:
-    """파일명에 안전하도록 간단 슬러그화."""
-    text = text.strip().lower()
-    text = re.sub(r"[^\w\s-]", "", text)
-    text = re.sub(r"[\s_-]+", "-", text)
-    text = re.sub(r"^-+|-+$", "", text)
-    return text[:60] if text else "image"
+def _identity(img: Image.Image) -> Image.Image:
+    return img
 
-def generate_image_once(
-    prompt: str,
-    category: str,        # ← 변경
-    model: str = DEFAULT_MODEL,
-    api_key: Optional[str] = None,
-    filename_prefix: Optional[str] = None,
-) -> List[str]:
+
+def _prepare_payload(
+    data: bytes,
+    transform: Optional[Callable[[Image.Image], Image.Image]] = None,
+) -> Tuple[image_utils.BufferLike, str]:
     """
-    단일 요청으로 생성된 '모든 이미지 파트'를 저장하고 경로 리스트 반환.
-    - prompt: 이미지 생성 프롬프트
-    - out_dir: 저장 폴더
-    - model: 사용할 모델명
-    - api_key: 명시 없으면 환경변수 GOOGLE_API_KEY 사용
-    - filename_prefix: 파일명 접두어(없으면 프롬프트 기반 자동 생성)
+    업로드할 바이트와 포맷을 결정합니다.
+    - 변환(transform)이 없고 포맷을 알 수 있으면 원본 바이트를 그대로(memoryview, 복사 없음) 사용
+    - 변환이 설정되었거나 포맷을 모르면 그때만 PIL로 디코딩 후 PNG로 다시 인코딩
+      (image_service 프로세스 풀에서 실행. transform이 pickle 불가능한 함수면 현재 스레드에서 실행)
     """
-    api_key = api_key or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY 환경변수가 설정되어 있지 않습니다.")
+    fmt = image_utils.sniff_format(data)
+    if transform is None and fmt is not None:
+        return memoryview(data), fmt
 
-    client = genai.Client(api_key=api_key)
+    try:
+        return image_service.get_service().apply(data, transform or _identity, "png"), "png"
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        logger.debug(f"프로세스 풀 변환 불가, 인라인 처리: {e}")
+        metrics.incr("upload.inline_transform")
 
-    # 요청
-    response = client.models.generate_content(
-        model=model,
-        contents=[prompt],
-    )
+    img = Image.open(BytesIO(data))
+    if transform is not None:
+        img = transform(img)
+    out = BytesIO()
+    img.save(out, format='PNG')
+    return out.getbuffer(), "png"
 
-    base = filename_prefix or _slugify(prompt)
-    ts = int(time.time())
-    saved_s3_paths: List[str] = [] # S3 경로를 저장할 리스트
 
+def image_parts(response) -> List[bytes]:
+    """Gemini 응답에서 이미지 파트의 원본 바이트만 골라냅니다."""
     # 후보(candidate) 내 content.parts 에 이미지 파트가 들어있음
     # 텍스트 파트가 섞일 수 있어 분기 처리
     candidate = response.candidates[0] if response.candidates else None
     if not candidate or not getattr(candidate, "content", None):
-        return saved_s3_paths
+        return []
 
-    idx_in_parts = 0
+    payloads: List[bytes] = []
     for part in candidate.content.parts:
         # 텍스트는 건너뜀(필요시 로깅)
         if getattr(part, "text", None):
             continue
-
         inline = getattr(part, "inline_data", None)
         if inline and inline.data:
-            try:
-                img = Image.open(BytesIO(inline.data))
-                unique = uuid.uuid4().hex[:8]
-                fname = f"{base}-{ts}-{unique}-{idx_in_parts}.png"
+            payloads.append(inline.data)
+    return payloads
 
-                # S3 전체 경로(객체 키) 설정
-                s3_object_name = f"{S3_BASE_PATH}/{category}/{fname}"
 
-                # 이미지를 파일이 아닌 '메모리 버퍼'에 저장
-                in_mem_file = BytesIO()
-                img.save(in_mem_file, format='PNG')
-                in_mem_file.seek(0)  # 버퍼의 포인터를 맨 앞으로 이동
+def prepare_upload(
+    data: bytes,
+    transform: Optional[Callable[[Image.Image], Image.Image]] = None,
+) -> Tuple[image_utils.BufferLike, str]:
+    """_prepare_payload에 준비 CPU 시간/추가 메모리 측정을 더한 버전."""
+    cpu_start = time.thread_time()
+    payload, fmt = _prepare_payload(data, transform)
+    cpu_ms = (time.thread_time() - cpu_start) * 1000
+    # 원본을 그대로 쓰면 추가 버퍼가 없고, 변환했다면 인코딩 결과만큼 더 사용합니다.
+    extra_bytes = 0 if isinstance(payload, memoryview) and payload.obj is data else len(payload)
+    metrics.observe("upload.prepare_cpu_ms", cpu_ms)
+    metrics.observe("upload.extra_bytes", extra_bytes)
+    metrics.incr("upload.passthrough" if extra_bytes == 0 else "upload.transcoded")
+    return payload, fmt
 
-                # 메모리에 있는 이미지 데이터를 S3로 직접 업로드
-                s3_client.upload_fileobj(in_mem_file, S3_BUCKET_NAME, s3_object_name)
 
-                saved_s3_paths.append(s3_object_name)
-                # print(f"✅ S3 Upload OK: {s3_object_name}") # 확인이 필요하면 주석 해제
-            except Exception as e:
-                print(f"[warn] 이미지 저장 실패: {e}")
+def make_object_key(payload: image_utils.BufferLike, category: str, fmt: str) -> str:
+    """
+    내용 주소 기반 객체 키: generated/{category}/{sha256 앞 32자}.{ext}
+    같은 바이트는 항상 같은 키가 되고, 한 번 올린 키의 내용은 바뀌지 않으므로 URL을 영구 캐시할 수 있습니다.
+    """
+    digest = hashlib.sha256(memoryview(payload).cast("B")).hexdigest()[:CONTENT_HASH_LENGTH]
+    return f"{S3_BASE_PATH}/{category}/{digest}.{image_utils.EXTENSIONS[fmt]}"
+
+
+def upload_extra_args(fmt: str) -> Dict[str, str]:
+    """업로드 시 함께 설정할 S3 객체 메타데이터. 키마다 내용이 바뀌지 않으므로 브라우저가 오래 캐시해도 됩니다."""
+    return {"ContentType": image_utils.CONTENT_TYPES[fmt], "CacheControl": Config.IMAGE_CACHE_CONTROL}
 
+
+def generate_payloads(
+    prompt: str,
+    model: str = DEFAULT_MODEL,
+    api_key: Optional[str] = None,
+) -> List[bytes]:
+    """
+    [생성 단계] Gemini에 요청해 응답 안의 '모든 이미지 파트' 원본 바이트를 반환합니다.
+    - api_key: 명시하면 그 키만 사용, 없으면 공용 클라이언트 풀(GOOGLE_API_KEYS 순환, 쿼터 초과 시 다른 키로 전환)
+    """
+    # 요청 (클라이언트는 키별로 재사용되므로 매 이미지마다 새 클라이언트/TLS 연결을 만들지 않음)
+    with metrics.timer("pipeline.generate.request_ms"):
+        if api_key:
+            response = http_client.get_genai_client(api_key).models.generate_content(
+                model=model,
+                contents=[prompt],
+            )
+        else:
+            response = gemini_clients.get_pool().generate_content(
+                model=model,
+                contents=[prompt],
+            )
+
+    payloads = image_parts(response)
+    metrics.incr("pipeline.generate.images", len(payloads))
+    return payloads
+
+
+def upload_payload(
+    data: bytes,
+    prompt: str,
+    category: str,
+    filename_prefix: Optional[str] = None,
+    transform: Optional[Callable[[Image.Image], Image.Image]] = None,
+    idx_in_parts: int = 0,
+) -> str:
+    """
+    [업로드 단계] 이미지 바이트 1장을 저장소(S3/로컬)에 올리고 카탈로그에 기록한 뒤 객체 키를 반환합니다.
+    - 키는 내용 해시로 정해지므로 이미 같은 바이트가 저장되어 있으면 업로드(PUT)를 건너뜁니다.
+    - filename_prefix, idx_in_parts: 예전 키 형식의 인자로, 키에는 더 이상 쓰이지 않습니다 (호환용)
+    - transform: PIL 이미지 변환 단계. 없으면 디코딩 없이 원본 바이트를 그대로 업로드
+    """
+    payload, fmt = prepare_upload(data, transform)
+    size = len(payload)
+
+    # S3 전체 경로(객체 키) 설정
+    s3_object_name = make_object_key(payload, category, fmt)
+
+    store = storage.get_storage()
+    existed = store.exists(s3_object_name)
+    if existed:
+        metrics.incr("upload.dedup_hit")
+        logger.debug(f"{s3_object_name}: 같은 내용이 이미 있어 업로드 생략")
+    else:
+        # 메모리에 있는 이미지 데이터를 복사 없이(memoryview) 저장소로 직접 업로드
+        store.put(
+            s3_object_name, payload,
+            content_type=image_utils.CONTENT_TYPES[fmt], cache_control=Config.IMAGE_CACHE_CONTROL,
+        )
+        logger.debug(f"{s3_object_name}: {size}B 업로드")
+
+    # 카탈로그에 기록 (prepare_game이 S3 목록 대신 카탈로그를 조회)
+    catalog.record_image(s3_object_name, category, size, prompt=prompt)
+    if not (existed and catalog.has_variants(s3_object_name)):
+        store_variants(s3_object_name, payload)
+    return s3_object_name
+
+
+def store_variants(s3_object_name: str, payload: image_utils.BufferLike) -> None:
+    """
+    크기별 변형본(WebP/AVIF)을 만들어 올립니다. 인코딩은 image_service 프로세스 풀에서 실행됩니다.
+    원본은 이미 카탈로그에 있으므로, 실패해도 이미지는 원본 그대로 사용됩니다.
+    """
+    if not Config.VARIANTS_ENABLED:
+        return
+    try:
+        variants.create_variants(storage.get_storage(), s3_object_name, payload)
+    except Exception as e:
+        logger.warning(f"변형본 생성 실패 ({s3_object_name}): {e}")
+        metrics.incr("variants.error")
+
+
+def generate_image_once(
+    prompt: str,
+    category: str,        # ← 변경
+    model: str = DEFAULT_MODEL,
+    api_key: Optional[str] = None,
+    filename_prefix: Optional[str] = None,
+    transform: Optional[Callable[[Image.Image], Image.Image]] = None,
+) -> List[str]:
+    """
+    단일 요청으로 생성된 '모든 이미지 파트'를 저장하고 경로 리스트 반환. (생성 -> 업로드를 현재 스레드에서 순서대로)
+    - prompt: 이미지 생성 프롬프트
+    - model: 사용할 모델명
+    - api_key: 명시 없으면 공용 클라이언트 풀(GOOGLE_API_KEYS) 사용
+    - filename_prefix: 파일명 접두어(없으면 프롬프트 기반 자동 생성)
+    - transform: PIL 이미지 변환 단계. 없으면 디코딩 없이 원본 바이트를 그대로 업로드
+    """
+    saved_s3_paths: List[str] = [] # S3 경로를 저장할 리스트
+    for idx_in_parts, data in enumerate(generate_payloads(prompt, model, api_key)):
+        try:
+            saved_s3_paths.append(
+                upload_payload(data, prompt, category, filename_prefix, transform, idx_in_parts)
+            )
+        except Exception as e:
+            logger.warning(f"이미지 저장 실패: {e}")
     return saved_s3_paths
 
 
-def _worker_task(
+_upload_stage: Optional[pipeline.BoundedStage] = None
+_upload_stage_lock = threading.Lock()
+
+
+def get_upload_stage() -> pipeline.BoundedStage:
+    """프로세스 공용 업로드 단계 (UPLOAD_WORKERS개 워커, UPLOAD_QUEUE_SIZE 크기의 큐)."""
+    global _upload_stage
+    with _upload_stage_lock:
+        if _upload_stage is None:
+            _upload_stage = pipeline.BoundedStage("upload", Config.UPLOAD_WORKERS, Config.UPLOAD_QUEUE_SIZE)
+        return _upload_stage
+
+
+def _submit_prompt(
+    executor: gen_executor.GenerationExecutor,
     prompt: str,
-    category: str,  # ← 변경
+    category: str,
     model: str,
     api_key: Optional[str],
     filename_prefix: Optional[str],
-) -> Tuple[str, List[str]]:
-    """스레드 워커: 프롬프트 1건 생성-저장."""
+    transform: Optional[Callable[[Image.Image], Image.Image]],
+    batch: str,
+    max_in_flight: int,
+) -> Tuple[Future, Future]:
+    """
+    프롬프트 1건을 생성 -> 업로드 파이프라인에 넣고 (생성 Future, 결과 Future)를 반환합니다.
+    결과 Future는 모든 업로드가 끝나면 S3 키 목록으로 완료됩니다.
+    생성 워커는 이미지 바이트를 업로드 큐에 넣자마자 다음 생성으로 넘어가고,
+    업로드 큐가 가득 차 있을 때만 기다립니다(배압).
+    업로드 큐에 넣는 일은 생성 Future의 완료 콜백에서 하므로, 큐 대기 시간은 실행기가 재는
+    생성 지연(AIMD 조정 기준)에 들어가지 않습니다.
+    아직 실행 전인 생성 Future를 취소하면 결과 Future는 빈 목록으로 완료됩니다.
+    """
+    uploads = get_upload_stage()
+    result: Future = Future()
+    # 결과 Future는 생성 Future를 통해서만 취소되도록 바로 실행 상태로 둡니다.
+    result.set_running_or_notify_cancel()
+
+    def generate_stage() -> List[bytes]:
+        return generate_payloads(prompt, model, api_key)
+
+    def on_generated(gen_future: Future) -> None:
+        if gen_future.cancelled():
+            result.set_result([])
+            return
+        error = gen_future.exception()
+        if error is not None:
+            result.set_exception(error)
+            return
+        try:
+            upload_futures = [
+                uploads.submit(upload_payload, data, prompt, category, filename_prefix, transform, idx)
+                for idx, data in enumerate(gen_future.result())
+            ]
+        except Exception as e:
+            result.set_exception(e)
+            return
+        if not upload_futures:
+            result.set_result([])
+            return
+
+        remaining = [len(upload_futures)]
+        lock = threading.Lock()
+
+        def on_uploaded(_: Future) -> None:
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            paths = []
+            for fut in upload_futures:
+                if fut.exception() is None:
+                    paths.append(fut.result())
+                else:
+                    logger.warning(f"이미지 저장 실패: {fut.exception()}")
+            result.set_result(paths)
+
+        for fut in upload_futures:
+            fut.add_done_callback(on_uploaded)
+
+    gen_future = executor.submit(generate_stage, batch=batch, max_in_flight=max_in_flight)
+    gen_future.add_done_callback(on_generated)
+    return gen_future, result
+
+
+def iter_images_concurrent(
+    prompts: List[str],
+    category: str,
+    *,
+    repeat_per_prompt: int = 1,
+    max_workers: int = 4,
+    model: str = DEFAULT_MODEL,
+    api_key: Optional[str] = None,
+    filename_prefix: Optional[str] = None,
+    transform: Optional[Callable[[Image.Image], Image.Image]] = None,
+    limit: Optional[int] = None,
+) -> Iterator[Tuple[str, List[str]]]:
+    """
+    여러 프롬프트를 동시 병렬로 생성/업로드하고, 끝나는 순서대로 (prompt, s3_paths)를 yield 합니다.
+    - limit: 누적 이미지 수가 limit 이상이 되면 종료하고, 아직 시작하지 않은 생성 요청은 취소합니다.
+    호출자가 중간에 순회를 멈추거나(break) 제너레이터를 닫아도 남은 요청은 같은 방식으로 취소됩니다.
+    이미 실행 중인 생성은 멈출 수 없으므로 끝까지 진행되며, 그 결과는 카탈로그에만 기록됩니다.
+    """
+    if not api_key:
+        gemini_clients.get_pool()  # 사용할 키가 하나도 없으면 제출 전에 바로 실패
+
+    # 프로세스 공용 실행기에 제출 (요청 단위 batch로 공정 분배, max_workers는 이 요청의 동시 실행 상한)
+    executor = gen_executor.get_executor()
+    batch = uuid.uuid4().hex
+    futures: Dict[Future, Tuple[str, Future]] = {}
+    for prompt in prompts:
+        for _ in range(max_workers if repeat_per_prompt == -1 else repeat_per_prompt):
+            gen_future, result = _submit_prompt(
+                executor, prompt, category, model, api_key, filename_prefix, transform,
+                batch=batch, max_in_flight=max_workers,
+            )
+            futures[result] = (prompt, gen_future)
+
+    total = 0
+    pending = set(futures)
     try:
-        paths = generate_image_once(
-            prompt=prompt,
-            category=category,
-            model=model,
-            api_key=api_key,
-            filename_prefix=filename_prefix,
-        )
-        return prompt, paths
-    except Exception as e:
-        print(f"[error] '{prompt}' 생성 실패: {e}")
-        return prompt, []
+        for fut in as_completed(futures):
+            pending.discard(fut)
+            p = futures[fut][0]
+            try:
+                paths = fut.result()
+            except Exception as e:
+                logger.error(f"'{p}' 생성 실패: {e}")
+                paths = []
+            logger.info(f"'{p[:30]}...' -> {len(paths)}장 S3 업로드")
+            total += len(paths)
+            yield p, paths
+            if limit is not None and total >= limit:
+                break
+    finally:
+        cancelled = sum(1 for fut in pending if futures[fut][1].cancel())
+        if cancelled:
+            logger.info(f"'{category}': 필요한 이미지 수에 도달해 생성 {cancelled}건 취소")
+            metrics.incr("generate.cancelled", cancelled)
 
 
 def generate_images_concurrent(
@@ -137,108 +376,247 @@ def generate_images_concurrent(
     model: str = DEFAULT_MODEL,
     api_key: Optional[str] = None,
     filename_prefix: Optional[str] = None,
+    on_complete: Optional[Callable[[str, List[str]], None]] = None,
+    transform: Optional[Callable[[Image.Image], Image.Image]] = None,
+    limit: Optional[int] = None,
 ) -> Dict[str, List[str]]: # 반환 타입을 S3 경로 리스트로 변경
     """
-    여러 프롬프트를 동시 병렬로 요청하여 이미지를 S3에 업로드.
+    여러 프롬프트를 동시 병렬로 요청하여 이미지를 S3에 업로드. (iter_images_concurrent 결과를 모아서 반환)
+    생성(공용 생성 실행기)과 업로드(공용 업로드 단계)는 별도의 동시성으로 동작합니다.
     - prompts: 프롬프트 목록
-    - out_dir: 저장 폴더
     - repeat_per_prompt: 각 프롬프트를 몇 번 반복 호출할지(다양한 샘플 원할 때 >1)
-    - max_workers: 동시 스레드 수
+    - max_workers: 이 요청이 공용 실행기에서 동시에 실행할 수 있는 최대 생성 작업 수
     - model, api_key, filename_prefix: 옵션
+    - on_complete: 프롬프트 1건이 끝날 때마다(완료 순서대로) (prompt, s3_paths)로 호출되는 콜백
+    - transform: 업로드 전 적용할 PIL 변환 단계 (없으면 원본 바이트 그대로 업로드)
+    - limit: 이 수만큼 이미지가 모이면 남은 생성 요청을 취소
     반환: {prompt: [Path, ...]} 매핑
     """
-    api_key = api_key or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY 환경변수가 설정되어 있지 않습니다.")
-
     results: Dict[str, List[str]] = {p: [] for p in prompts}
+    for p, paths in iter_images_concurrent(
+        prompts,
+        category,
+        repeat_per_prompt=repeat_per_prompt,
+        max_workers=max_workers,
+        model=model,
+        api_key=api_key,
+        filename_prefix=filename_prefix,
+        transform=transform,
+        limit=limit,
+    ):
+        results[p].extend(paths)
+        if on_complete:
+            on_complete(p, paths)
+    return results
 
-    tasks: List[Tuple[str, Any]] = []
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        for prompt in prompts:
-            for _ in range(max_workers if repeat_per_prompt == -1 else repeat_per_prompt):
-                fut = ex.submit(
-                    _worker_task,
-                    prompt,
-                    category,
-                    model,
-                    api_key,
-                    filename_prefix,
-                )
-                tasks.append((prompt, fut))
-
-        for prompt, fut in tasks:
-            p, paths = fut.result()
-            results[p].extend(paths)
-            print(f"[done] '{p[:30]}...' -> {len(paths)}장 S3 업로드")
 
-    return results
+# 초기 시드용 카테고리별 프롬프트 매니페스트
+SEED_MANIFEST = Path(__file__).with_name("seed_manifest.json")
 
 
-if __name__ == "__main__":
-    # 카테고리별 프롬프트와 out_dir을 카테고리별로 다르게 설정
-    categories = {
-    "cat": [
-        "Photorealistic sunrise rooftop shot of a tabby cat sitting on a warm metal railing, 35mm, f/2.0, ISO 200, 1/800s, golden rim light, gentle haze, no text or watermark.",
-        "Photorealistic cat peeking out of a cardboard box on a living room floor, 50mm, f/1.8, ISO 400, 1/250s, side window light, soft bokeh, no text or watermark.",
-        "Photorealistic reflection of a black cat in a wall mirror, 35mm, f/2.2, ISO 800, 1/125s, tungsten lamp mixed with daylight, handheld, no text or watermark.",
-        "Photorealistic alley scene with a ginger cat near a puddle after rain, 28mm, f/2.8, ISO 320, 1/500s, overcast sky, subtle reflections, no text or watermark.",
-        "Photorealistic close-up of a cat’s collar tag and fur texture, 85mm, f/2.8, ISO 200, 1/400s, diffused daylight, high micro-contrast, no text or watermark.",
-        "Photorealistic candid through houseplants showing a cat on a windowsill, 50mm, f/2.0, ISO 320, 1/250s, backlit greenery bokeh, no text or watermark.",
-        "Photorealistic top-down shot of a white cat lounging on tatami mat, 35mm, f/2.8, ISO 200, 1/160s, soft ambient light, natural colors, no text or watermark.",
-        "Photorealistic cat curled beside a space heater glow, 35mm, f/1.8, ISO 1600, 1/100s, warm white balance, slight grain, no text or watermark."
-    ],
-    "icecream": [
-        "Photorealistic cafe window seat shot of a strawberry sundae with condensation on the glass, 50mm, f/2.2, ISO 200, 1/250s, side window light, no text or watermark.",
-        "Photorealistic close-up of soft-serve swirling out of a machine into a cone, 70mm, f/4, ISO 400, 1/500s, clean stainless backdrop, motion freeze, no text or watermark.",
-        "Photorealistic child’s hands holding a chocolate-dipped cone at a park, 35mm, f/2.0, ISO 100, 1/1000s, bright daylight, gentle background blur, no text or watermark.",
-        "Photorealistic macro detail of waffle cone texture with tiny sugar crystals, 100mm macro, f/5.6, ISO 200, 1/200s, softbox bounce, no text or watermark.",
-        "Photorealistic two friends clinking ice cream cones on a city street, 28mm, f/2.8, ISO 400, 1/800s, late afternoon sun, lively bokeh, no text or watermark.",
-        "Photorealistic car interior shot of a vanilla cone near the dashboard, 35mm, f/2.2, ISO 800, 1/160s, mixed lighting, natural reflections, no text or watermark.",
-        "Photorealistic evening street festival with a mango sorbet cup under string lights, 50mm, f/1.8, ISO 2000, 1/200s, warm bokeh, handheld, no text or watermark.",
-        "Photorealistic freezer door opening with frost swirl and a pistachio pint visible, 24mm, f/3.5, ISO 1600, 1/60s, cool white balance, no text or watermark."
-    ],
-    "rose": [
-        "Photorealistic florist’s cooler seen through fogged glass with red and white roses, 35mm, f/2.8, ISO 800, 1/125s, cool lighting, condensation detail, no text or watermark.",
-        "Photorealistic dried rose on linen fabric beside a window, 50mm, f/2.0, ISO 200, 1/200s, soft morning light, gentle shadows, no text or watermark.",
-        "Photorealistic rose silhouette projected on a wall by direct sunlight, 35mm, f/4, ISO 100, 1/2000s, strong contrast, crisp edges, no text or watermark.",
-        "Photorealistic candlelit macro of rose stamens and inner petals, 105mm macro, f/3.5, ISO 1600, 1/60s, warm flicker, handheld, no text or watermark.",
-        "Photorealistic rose crown woven into hair at an outdoor garden, 85mm, f/2.0, ISO 200, 1/640s, backlit strands, natural color, no text or watermark.",
-        "Photorealistic scattered rose petals on a marble staircase, 28mm, f/2.8, ISO 400, 1/250s, side light, subtle specular highlights, no text or watermark.",
-        "Photorealistic single yellow rose under a glass cloche on a wooden desk, 50mm, f/2.5, ISO 320, 1/160s, soft desk lamp, reflections controlled, no text or watermark.",
-        "Photorealistic raindrops sliding on a rose leaf with sharp vein detail, 100mm macro, f/5.6, ISO 400, 1/200s, overcast daylight, no text or watermark."
-    ],
-    "fruits": [
-        "Photorealistic breakfast counter with a bowl of berries and yogurt, 35mm, f/2.8, ISO 200, 1/200s, side window light, natural tones, no text or watermark.",
-        "Photorealistic pouring smoothie into a glass with banana and spinach beside, 50mm, f/3.2, ISO 400, 1/500s, motion freeze, kitchen light, no text or watermark.",
-        "Photorealistic apple picking in an orchard with sunlit leaves, 35mm, f/2.0, ISO 200, 1/1000s, backlit flare, candid hands, no text or watermark.",
-        "Photorealistic analog scale with a crate of oranges on a market counter, 28mm, f/4, ISO 400, 1/160s, ambient indoor light, no text or watermark.",
-        "Photorealistic picnic bench with a freshly cut watermelon wedge, 35mm, f/2.8, ISO 100, 1/640s, bright midday sun, crisp texture, no text or watermark.",
-        "Photorealistic fig cross-section on a ceramic plate, 85mm, f/4, ISO 200, 1/200s, window side-light, rich seeds detail, no text or watermark.",
-        "Photorealistic grapes on the vine with translucent backlight, 70mm, f/2.8, ISO 100, 1/1000s, vineyard ambience, no text or watermark.",
-        "Photorealistic stainless bowl reflection with assorted fruits on a counter, 24mm, f/3.5, ISO 800, 1/60s, cool kitchen light, subtle reflections, no text or watermark."
+def load_manifest(path: Union[str, Path]) -> List[Tuple[str, str, int]]:
+    """
+    생성 매니페스트(JSON)를 읽어 (category, prompt, target) 목록으로 반환합니다.
+    {"target_per_prompt": 1, "categories": {"cat": ["프롬프트", ...],
+                                            "rose": {"target_per_prompt": 3, "prompts": [...]}}}
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    default_target = int(manifest.get("target_per_prompt", 1))
+    items = []
+    for category, spec in manifest["categories"].items():
+        if isinstance(spec, dict):
+            target = int(spec.get("target_per_prompt", default_target))
+            prompts = spec["prompts"]
+        else:
+            target, prompts = default_target, spec
+        items.extend((category, prompt, target) for prompt in prompts)
+    return items
+
+
+def _checkpoint_key(category: str, prompt: str) -> str:
+    return f"{category}\t{prompt}"
+
+
+def _load_checkpoint(path: Path) -> Dict[str, int]:
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("done", {})
+
+
+def _save_checkpoint(path: Path, done: Dict[str, int]) -> None:
+    # 중간에 끊겨도 파일이 깨지지 않도록 임시 파일에 쓴 뒤 교체
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"done": done, "updated_at": int(time.time())}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def plan_bulk(items: List[Tuple[str, str, int]], checkpoint: Dict[str, int]) -> List[Tuple[str, str, int]]:
+    """
+    목표 수에 이미 도달한 프롬프트를 제외하고 (category, prompt, 부족한 수) 목록을 만듭니다.
+    이미 만든 수 = max(카탈로그의 프롬프트별 이미지 수, 체크포인트 기록)
+    """
+    counts: Dict[str, Dict[str, int]] = {}
+    remaining = []
+    for category, prompt, target in items:
+        if category not in counts:
+            counts[category] = catalog.count_by_prompt(category)
+        made = max(counts[category].get(prompt, 0), checkpoint.get(_checkpoint_key(category, prompt), 0))
+        if made < target:
+            remaining.append((category, prompt, target - made))
+    return remaining
+
+
+def run_bulk(
+    manifest_path: Union[str, Path],
+    checkpoint_path: Optional[Union[str, Path]] = None,
+    max_workers: int = 10,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    매니페스트의 모든 카테고리를 하나의 작업 큐(공용 생성 실행기의 단일 batch)로 모아 생성합니다.
+    - 목표 수에 도달한 프롬프트는 건너뛰고, 완료될 때마다 체크포인트 파일에 기록하므로
+      중단 후 다시 실행하면 남은 작업만 진행합니다.
+    - 끝나면 처리량과 예상 비용(GEMINI_COST_PER_IMAGE 기준)을 출력합니다.
+    """
+    checkpoint_path = Path(checkpoint_path or f"{manifest_path}.checkpoint.json")
+    items = load_manifest(manifest_path)
+    done = _load_checkpoint(checkpoint_path)
+    remaining = plan_bulk(items, done)
+    total_needed = sum(n for _, _, n in remaining)
+    print(f"[bulk] 프롬프트 {len(items)}개 중 {len(remaining)}개 남음 (이미지 {total_needed}장 필요)")
+    if dry_run or not remaining:
+        return {"prompts": len(remaining), "images": 0}
+
+    gemini_clients.get_pool()  # 사용할 키가 하나도 없으면 제출 전에 바로 실패
+
+    executor = gen_executor.get_executor()
+    batch = f"bulk-{uuid.uuid4().hex[:8]}"
+    futures: Dict[Future, Tuple[str, str]] = {}
+    for category, prompt, missing in remaining:
+        for _ in range(missing):
+            _, result = _submit_prompt(
+                executor, prompt, category, DEFAULT_MODEL, None, None, None,
+                batch=batch, max_in_flight=max_workers,
+            )
+            futures[result] = (category, prompt)
+
+    start = time.perf_counter()
+    images = failures = completed = 0
+    try:
+        for fut in as_completed(futures):
+            category, prompt = futures[fut]
+            try:
+                paths = fut.result()
+            except Exception as e:
+                print(f"[error] '{prompt[:30]}...' 생성 실패: {e}")
+                failures += 1
+                continue
+            completed += 1
+            images += len(paths)
+            key = _checkpoint_key(category, prompt)
+            done[key] = done.get(key, 0) + len(paths)
+            _save_checkpoint(checkpoint_path, done)
+    finally:
+        elapsed = time.perf_counter() - start
+        summary = {
+            "prompts": len(remaining),
+            "requests": len(futures),
+            "completed": completed,
+            "images": images,
+            "failures": failures,
+            "elapsed_sec": round(elapsed, 1),
+            "images_per_min": round(images / elapsed * 60, 1) if elapsed else 0.0,
+            # 중단(Ctrl+C)으로 실행되지 않은 요청과 실패한 요청은 비용에서 뺍니다.
+            "estimated_cost_usd": round(completed * Config.GEMINI_COST_PER_IMAGE, 2),
+        }
+        print(f"\n--- 일괄 생성 요약: {summary} ---")
+    return summary
+
+
+def run_seed():
+    """시드 매니페스트(seed_manifest.json)에서 아직 목표에 못 미친 프롬프트만 생성합니다."""
+    run_bulk(SEED_MANIFEST)
+
+
+def run_generation_job(job: Dict[str, Any]) -> List[str]:
+    """
+    작업 큐(job_queue)의 작업 1건을 처리합니다. 실패는 예외로 올려 큐가 백오프 후 재시도하게 합니다.
+    생성 요청은 공용 생성 실행기를 거치므로 429 등 과부하 시 동시성이 함께 줄어듭니다.
+    """
+    payloads = gen_executor.get_executor().submit(
+        generate_payloads, job["prompt"], job.get("model", DEFAULT_MODEL), batch="jobs"
+    ).result()
+    if not payloads:
+        raise RuntimeError("응답에 이미지 파트가 없습니다.")
+    return [
+        upload_payload(data, job["prompt"], job["category"], job.get("filename_prefix"), None, idx)
+        for idx, data in enumerate(payloads)
     ]
-}
-    # base_out_dir = "static/generated"
-
-    all_results = {}
-    for category, prompts in categories.items():
-        # generate_images_concurrent 함수가 이제 'out_dir' 대신 'category'를 받습니다.
-        results = generate_images_concurrent(
-            prompts=prompts,
-            category=category,
-            repeat_per_prompt=1,
-            max_workers=10,
-            model=DEFAULT_MODEL,
-            filename_prefix=None,
-        )
-        all_results[category] = results
-
-    total_count = sum(len(paths) for res in all_results.values() for paths in res.values())
-    print(f"\n--- 작업 완료: 총 {total_count}개의 이미지를 S3에 업로드했습니다. ---")
-    for category, res in all_results.items():
-        print(f"\n## 카테고리: {category}")
-        for prompt, s3_paths in res.items():
-            if s3_paths:
-                # 생성된 S3 경로 중 첫 번째 것만 샘플로 출력
-                print(f"  - s3://{S3_BUCKET_NAME}/{s3_paths[0]}")
+
+
+def enqueue_seed(queue, manifest_path: Union[str, Path] = SEED_MANIFEST) -> int:
+    """매니페스트 프롬프트를 작업 큐에 넣습니다. 멱등 키 덕분에 여러 번 실행해도 작업이 중복되지 않습니다."""
+    count = 0
+    for category, prompt, target in load_manifest(manifest_path):
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:16]
+        for i in range(target):
+            queue.enqueue(prompt, category, idempotency_key=f"seed:{category}:{digest}:{i}")
+            count += 1
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="AI 이미지 생성/보충 도구")
+    sub = parser.add_subparsers(dest="command")
+    seed = sub.add_parser("seed", help="시드 프롬프트 전체 생성 (기본)")
+    seed.add_argument("--queue", action="store_true", help="바로 생성하지 않고 영속 작업 큐에 넣기 (worker로 처리)")
+    bulk = sub.add_parser("bulk", help="매니페스트 기반 일괄 생성 (중단 후 재실행 시 남은 작업만)")
+    bulk.add_argument("--manifest", default=str(SEED_MANIFEST), help="생성 매니페스트 JSON 경로")
+    bulk.add_argument("--checkpoint", help="체크포인트 파일 경로 (기본: <manifest>.checkpoint.json)")
+    bulk.add_argument("--workers", type=int, default=10, help="동시 생성 요청 수")
+    bulk.add_argument("--dry-run", action="store_true", help="남은 작업만 계산하고 종료")
+    worker = sub.add_parser("worker", help="영속 작업 큐의 생성 작업 처리")
+    worker.add_argument("--once", action="store_true", help="지금 처리 가능한 작업을 모두 끝내면 종료")
+    worker.add_argument("--concurrency", type=int, default=Config.JOB_WORKERS, help="동시 처리 작업 수")
+    replenish = sub.add_parser("replenish", help="카테고리/인기 키워드 이미지 풀 보충기 실행")
+    replenish.add_argument("--once", action="store_true", help="한 번만 확인/보충하고 종료")
+    args = parser.parse_args(argv)
+
+    if args.command == "replenish":
+        import replenisher
+
+        service = replenisher.from_config()
+        if args.once:
+            made = service.run_once()
+            print(f"--- 보충 완료: {made}장 생성 ---")
+        else:
+            service.run_forever()
+    elif args.command == "bulk":
+        run_bulk(args.manifest, args.checkpoint, max_workers=args.workers, dry_run=args.dry_run)
+    elif args.command == "worker":
+        import job_queue
+
+        queue = job_queue.from_config()
+        service = job_queue.JobWorker(queue, run_generation_job, concurrency=args.concurrency)
+        if args.once:
+            service.run_until_empty()
+        else:
+            service.run_forever()
+        print(f"--- 작업 큐 상태: {queue.stats()} ---")
+    elif getattr(args, "queue", False):
+        import job_queue
+
+        queue = job_queue.from_config()
+        count = enqueue_seed(queue)
+        print(f"--- {count}건 작업 큐에 등록 (상태: {queue.stats()}) ---")
+    else:
+        run_seed()
+
+
+if __name__ == "__main__":
+    # 단독 실행 시 진행 상황(logger.info)이 보이도록 로그를 표준 에러로 출력합니다.
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(name)s: %(message)s")
+    main()
@@ -0,0 +1,321 @@
+# crawling_async.py
+"""
+asyncio 기반 이미지 생성/업로드.
+
+crawling.generate_image_once / generate_images_concurrent의 asyncio 버전입니다.
+- 생성: genai 클라이언트의 비동기 API(client.aio)를 사용하므로 대기 중인 요청이 스레드를 점유하지 않습니다.
+- 업로드: S3 저장소이고 aioboto3가 설치되어 있으면 비동기 S3 클라이언트로,
+  아니면(로컬 저장소 포함) asyncio.to_thread로 기존 업로드 함수를 실행합니다.
+- 동시성: 생성/업로드 각각 세마포어로 제한 (ASYNC_GEN_CONCURRENCY, UPLOAD_WORKERS)
+
+Flask 핸들러처럼 동기 코드에서는 `generate_images_concurrent_sync()`를 호출합니다.
+프로세스당 하나의 이벤트 루프를 백그라운드 스레드에서 돌리고, 코루틴을 그 루프에 넘겨 결과를 기다립니다.
+이 루프의 비동기 S3 클라이언트는 프로세스 종료 시(atexit) `shutdown()`이 닫습니다.
+"""
+import asyncio
+import atexit
+import contextlib
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+try:
+    import aioboto3
+except ImportError:  # 선택 의존성: 없으면 업로드는 스레드로 실행
+    aioboto3 = None
+
+import catalog
+import crawling
+import gemini_clients
+import http_client
+import image_utils
+import metrics
+import storage
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class _AsyncState:
+    """이벤트 루프에 묶인 자원 (세마포어, 비동기 S3 클라이언트)."""
+
+    def __init__(self):
+        self.gen_semaphore = asyncio.Semaphore(Config.ASYNC_GEN_CONCURRENCY)
+        self.upload_semaphore = asyncio.Semaphore(Config.UPLOAD_WORKERS)
+        self.in_flight = 0
+        self._s3 = None
+        self._s3_lock = asyncio.Lock()
+        self._stack = contextlib.AsyncExitStack()
+
+    async def s3(self):
+        async with self._s3_lock:
+            if self._s3 is None:
+                session = aioboto3.Session(
+                    aws_access_key_id=Config.aws_access_key,
+                    aws_secret_access_key=Config.aws_secret_key,
+                    region_name=Config.region_name,
+                )
+                self._s3 = await self._stack.enter_async_context(session.client("s3"))
+            return self._s3
+
+    async def aclose(self) -> None:
+        """비동기 S3 클라이언트(연결 풀)를 닫습니다. 이후 s3()를 부르면 새로 엽니다."""
+        async with self._s3_lock:
+            self._s3 = None
+            await self._stack.aclose()
+
+
+_states: Dict[asyncio.AbstractEventLoop, _AsyncState] = {}
+
+
+def _state() -> _AsyncState:
+    loop = asyncio.get_running_loop()
+    state = _states.get(loop)
+    if state is None:
+        state = _states[loop] = _AsyncState()
+    return state
+
+
+async def aclose() -> None:
+    """실행 중인 루프에 묶인 자원을 닫습니다. 직접 만든 루프(asyncio.run 등)를 끝내기 전에 호출합니다."""
+    state = _states.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state.aclose()
+
+
+async def generate_payloads(
+    prompt: str,
+    model: str = crawling.DEFAULT_MODEL,
+    api_key: Optional[str] = None,
+) -> List[bytes]:
+    """[생성 단계] crawling.generate_payloads의 비동기 버전."""
+    state = _state()
+    async with state.gen_semaphore:
+        state.in_flight += 1
+        metrics.set_gauge("async_gen.in_flight", state.in_flight)
+        try:
+            with metrics.timer("pipeline.generate.request_ms"):
+                if api_key:
+                    response = await http_client.get_genai_client(api_key).aio.models.generate_content(
+                        model=model,
+                        contents=[prompt],
+                    )
+                else:
+                    response = await gemini_clients.get_pool().generate_content_async(
+                        model=model,
+                        contents=[prompt],
+                    )
+        finally:
+            state.in_flight -= 1
+            metrics.set_gauge("async_gen.in_flight", state.in_flight)
+
+    payloads = crawling.image_parts(response)
+    metrics.incr("pipeline.generate.images", len(payloads))
+    return payloads
+
+
+async def _object_exists(s3, bucket: str, key: str) -> bool:
+    try:
+        await s3.head_object(Bucket=bucket, Key=key)
+        return True
+    except Exception as e:
+        if getattr(e, "response", {}).get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+
+async def upload_payload(
+    data: bytes,
+    prompt: str,
+    category: str,
+    filename_prefix: Optional[str] = None,
+    transform: Optional[Callable[[Image.Image], Image.Image]] = None,
+    idx_in_parts: int = 0,
+) -> str:
+    """[업로드 단계] crawling.upload_payload의 비동기 버전. S3 키를 반환합니다."""
+    state = _state()
+    async with state.upload_semaphore:
+        with metrics.timer("pipeline.upload.task_ms"):
+            store = storage.get_storage()
+            if aioboto3 is None or not isinstance(store, storage.S3Storage):
+                return await asyncio.to_thread(
+                    crawling.upload_payload, data, prompt, category, filename_prefix, transform, idx_in_parts
+                )
+
+            if transform is None:
+                payload, fmt = crawling.prepare_upload(data)
+            else:
+                # PIL 변환은 CPU 작업이므로 루프를 막지 않도록 스레드에서 실행
+                payload, fmt = await asyncio.to_thread(crawling.prepare_upload, data, transform)
+            s3_object_name = crawling.make_object_key(payload, category, fmt)
+
+            s3 = await state.s3()
+            existed = await _object_exists(s3, store.bucket, s3_object_name)
+            if existed:
+                # 내용 주소 키이므로 같은 키면 같은 바이트입니다.
+                metrics.incr("upload.dedup_hit")
+            else:
+                await s3.upload_fileobj(
+                    image_utils.BufferReader(payload), store.bucket, s3_object_name,
+                    ExtraArgs=crawling.upload_extra_args(fmt),
+                )
+            await asyncio.to_thread(catalog.record_image, s3_object_name, category, len(payload), prompt=prompt)
+            if not (existed and await asyncio.to_thread(catalog.has_variants, s3_object_name)):
+                await asyncio.to_thread(crawling.store_variants, s3_object_name, payload)
+            return s3_object_name
+
+
+async def _store_all(
+    payloads: List[bytes],
+    prompt: str,
+    category: str,
+    filename_prefix: Optional[str],
+    transform: Optional[Callable[[Image.Image], Image.Image]],
+) -> List[str]:
+    results = await asyncio.gather(
+        *(upload_payload(data, prompt, category, filename_prefix, transform, idx)
+          for idx, data in enumerate(payloads)),
+        return_exceptions=True,
+    )
+    saved_s3_paths: List[str] = []
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.warning(f"이미지 저장 실패: {result}")
+        else:
+            saved_s3_paths.append(result)
+    return saved_s3_paths
+
+
+async def generate_image_once(
+    prompt: str,
+    category: str,
+    model: str = crawling.DEFAULT_MODEL,
+    api_key: Optional[str] = None,
+    filename_prefix: Optional[str] = None,
+    transform: Optional[Callable[[Image.Image], Image.Image]] = None,
+) -> List[str]:
+    """
+    crawling.generate_image_once의 비동기 버전.
+    생성이 끝난 뒤에는 업로드를 shield로 보호하므로, 도중에 취소되어도 이미 비용을 치른 이미지는 저장됩니다.
+    """
+    payloads = await generate_payloads(prompt, model, api_key)
+    if not payloads:
+        return []
+    return await asyncio.shield(_store_all(payloads, prompt, category, filename_prefix, transform))
+
+
+async def generate_images_concurrent(
+    prompts: List[str],
+    category: str,
+    *,
+    repeat_per_prompt: int = 1,
+    max_workers: int = 4,
+    model: str = crawling.DEFAULT_MODEL,
+    api_key: Optional[str] = None,
+    filename_prefix: Optional[str] = None,
+    on_complete: Optional[Callable[[str, List[str]], None]] = None,
+    transform: Optional[Callable[[Image.Image], Image.Image]] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, List[str]]:
+    """
+    crawling.generate_images_concurrent의 비동기 버전. 인자와 반환값이 같습니다.
+    - max_workers: 이 호출의 동시 생성 상한 (프로세스 전체 상한은 ASYNC_GEN_CONCURRENCY)
+    - limit: 이 수만큼 이미지가 모이면 남은 생성 작업을 취소 (시작 전은 물론 응답 대기 중인 요청도 취소)
+    """
+    if not api_key:
+        gemini_clients.get_pool()  # 사용할 키가 하나도 없으면 제출 전에 바로 실패
+
+    results: Dict[str, List[str]] = {p: [] for p in prompts}
+    call_semaphore = asyncio.Semaphore(max_workers)
+
+    async def run(prompt: str) -> Tuple[str, List[str]]:
+        async with call_semaphore:
+            return prompt, await generate_image_once(prompt, category, model, api_key, filename_prefix, transform)
+
+    tasks = {
+        asyncio.ensure_future(run(prompt)): prompt
+        for prompt in prompts
+        for _ in range(max_workers if repeat_per_prompt == -1 else repeat_per_prompt)
+    }
+    total = 0
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                p = tasks[task]
+                try:
+                    _, paths = task.result()
+                except Exception as e:
+                    logger.error(f"'{p}' 생성 실패: {e}")
+                    paths = []
+                results[p].extend(paths)
+                total += len(paths)
+                logger.info(f"'{p[:30]}...' -> {len(paths)}장 S3 업로드")
+                if on_complete:
+                    on_complete(p, paths)
+            if limit is not None and total >= limit:
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.info(f"'{category}': 필요한 이미지 수에 도달해 생성 {len(pending)}건 취소")
+            metrics.incr("generate.cancelled", len(pending))
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    return results
+
+
+# --- 동기 코드(Flask 핸들러, 스레드)에서 호출하기 위한 브리지 ---
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """백그라운드 스레드에서 도는 프로세스 공용 이벤트 루프를 반환합니다."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="async-generation", daemon=True).start()
+            _loop = loop
+            atexit.register(shutdown)
+        return _loop
+
+
+def shutdown(timeout: float = 5.0) -> None:
+    """공용 루프의 자원(비동기 S3 클라이언트)을 닫고 루프를 멈춥니다."""
+    global _loop
+    with _loop_lock:
+        loop, _loop = _loop, None
+    if loop is None or not loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(aclose(), loop).result(timeout)
+    except Exception as e:
+        logger.warning(f"비동기 자원 정리 실패: {e}")
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+
+
+def run_sync(coro, timeout: Optional[float] = None):
+    """코루틴을 공용 루프에서 실행하고 결과를 기다립니다 (어느 스레드에서나 호출 가능)."""
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def generate_images_concurrent_sync(prompts: List[str], category: str, **kwargs) -> Dict[str, List[str]]:
+    """
+    generate_images_concurrent를 동기 함수처럼 호출합니다.
+    on_complete 콜백은 이벤트 루프 스레드에서 호출되므로 스레드 안전해야 합니다.
+    """
+    return run_sync(generate_images_concurrent(prompts, category, **kwargs))
@@ -1,4 +1,23 @@
+import threading
+
 from flask_pymongo import PyMongo
+from pymongo import MongoClient
+
+from config import Config
 
 # PyMongo 객체를 여기서 생성합니다.
-mongo = PyMongo()
\ No newline at end of file
+mongo = PyMongo()
+
+_standalone_client = None
+_client_lock = threading.Lock()
+
+
+def get_db():
+    """Flask 앱에서 초기화된 DB를 우선 사용하고, 없으면(크롤러 단독 실행 등) 직접 연결합니다."""
+    global _standalone_client
+    if mongo.db is not None:
+        return mongo.db
+    with _client_lock:
+        if _standalone_client is None:
+            _standalone_client = MongoClient(Config.MONGO_URI)
+    return _standalone_client.get_default_database()
@@ -0,0 +1,195 @@
+# game_jobs.py
+"""
+게임 준비 비동기 작업(job) 관리.
+
+POST 요청은 job id만 즉시 반환하고, AI 이미지 생성과 퀴즈 조립은 백그라운드 워커에서 실행합니다.
+작업 상태는 MongoDB `game_jobs` 컬렉션에 저장되므로 어느 WSGI 워커로 폴링이 들어와도 조회할 수 있습니다.
+- 대기열 제한: 실행 중 + 대기 중인 작업이 GAME_JOB_WORKERS + GAME_JOB_QUEUE_SIZE개를 넘으면 submit()이
+  JobQueueFull을 던집니다 (API는 503).
+- 임대: 작업 문서의 `lease_expires`를 작업을 가진 프로세스의 heartbeat 스레드가 주기적으로 연장합니다.
+  프로세스가 죽어 연장이 끊긴 pending/running 작업은 조회 시점에 실패(error)로 바뀌므로 폴링이 끝없이 이어지지 않습니다.
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+import metrics
+from config import Config
+from extensions import get_db
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "game_jobs"
+JOB_TTL_SECONDS = 60 * 60
+MAX_WAIT_SECONDS = 30
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_ERROR = "error"
+
+LEASE_EXPIRED_MESSAGE = "작업을 처리하던 서버가 중단되었습니다. 다시 시도해 주세요."
+
+_executor = ThreadPoolExecutor(max_workers=Config.GAME_JOB_WORKERS, thread_name_prefix="game-job")
+# 실행 중 + 대기 중 작업 수 상한 (ThreadPoolExecutor의 대기열은 크기 제한이 없으므로 여기서 막습니다)
+_slots = threading.BoundedSemaphore(Config.GAME_JOB_WORKERS + Config.GAME_JOB_QUEUE_SIZE)
+_local_events: Dict[str, threading.Event] = {}
+_events_lock = threading.Lock()
+_heartbeat: Optional[threading.Thread] = None
+_indexes_ready = False
+
+
+class JobQueueFull(Exception):
+    """작업 대기열이 가득 차 새 작업을 받을 수 없을 때 발생. API는 503으로 응답합니다."""
+
+    def __init__(self, message="게임 준비 요청이 많습니다. 잠시 후 다시 시도하세요."):
+        super().__init__(message)
+        self.message = message
+        self.status = 503
+
+
+def get_collection():
+    """작업 컬렉션을 반환합니다. 최초 호출 시 만료(TTL) 인덱스를 보장합니다."""
+    global _indexes_ready
+    collection = get_db()[JOBS_COLLECTION]
+    if not _indexes_ready:
+        collection.create_index([("created_at", ASCENDING)], expireAfterSeconds=JOB_TTL_SECONDS)
+        _indexes_ready = True
+    return collection
+
+
+def _update(job_id: str, fields: Dict) -> None:
+    fields["updated_at"] = datetime.utcnow()
+    get_collection().update_one({"_id": job_id}, {"$set": fields})
+
+
+def _lease_expires() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=Config.GAME_JOB_LEASE_SECONDS)
+
+
+def _renew_leases() -> None:
+    """이 프로세스가 가진(대기/실행 중) 작업의 임대를 주기적으로 연장합니다."""
+    while True:
+        time.sleep(Config.GAME_JOB_LEASE_SECONDS / 3)
+        with _events_lock:
+            job_ids = list(_local_events)
+        if not job_ids:
+            continue
+        try:
+            get_collection().update_many(
+                {"_id": {"$in": job_ids}, "status": {"$in": [STATUS_PENDING, STATUS_RUNNING]}},
+                {"$set": {"lease_expires": _lease_expires()}},
+            )
+        except Exception as e:
+            logger.warning(f"게임 준비 작업 임대 연장 실패: {e}")
+
+
+def _ensure_heartbeat() -> None:
+    global _heartbeat
+    with _events_lock:
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=_renew_leases, name="game-job-heartbeat", daemon=True)
+            _heartbeat.start()
+
+
+def _expire_if_abandoned(job: Optional[Dict]) -> Optional[Dict]:
+    """임대가 끝난 pending/running 작업(처리하던 프로세스가 죽음)을 실패로 바꿉니다."""
+    if job is None or job["status"] not in (STATUS_PENDING, STATUS_RUNNING):
+        return job
+    now = datetime.utcnow()
+    if job.get("lease_expires") is None or job["lease_expires"] >= now:
+        return job
+    expired = get_collection().find_one_and_update(
+        {"_id": job["_id"], "status": job["status"], "lease_expires": {"$lt": now}},
+        {"$set": {"status": STATUS_ERROR, "message": LEASE_EXPIRED_MESSAGE, "status_code": 503, "updated_at": now}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if expired is not None:
+        logger.warning(f"게임 준비 작업 임대 만료 ({job['_id']})")
+        metrics.incr("game_jobs.lease_expired")
+        return expired
+    return get_collection().find_one({"_id": job["_id"]})
+
+
+def submit(run_fn: Callable[[], List[dict]], **info) -> str:
+    """
+    작업을 등록하고 백그라운드에서 run_fn을 실행합니다.
+    - run_fn: quizSets를 반환하는 함수. 실패 시 message/status 속성을 가진 예외를 던질 수 있습니다.
+    - info: 작업 문서에 함께 저장할 정보(category, difficulty, keyword 등)
+    반환: job id. 대기열이 가득 차면 JobQueueFull
+    """
+    if not _slots.acquire(blocking=False):
+        metrics.incr("game_jobs.rejected")
+        raise JobQueueFull()
+    try:
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        get_collection().insert_one(dict(
+            info, _id=job_id, status=STATUS_PENDING, created_at=now, updated_at=now, lease_expires=_lease_expires()
+        ))
+    except BaseException:
+        _slots.release()
+        raise
+
+    event = threading.Event()
+    with _events_lock:
+        _local_events[job_id] = event
+    _ensure_heartbeat()
+
+    def run():
+        start = time.perf_counter()
+        try:
+            _update(job_id, {"status": STATUS_RUNNING, "started_at": datetime.utcnow(),
+                             "lease_expires": _lease_expires()})
+            quiz_sets = run_fn()
+            _update(job_id, {"status": STATUS_DONE, "quizSets": quiz_sets})
+            metrics.incr("game_jobs.done")
+        except Exception as e:
+            logger.error(f"게임 준비 작업 실패 ({job_id}): {e}")
+            _update(job_id, {
+                "status": STATUS_ERROR,
+                "message": getattr(e, "message", str(e)),
+                "status_code": getattr(e, "status", 500),
+            })
+            metrics.incr("game_jobs.error")
+        finally:
+            metrics.observe("game_jobs.run_ms", (time.perf_counter() - start) * 1000)
+            event.set()
+            with _events_lock:
+                _local_events.pop(job_id, None)
+            _slots.release()
+
+    _executor.submit(run)
+    metrics.incr("game_jobs.submitted")
+    return job_id
+
+
+def get(job_id: str) -> Optional[Dict]:
+    """작업 문서를 조회합니다. 없으면 None. 버려진 작업(임대 만료)은 실패로 바꿔 반환합니다."""
+    return _expire_if_abandoned(get_collection().find_one({"_id": job_id}))
+
+
+def wait(job_id: str, timeout: float, poll_interval: float = 0.5) -> Optional[Dict]:
+    """
+    작업이 끝나거나 timeout이 지날 때까지 기다린 뒤(long-poll) 작업 문서를 반환합니다.
+    같은 프로세스에서 실행 중이면 이벤트로, 아니면 DB 폴링으로 기다립니다.
+    """
+    timeout = max(0.0, min(timeout, MAX_WAIT_SECONDS))
+    with _events_lock:
+        event = _local_events.get(job_id)
+    if event is not None:
+        event.wait(timeout)
+        return get(job_id)
+
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get(job_id)
+        if job is None or job["status"] in (STATUS_DONE, STATUS_ERROR) or time.monotonic() >= deadline:
+            return job
+        time.sleep(poll_interval)
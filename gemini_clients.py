@@ -0,0 +1,235 @@
+# gemini_clients.py
+"""
+Gemini 클라이언트 풀 (여러 API 키 순환).
+
+- 키마다 genai.Client를 한 번만 만들어 재사용합니다 (http_client.get_genai_client).
+- GOOGLE_API_KEYS(쉼표 구분)에 여러 키를 주면 요청을 키별로 나눠 보내고, 키마다 분당 요청 한도를 둡니다.
+  (없으면 GOOGLE_API_KEY 하나만 사용)
+- 어떤 키가 쿼터 오류(429/RESOURCE_EXHAUSTED)를 내면 그 키는 잠시 쉬게 하고 다른 키로 즉시 재시도합니다.
+  모든 키가 쿼터 초과면 마지막 오류를 그대로 올려 공용 생성 실행기가 동시성을 줄이게 합니다.
+- 키별 요청/오류/쿼터 초과 수와 지연 시간은 stats()와 metrics(`gemini.key.{label}.*`)로 확인합니다.
+  (키 원문 대신 해시 앞자리를 라벨로 씁니다)
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import http_client
+import metrics
+from config import Config
+from gen_executor import is_throttle_error
+
+logger = logging.getLogger(__name__)
+
+
+def configured_keys() -> List[str]:
+    """GOOGLE_API_KEYS(쉼표 구분) 또는 GOOGLE_API_KEY에서 키 목록을 읽습니다."""
+    keys = [k.strip() for k in (Config.GOOGLE_API_KEYS or "").split(",") if k.strip()]
+    if not keys and os.getenv("GOOGLE_API_KEY"):
+        keys = [os.getenv("GOOGLE_API_KEY")]
+    return keys
+
+
+def key_label(api_key: str) -> str:
+    return "key-" + hashlib.sha1(api_key.encode("utf-8")).hexdigest()[:6]
+
+
+class KeySlot:
+    """API 키 1개의 클라이언트, 분당 요청 한도(토큰 버킷), 쿼터 초과 후 휴식 상태와 통계."""
+
+    def __init__(self, api_key: str, rate_per_minute: float, cooldown: float):
+        self.api_key = api_key
+        self.label = key_label(api_key)
+        self.capacity = max(rate_per_minute, 1.0)
+        self.tokens = self.capacity
+        self.rate = rate_per_minute / 60.0
+        self.updated = time.monotonic()
+        self.base_cooldown = cooldown
+        self.cooldown_until = 0.0
+        self.consecutive_throttles = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+    @property
+    def client(self):
+        return http_client.get_genai_client(self.api_key)
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """지금 요청을 보내려면 기다려야 하는 시간 (0이면 바로 가능)."""
+        self._refill(now)
+        if now < self.cooldown_until:
+            return self.cooldown_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else self.base_cooldown
+
+    def take(self) -> None:
+        self.tokens -= 1
+        self.in_flight += 1
+        self.requests += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "throttled": self.throttled,
+            "in_flight": self.in_flight,
+            "cooling_down": max(self.cooldown_until - time.monotonic(), 0.0),
+        }
+
+
+class GeminiClientPool:
+    """여러 API 키를 돌려 쓰는 Gemini 클라이언트 풀."""
+
+    def __init__(self, keys: List[str], rate_per_minute: float = 60.0, cooldown: float = 30.0,
+                 acquire_timeout: float = 120.0):
+        if not keys:
+            raise RuntimeError("GOOGLE_API_KEY(S) 환경변수가 설정되어 있지 않습니다.")
+        self.slots = [KeySlot(k, rate_per_minute, cooldown) for k in keys]
+        self.acquire_timeout = acquire_timeout
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, exclude) -> Tuple[Optional[KeySlot], float]:
+        """바로 쓸 수 있는 키 중 가장 한가한 키를 고릅니다. 없으면 (None, 대기 시간)."""
+        now = time.monotonic()
+        with self._lock:
+            best, wait = None, None
+            for slot in self.slots:
+                if slot in exclude:
+                    continue
+                slot_wait = slot.wait_time(now)
+                # 처리 중인 요청이 적고, 같으면 남은 한도(토큰)가 많은 키에 보내 부하를 고르게 나눕니다.
+                if slot_wait == 0 and (best is None or (slot.in_flight, -slot.tokens) < (best.in_flight, -best.tokens)):
+                    best = slot
+                elif slot_wait > 0:
+                    wait = slot_wait if wait is None else min(wait, slot_wait)
+            if best is not None:
+                best.take()
+                return best, 0.0
+            return None, wait if wait is not None else 0.0
+
+    def _acquire(self, exclude) -> Optional[KeySlot]:
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            slot, wait = self._try_acquire(exclude)
+            if slot is not None or wait == 0:
+                return slot
+            if time.monotonic() + wait > deadline:
+                raise TimeoutError("사용 가능한 Gemini API 키가 없습니다 (모두 한도 초과).")
+            metrics.incr("gemini.acquire_wait")
+            time.sleep(min(wait, 1.0))
+
+    async def _acquire_async(self, exclude) -> Optional[KeySlot]:
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            slot, wait = self._try_acquire(exclude)
+            if slot is not None or wait == 0:
+                return slot
+            if time.monotonic() + wait > deadline:
+                raise TimeoutError("사용 가능한 Gemini API 키가 없습니다 (모두 한도 초과).")
+            metrics.incr("gemini.acquire_wait")
+            await asyncio.sleep(min(wait, 1.0))
+
+    def _finish(self, slot: KeySlot, elapsed_ms: float, error: Optional[BaseException]) -> bool:
+        """요청 결과를 기록합니다. 쿼터 오류라 다른 키로 재시도해야 하면 True."""
+        prefix = f"gemini.key.{slot.label}"
+        metrics.observe(f"{prefix}.latency_ms", elapsed_ms)
+        metrics.incr(f"{prefix}.requests")
+        with self._lock:
+            slot.in_flight -= 1
+            if error is None:
+                slot.consecutive_throttles = 0
+                return False
+            if not is_throttle_error(error):
+                slot.errors += 1
+                metrics.incr(f"{prefix}.errors")
+                return False
+            slot.throttled += 1
+            slot.consecutive_throttles += 1
+            # 연속으로 쿼터 초과가 나면 휴식 시간을 늘립니다 (최대 10배).
+            cooldown = slot.base_cooldown * min(2 ** (slot.consecutive_throttles - 1), 10)
+            slot.cooldown_until = time.monotonic() + cooldown
+        metrics.incr(f"{prefix}.throttled")
+        logger.warning(f"Gemini 키 {slot.label} 쿼터 초과 - {cooldown:.0f}초 휴식 후 재사용, 다른 키로 전환")
+        return True
+
+    def generate_content(self, **kwargs):
+        """client.models.generate_content를 키를 돌려가며 호출합니다 (쿼터 오류 시 다른 키로 재시도)."""
+        tried = set()
+        last_error: Optional[BaseException] = None
+        while len(tried) < len(self.slots):
+            slot = self._acquire(tried)
+            if slot is None:
+                break
+            tried.add(slot)
+            start = time.perf_counter()
+            try:
+                response = slot.client.models.generate_content(**kwargs)
+            except Exception as e:
+                if not self._finish(slot, (time.perf_counter() - start) * 1000, e):
+                    raise
+                last_error = e
+                continue
+            self._finish(slot, (time.perf_counter() - start) * 1000, None)
+            return response
+        raise last_error or RuntimeError("사용 가능한 Gemini API 키가 없습니다.")
+
+    async def generate_content_async(self, **kwargs):
+        """generate_content의 비동기 버전 (client.aio 사용)."""
+        tried = set()
+        last_error: Optional[BaseException] = None
+        while len(tried) < len(self.slots):
+            slot = await self._acquire_async(tried)
+            if slot is None:
+                break
+            tried.add(slot)
+            start = time.perf_counter()
+            try:
+                response = await slot.client.aio.models.generate_content(**kwargs)
+            except Exception as e:
+                if not self._finish(slot, (time.perf_counter() - start) * 1000, e):
+                    raise
+                last_error = e
+                continue
+            except asyncio.CancelledError:
+                self._finish(slot, (time.perf_counter() - start) * 1000, None)
+                raise
+            self._finish(slot, (time.perf_counter() - start) * 1000, None)
+            return response
+        raise last_error or RuntimeError("사용 가능한 Gemini API 키가 없습니다.")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {slot.label: slot.stats() for slot in self.slots}
+
+
+_pool: Optional[GeminiClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> GeminiClientPool:
+    """프로세스 공용 Gemini 클라이언트 풀. 키가 하나도 없으면 RuntimeError."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = GeminiClientPool(
+                configured_keys(),
+                rate_per_minute=Config.GEMINI_KEY_RPM,
+                cooldown=Config.GEMINI_KEY_COOLDOWN,
+            )
+        return _pool
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """키별 통계 (풀이 아직 만들어지지 않았으면 빈 dict)."""
+    return _pool.stats() if _pool is not None else {}
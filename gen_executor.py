@@ -0,0 +1,206 @@
+# gen_executor.py
+"""
+프로세스 공용 이미지 생성 실행기.
+
+요청마다 ThreadPoolExecutor를 새로 만드는 대신, 프로세스 전체에서 하나의 실행기가
+Gemini 동시 호출 수를 제한합니다.
+- 공정 분배: 작업은 요청(batch)별 큐에 쌓이고 라운드로빈으로 꺼내므로 큰 요청이 작은 요청을 굶기지 않습니다.
+- 적응형 동시성(AIMD): 지연이 목표 이내로 성공하면 한도를 조금씩 올리고,
+  429(쿼터 초과)나 목표 지연 초과 시 한도를 배수로 줄입니다.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import metrics
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    """Gemini 쿼터/속도 제한(429) 오류인지 판별합니다."""
+    for attr in ("code", "status_code"):
+        if getattr(exc, attr, None) == 429:
+            return True
+    return "RESOURCE_EXHAUSTED" in str(exc)
+
+
+class GenerationExecutor:
+    """요청별 공정 분배와 AIMD 동시성 제어를 하는 공용 실행기."""
+
+    def __init__(
+        self,
+        max_limit: int = 32,
+        min_limit: int = 1,
+        initial_limit: Optional[int] = None,
+        target_latency: float = 30.0,
+        decrease_factor: float = 0.5,
+        latency_decrease_factor: float = 0.9,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.latency_decrease_factor = latency_decrease_factor
+        self._limit = float(initial_limit or max(min_limit, max_limit // 4))
+
+        self._cond = threading.Condition()
+        self._queues: "OrderedDict[str, Deque[Tuple[Future, Callable, tuple, dict]]]" = OrderedDict()
+        self._batch_in_flight: Dict[str, int] = {}
+        self._batch_caps: Dict[str, Optional[int]] = {}
+        self._queued = 0
+        self._in_flight = 0
+        self._workers = []
+        self._shutdown = False
+
+    # --- 공개 API ---
+    def submit(self, fn: Callable, *args, batch: str = "default", max_in_flight: Optional[int] = None, **kwargs) -> Future:
+        """
+        작업을 batch 큐에 넣고 Future를 반환합니다.
+        - batch: 공정 분배 단위 (보통 요청 1건)
+        - max_in_flight: 이 batch가 동시에 실행할 수 있는 최대 작업 수
+        """
+        future: Future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("생성 실행기가 종료되었습니다.")
+            self._ensure_workers_locked()
+            queue = self._queues.get(batch)
+            if queue is None:
+                queue = self._queues[batch] = deque()
+                self._batch_in_flight.setdefault(batch, 0)
+            self._batch_caps[batch] = max_in_flight
+            queue.append((future, fn, args, kwargs))
+            self._queued += 1
+            self._publish_locked()
+            self._cond.notify()
+        return future
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "queue_depth": self._queued,
+                "batches": len(self._queues),
+            }
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+
+    # --- 내부 구현 ---
+    def _ensure_workers_locked(self) -> None:
+        while len(self._workers) < self.max_limit:
+            worker = threading.Thread(target=self._worker, name=f"gen-exec-{len(self._workers)}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _publish_locked(self) -> None:
+        metrics.set_gauge("gen_executor.limit", int(self._limit))
+        metrics.set_gauge("gen_executor.in_flight", self._in_flight)
+        metrics.set_gauge("gen_executor.queue_depth", self._queued)
+
+    def _next_task_locked(self):
+        """batch 들을 라운드로빈으로 돌며 실행 가능한 작업 하나를 꺼냅니다."""
+        if self._in_flight >= int(self._limit):
+            return None
+        for batch in list(self._queues.keys()):
+            cap = self._batch_caps.get(batch)
+            if cap is not None and self._batch_in_flight.get(batch, 0) >= cap:
+                continue
+            queue = self._queues[batch]
+            task = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(batch)
+            else:
+                del self._queues[batch]
+            return batch, task
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                item = self._next_task_locked()
+                while item is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    item = self._next_task_locked()
+                batch, (future, fn, args, kwargs) = item
+                if not future.set_running_or_notify_cancel():
+                    self._cleanup_batch_locked(batch)
+                    self._publish_locked()
+                    self._cond.notify()
+                    continue
+                self._in_flight += 1
+                self._batch_in_flight[batch] = self._batch_in_flight.get(batch, 0) + 1
+                self._publish_locked()
+
+            start = time.monotonic()
+            error: Optional[BaseException] = None
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                error = e
+            # 지연은 fn 실행 시간만 잽니다. 완료 콜백(예: 업로드 큐 배압 대기)은 이 스레드에서 돌지만
+            # Gemini 지연이 아니므로 AIMD 조정에 넣지 않습니다 (슬롯은 콜백이 끝날 때까지 점유 = 배압 유지).
+            latency = time.monotonic() - start
+            throttled = error is not None and is_throttle_error(error)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+            with self._cond:
+                self._in_flight -= 1
+                self._batch_in_flight[batch] -= 1
+                self._cleanup_batch_locked(batch)
+                self._adjust_locked(latency, throttled)
+                self._publish_locked()
+                self._cond.notify_all()
+
+    def _cleanup_batch_locked(self, batch: str) -> None:
+        if batch not in self._queues and not self._batch_in_flight.get(batch):
+            self._batch_in_flight.pop(batch, None)
+            self._batch_caps.pop(batch, None)
+
+    def _adjust_locked(self, latency: float, throttled: bool) -> None:
+        """AIMD: 성공 시 +1/limit (한도당 약 +1), 429 시 x decrease_factor, 지연 초과 시 x latency_decrease_factor."""
+        metrics.observe("gen_executor.latency_ms", latency * 1000)
+        if throttled:
+            self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+            metrics.incr("gen_executor.throttled")
+            logger.warning(f"Gemini 429 감지: 동시성 한도 {self._limit:.1f}로 감소")
+        elif latency > self.target_latency:
+            self._limit = max(self.min_limit, self._limit * self.latency_decrease_factor)
+        else:
+            self._limit = min(self.max_limit, self._limit + 1.0 / max(self._limit, 1.0))
+
+
+_executor: Optional[GenerationExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> GenerationExecutor:
+    """Config 설정으로 만든 프로세스 공용 실행기를 반환합니다."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = GenerationExecutor(
+                max_limit=Config.GEN_MAX_CONCURRENCY,
+                min_limit=Config.GEN_MIN_CONCURRENCY,
+                initial_limit=Config.GEN_INITIAL_CONCURRENCY,
+                target_latency=Config.GEN_TARGET_LATENCY,
+            )
+        return _executor
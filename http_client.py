@@ -0,0 +1,140 @@
+# http_client.py
+"""
+외부 HTTP 호출 공용 계층.
+
+호스트별로 keep-alive 세션(커넥션 풀)을 재사용하고, 연결/읽기 타임아웃과
+지터가 섞인 재시도 정책을 일괄 적용합니다. Pixabay 등 모든 외부 이미지 공급자 호출은
+`http_client.get()`을 거치고, Gemini 클라이언트도 여기서 API 키별로 재사용합니다.
+"""
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+from config import Config
+
+_sessions: Dict[str, requests.Session] = {}
+_genai_clients: Dict[str, object] = {}
+_lock = threading.Lock()
+
+
+def _parse_pool_sizes(spec: str) -> Dict[str, int]:
+    """'pixabay.com=20,example.com=5' 형태의 설정을 {host: size}로 변환합니다."""
+    sizes = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        host, _, size = item.partition("=")
+        if size:
+            sizes[host.strip()] = int(size)
+    return sizes
+
+
+_pool_sizes = _parse_pool_sizes(Config.HTTP_POOL_SIZES)
+
+
+def _timeout() -> Tuple[float, float]:
+    return Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT
+
+
+def _make_session(host: str) -> requests.Session:
+    pool_size = _pool_sizes.get(host, Config.HTTP_POOL_SIZE)
+    retry = Retry(
+        total=Config.HTTP_RETRIES,
+        connect=Config.HTTP_RETRIES,
+        read=Config.HTTP_RETRIES,
+        status_forcelist=(429, 500, 502, 503, 504),
+        backoff_factor=Config.HTTP_BACKOFF_FACTOR,
+        backoff_jitter=Config.HTTP_BACKOFF_JITTER,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry, pool_block=False)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """URL 호스트에 해당하는 공용 세션을 반환합니다 (없으면 생성)."""
+    host = urlsplit(url).hostname or ""
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = _make_session(host)
+            metrics.incr("http.sessions_created")
+        return session
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """공용 세션으로 요청합니다. timeout을 주지 않으면 설정된 (connect, read) 타임아웃을 사용합니다."""
+    kwargs.setdefault("timeout", _timeout())
+    host = urlsplit(url).hostname or ""
+    with metrics.timer(f"http.{host}.request_ms"):
+        try:
+            response = get_session(url).request(method, url, **kwargs)
+        except requests.RequestException:
+            metrics.incr(f"http.{host}.error")
+            raise
+    metrics.incr(f"http.{host}.status_{response.status_code}")
+    return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def get_genai_client(api_key: str):
+    """
+    API 키별로 genai.Client를 한 번만 만들어 재사용합니다.
+    (클라이언트 내부 HTTP 커넥션 풀이 유지되어 이미지마다 TLS 핸드셰이크를 반복하지 않습니다.)
+    """
+    from google import genai
+    from google.genai import types
+
+    with _lock:
+        client = _genai_clients.get(api_key)
+        if client is None:
+            client = genai.Client(
+                api_key=api_key,
+                http_options=types.HttpOptions(timeout=int(Config.GEMINI_TIMEOUT * 1000)),
+            )
+            _genai_clients[api_key] = client
+            metrics.incr("http.genai_clients_created")
+        return client
+
+
+def pool_stats() -> Dict[str, Dict[str, Optional[int]]]:
+    """
+    호스트별 커넥션 풀 사용 현황.
+    - handshakes: 새로 연결한 횟수 (HTTPS의 경우 TLS 핸드셰이크 수)
+    - requests: 풀을 통해 보낸 요청 수
+    - in_use / max_size: 현재 대여 중인 커넥션 수 / 풀 크기
+    """
+    stats = {}
+    with _lock:
+        sessions = list(_sessions.items())
+    for host, session in sessions:
+        adapter = session.get_adapter("https://")
+        pools = adapter.poolmanager.pools
+        handshakes = requests_sent = in_use = 0
+        max_size = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            handshakes += pool.num_connections
+            requests_sent += pool.num_requests
+            if pool.pool is not None:
+                max_size += pool.pool.maxsize
+                in_use += pool.pool.maxsize - pool.pool.qsize()
+        stats[host] = {
+            "handshakes": handshakes,
+            "requests": requests_sent,
+            "in_use": in_use,
+            "max_size": max_size or _pool_sizes.get(host, Config.HTTP_POOL_SIZE),
+        }
+    return stats
@@ -0,0 +1,174 @@
+# image_service.py
+"""
+프로세스 풀 기반 이미지 처리(디코딩/리사이즈/인코딩) 서비스.
+
+PIL 작업을 네트워크 I/O 스레드와 같은 프로세스에서 돌리면 GIL을 두고 경쟁하므로,
+전용 프로세스 풀에서 실행합니다. 입력/출력 바이트는 pickle로 넘기지 않고 공유 메모리로 주고받습니다.
+- 호출 측이 입력용/출력용 SharedMemory를 만들고, 워커는 이름으로 붙어서 읽고/쓰기만 합니다.
+  (생성과 해제(unlink)는 모두 호출 측에서 하므로 세그먼트가 새지 않습니다.)
+- 결과가 출력 세그먼트보다 크면 그때만 일반 반환값(pickle)으로 돌려받습니다.
+
+크롤러(변형본/transform)와 썸네일 엔드포인트가 같은 서비스(get_service())를 사용합니다.
+"""
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+from PIL import Image
+
+import image_utils
+import metrics
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 출력 세그먼트 크기 = 입력 크기 + 여유분 (리사이즈/재인코딩 결과는 보통 원본 PNG보다 작습니다)
+_OUTPUT_SLACK = 1 << 20
+
+# (offset, length) 또는 세그먼트에 못 담은 경우 bytes
+_Chunk = Union[Tuple[int, int], bytes]
+
+
+def _open(buf: memoryview) -> Image.Image:
+    """buf에서 이미지를 완전히 읽어들입니다. 반환 후에는 buf를 참조하지 않습니다."""
+    with image_utils.BufferReader(buf) as reader:
+        img = Image.open(reader)
+        img.load()
+    return img
+
+
+def _encode(img: Image.Image, fmt: str, quality: int) -> bytes:
+    if fmt in ("jpeg", "webp", "avif") and img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    if fmt == "jpeg" and img.mode == "RGBA":
+        img = img.convert("RGB")
+    out = BytesIO()
+    img.save(out, format=fmt.upper(), quality=quality)
+    return out.getvalue()
+
+
+def _resize(img: Image.Image, width: Optional[int]) -> Image.Image:
+    if not width or width >= img.width:
+        return img
+    height = max(1, round(img.height * width / img.width))
+    return img.resize((width, height), Image.LANCZOS)
+
+
+def _write_outputs(out_name: str, capacity: int, outputs: Sequence[bytes]) -> List[_Chunk]:
+    """결과들을 출력 세그먼트에 차례로 씁니다. 자리가 모자라면 남은 결과는 bytes 그대로 반환합니다."""
+    shm = shared_memory.SharedMemory(name=out_name)
+    try:
+        chunks: List[_Chunk] = []
+        offset = 0
+        for data in outputs:
+            if offset + len(data) <= capacity:
+                shm.buf[offset:offset + len(data)] = data
+                chunks.append((offset, len(data)))
+                offset += len(data)
+            else:
+                chunks.append(data)
+        return chunks
+    finally:
+        shm.close()
+
+
+def _run_job(in_name: str, in_size: int, out_name: str, capacity: int, job: tuple) -> List[_Chunk]:
+    """[워커 프로세스] 입력 세그먼트에서 이미지를 읽어 job을 실행하고 출력 세그먼트에 씁니다."""
+    shm = shared_memory.SharedMemory(name=in_name)
+    view = shm.buf[:in_size]
+    try:
+        img = _open(view)
+    finally:
+        view.release()
+        shm.close()
+
+    kind = job[0]
+    if kind == "transcode":
+        _, width, fmt, quality = job
+        outputs = [_encode(_resize(img, width), fmt, quality)]
+    elif kind == "variants":
+        _, widths, fmt, quality = job
+        outputs = [_encode(_resize(img, width), fmt, quality) for width in widths if width < img.width]
+    elif kind == "apply":
+        _, fn, fmt, quality = job
+        outputs = [_encode(fn(img), fmt, quality)]
+    else:
+        raise ValueError(f"알 수 없는 작업: {kind}")
+    return _write_outputs(out_name, capacity, outputs)
+
+
+class ImageService:
+    """프로세스 풀 + 공유 메모리로 이미지를 변환하는 서비스."""
+
+    def __init__(self, processes: int = 2):
+        self.processes = processes
+        self._pool = ProcessPoolExecutor(max_workers=processes)
+
+    def _submit(self, data: image_utils.BufferLike, job: tuple) -> List[bytes]:
+        view = memoryview(data).cast("B")
+        size = len(view)
+        capacity = size + _OUTPUT_SLACK
+        shm_in = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        shm_out = shared_memory.SharedMemory(create=True, size=capacity)
+        try:
+            shm_in.buf[:size] = view
+            with metrics.timer(f"image_service.{job[0]}_ms"):
+                try:
+                    chunks = self._pool.submit(_run_job, shm_in.name, size, shm_out.name, capacity, job).result()
+                except BrokenProcessPool:
+                    # 워커가 비정상 종료되면 풀 전체가 못 쓰게 되므로 새 풀로 교체합니다.
+                    logger.error("이미지 처리 프로세스 풀이 중단되어 다시 만듭니다.")
+                    metrics.incr("image_service.pool_restarted")
+                    self._pool = ProcessPoolExecutor(max_workers=self.processes)
+                    raise
+            results = []
+            for chunk in chunks:
+                if isinstance(chunk, bytes):
+                    metrics.incr("image_service.pickled_output")
+                    results.append(chunk)
+                else:
+                    offset, length = chunk
+                    results.append(bytes(shm_out.buf[offset:offset + length]))
+            return results
+        finally:
+            for shm in (shm_in, shm_out):
+                shm.close()
+                shm.unlink()
+
+    def transcode(self, data: image_utils.BufferLike, width: Optional[int] = None,
+                  fmt: str = "webp", quality: int = 80) -> bytes:
+        """width 이하로 줄이고(원본이 더 작으면 유지) fmt로 인코딩합니다."""
+        return self._submit(data, ("transcode", width, fmt, quality))[0]
+
+    def variants(self, data: image_utils.BufferLike, widths: Sequence[int],
+                 fmt: str = "webp", quality: int = 80) -> List[Tuple[int, bytes]]:
+        """원본보다 작은 각 너비의 변형본을 만듭니다. 반환: [(width, bytes), ...]"""
+        widths = tuple(sorted(widths))
+        outputs = self._submit(data, ("variants", widths, fmt, quality))
+        # 워커는 원본보다 작은 너비만 만들므로 앞에서부터 짝지어집니다.
+        return list(zip(widths, outputs))
+
+    def apply(self, data: image_utils.BufferLike, fn: Callable[[Image.Image], Image.Image],
+              fmt: str = "png", quality: int = 95) -> bytes:
+        """PIL 변환 함수 fn을 적용해 인코딩합니다. fn은 모듈 최상위 함수처럼 pickle 가능해야 합니다."""
+        return self._submit(data, ("apply", fn, fmt, quality))[0]
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_service: Optional[ImageService] = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> ImageService:
+    """프로세스 공용 이미지 처리 서비스 (IMAGE_SERVICE_PROCESSES개 프로세스)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ImageService(processes=Config.IMAGE_SERVICE_PROCESSES)
+        return _service
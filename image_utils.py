@@ -0,0 +1,115 @@
+# image_utils.py
+"""
+이미지 바이트 처리 헬퍼.
+
+- sniff_format: 매직 바이트로 이미지 포맷을 판별 (디코딩 없이)
+- BufferReader: bytes/memoryview를 복사 없이 파일 객체처럼 읽게 해주는 래퍼 (S3 업로드용)
+- content_type_for_key: 객체 키 확장자로 Content-Type 추정
+"""
+import io
+from typing import Optional, Union
+
+BufferLike = Union[bytes, bytearray, memoryview]
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "gif": "image/gif",
+    "avif": "image/avif",
+}
+
+EXTENSIONS = {
+    "png": "png",
+    "jpeg": "jpg",
+    "webp": "webp",
+    "gif": "gif",
+    "avif": "avif",
+}
+
+# 확장자 -> Content-Type (기존 객체 메타데이터 보정용)
+EXTENSION_CONTENT_TYPES = {ext: CONTENT_TYPES[fmt] for fmt, ext in EXTENSIONS.items()}
+EXTENSION_CONTENT_TYPES["jpeg"] = CONTENT_TYPES["jpeg"]
+
+
+def content_type_for_key(key: str) -> Optional[str]:
+    """객체 키의 확장자로 Content-Type을 추정합니다. 알 수 없으면 None."""
+    _, dot, ext = key.rpartition(".")
+    return EXTENSION_CONTENT_TYPES.get(ext.lower()) if dot else None
+
+
+def sniff_format(data: BufferLike) -> Optional[str]:
+    """앞부분 매직 바이트만 보고 포맷을 판별합니다. 알 수 없으면 None."""
+    head = bytes(memoryview(data)[:16])
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return "avif"
+    return None
+
+
+class BufferReader(io.RawIOBase):
+    """
+    memoryview 위에서 동작하는 읽기 전용 파일 객체.
+    BytesIO(data)와 달리 전체 버퍼를 미리 복사하지 않고, 읽는 쪽이 요청한 조각만 넘겨줍니다.
+    """
+
+    def __init__(self, data: BufferLike):
+        super().__init__()
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        remaining = len(self._view) - self._pos
+        if remaining <= 0:
+            return 0
+        target = memoryview(buffer).cast("B")
+        size = min(len(target), remaining)
+        target[:size] = self._view[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self._view) - self._pos
+        chunk = self._view[self._pos:self._pos + size]
+        self._pos += len(chunk)
+        return chunk.tobytes()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"잘못된 whence 값: {whence}")
+        if pos < 0:
+            raise ValueError("음수 위치로 이동할 수 없습니다.")
+        self._pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        # 공유 메모리처럼 뷰가 남아 있으면 닫을 수 없는 버퍼를 위해 뷰를 명시적으로 해제합니다.
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+    def __len__(self) -> int:
+        return len(self._view)
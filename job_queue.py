@@ -0,0 +1,379 @@
+# job_queue.py
+"""
+영속 이미지 생성 작업 큐.
+
+작업 1건 = 프롬프트 1개로 이미지 생성. 작업 문서는 MongoDB `generation_jobs` 컬렉션에 저장되므로
+워커 프로세스가 죽었다 다시 떠도 남은 작업부터 이어서 처리합니다.
+- enqueue: 멱등 키(idempotency key)가 같으면 다시 넣어도 작업이 하나만 생깁니다.
+- lease: 워커가 작업을 일정 시간 임대합니다. 임대가 만료되면(워커 중단) 다른 워커가 다시 가져갑니다.
+- fail: 지수 백오프(+지터) 후 재시도, max_attempts를 넘으면 'failed'로 남깁니다.
+  fail()을 부르지 못하고 워커가 죽어 임대가 만료된 작업도 시도 횟수를 다 썼으면 다시 임대하지 않고 'failed'로 옮깁니다.
+
+상태: pending -> leased -> done / (pending 재시도) / failed
+테스트나 로컬 실행용으로 같은 인터페이스의 InMemoryJobQueue도 제공합니다.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import metrics
+from config import Config
+from extensions import get_db
+
+logger = logging.getLogger(__name__)
+
+JOB_COLLECTION = "generation_jobs"
+STATUSES = ("pending", "leased", "done", "failed")
+LEASE_EXPIRED_ERROR = "임대 만료 (워커 중단)"
+
+
+def backoff_seconds(attempts: int, base: float, cap: float) -> float:
+    """attempts번째 실패 후 다음 시도까지 기다릴 시간 (지수 백오프, full jitter)."""
+    return random.uniform(0, min(cap, base * (2 ** max(attempts - 1, 0))))
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class MongoJobQueue:
+    """MongoDB 컬렉션 기반 작업 큐."""
+
+    def __init__(
+        self,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 5,
+        backoff_base: float = 10.0,
+        backoff_max: float = 600.0,
+        collection_name: str = JOB_COLLECTION,
+    ):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.collection_name = collection_name
+        self._indexes_ready = False
+
+    def _collection(self):
+        collection = get_db()[self.collection_name]
+        if not self._indexes_ready:
+            collection.create_index([("status", ASCENDING), ("available_at", ASCENDING)])
+            collection.create_index([("status", ASCENDING), ("lease_expires", ASCENDING)])
+            self._indexes_ready = True
+        return collection
+
+    def enqueue(self, prompt: str, category: str, idempotency_key: Optional[str] = None, **extra) -> str:
+        """작업을 추가하고 작업 ID를 반환합니다. 같은 멱등 키의 작업이 이미 있으면 그 ID를 반환합니다."""
+        job_id = idempotency_key or uuid.uuid4().hex
+        now = datetime.utcnow()
+        try:
+            self._collection().insert_one(dict(
+                extra,
+                _id=job_id,
+                prompt=prompt,
+                category=category,
+                status="pending",
+                attempts=0,
+                available_at=now,
+                created_at=now,
+                updated_at=now,
+                result_keys=[],
+            ))
+            metrics.incr("job_queue.enqueued")
+        except DuplicateKeyError:
+            metrics.incr("job_queue.deduplicated")
+        return job_id
+
+    def _fail_exhausted(self, now: datetime) -> int:
+        """임대가 만료됐고 시도 횟수를 다 쓴 작업을 'failed'로 옮깁니다."""
+        result = self._collection().update_many(
+            {"status": "leased", "lease_expires": {"$lt": now}, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"status": "failed", "last_error": LEASE_EXPIRED_ERROR, "updated_at": now, "finished_at": now},
+             "$unset": {"lease_owner": "", "lease_expires": ""}},
+        )
+        if result.modified_count:
+            metrics.incr("job_queue.failed", result.modified_count)
+        return result.modified_count
+
+    def lease(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """실행 가능한 작업 1건을 임대합니다. 없으면 None."""
+        now = datetime.utcnow()
+        self._fail_exhausted(now)
+        job = self._collection().find_one_and_update(
+            {"attempts": {"$lt": self.max_attempts}, "$or": [
+                {"status": "pending", "available_at": {"$lte": now}},
+                # 임대한 워커가 죽어 만료된 작업은 다시 가져옵니다.
+                {"status": "leased", "lease_expires": {"$lt": now}},
+            ]},
+            {
+                "$set": {
+                    "status": "leased",
+                    "lease_owner": worker_id,
+                    "lease_expires": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("available_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is not None:
+            metrics.incr("job_queue.leased")
+        return job
+
+    def extend(self, job_id: str, worker_id: str) -> bool:
+        """임대 시간을 연장합니다. 이미 다른 워커에게 넘어갔으면 False."""
+        result = self._collection().update_one(
+            {"_id": job_id, "status": "leased", "lease_owner": worker_id},
+            {"$set": {"lease_expires": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+        )
+        return result.modified_count == 1
+
+    def complete(self, job_id: str, worker_id: str, result_keys: List[str]) -> bool:
+        now = datetime.utcnow()
+        result = self._collection().update_one(
+            {"_id": job_id, "status": "leased", "lease_owner": worker_id},
+            {"$set": {"status": "done", "result_keys": result_keys, "updated_at": now, "finished_at": now},
+             "$unset": {"lease_owner": "", "lease_expires": ""}},
+        )
+        if result.modified_count == 1:
+            metrics.incr("job_queue.done")
+        return result.modified_count == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> Optional[str]:
+        """실패를 기록하고 새 상태('pending' 재시도 예정 또는 'failed')를 반환합니다."""
+        collection = self._collection()
+        job = collection.find_one({"_id": job_id, "status": "leased", "lease_owner": worker_id}, {"attempts": 1})
+        if job is None:
+            return None
+        now = datetime.utcnow()
+        if job["attempts"] >= self.max_attempts:
+            update = {"status": "failed", "last_error": error, "updated_at": now, "finished_at": now}
+        else:
+            delay = backoff_seconds(job["attempts"], self.backoff_base, self.backoff_max)
+            update = {"status": "pending", "last_error": error, "updated_at": now,
+                      "available_at": now + timedelta(seconds=delay)}
+        collection.update_one(
+            {"_id": job_id, "lease_owner": worker_id},
+            {"$set": update, "$unset": {"lease_owner": "", "lease_expires": ""}},
+        )
+        metrics.incr(f"job_queue.{'failed' if update['status'] == 'failed' else 'retried'}")
+        return update["status"]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._collection().find_one({"_id": job_id})
+
+    def stats(self) -> Dict[str, int]:
+        counts = {status: 0 for status in STATUSES}
+        for row in self._collection().aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+
+class InMemoryJobQueue:
+    """MongoJobQueue와 같은 인터페이스의 프로세스 내 작업 큐 (테스트/로컬 실행용, 영속성 없음)."""
+
+    def __init__(
+        self,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 5,
+        backoff_base: float = 10.0,
+        backoff_max: float = 600.0,
+    ):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, prompt: str, category: str, idempotency_key: Optional[str] = None, **extra) -> str:
+        job_id = idempotency_key or uuid.uuid4().hex
+        now = datetime.utcnow()
+        with self._lock:
+            if job_id not in self._jobs:
+                self._jobs[job_id] = dict(
+                    extra, _id=job_id, prompt=prompt, category=category, status="pending", attempts=0,
+                    available_at=now, created_at=now, updated_at=now, result_keys=[],
+                )
+        return job_id
+
+    def lease(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        with self._lock:
+            for job in self._jobs.values():
+                if (job["status"] == "leased" and job["lease_expires"] < now
+                        and job["attempts"] >= self.max_attempts):
+                    job.pop("lease_owner", None)
+                    job.pop("lease_expires", None)
+                    job.update(status="failed", last_error=LEASE_EXPIRED_ERROR, updated_at=now)
+            ready = [
+                job for job in self._jobs.values()
+                if job["attempts"] < self.max_attempts and (
+                    (job["status"] == "pending" and job["available_at"] <= now)
+                    or (job["status"] == "leased" and job["lease_expires"] < now)
+                )
+            ]
+            if not ready:
+                return None
+            job = min(ready, key=lambda j: j["available_at"])
+            job.update(
+                status="leased", lease_owner=worker_id, updated_at=now,
+                lease_expires=now + timedelta(seconds=self.lease_seconds), attempts=job["attempts"] + 1,
+            )
+            return dict(job)
+
+    def _owned(self, job_id: str, worker_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job and job["status"] == "leased" and job.get("lease_owner") == worker_id:
+            return job
+        return None
+
+    def extend(self, job_id: str, worker_id: str) -> bool:
+        with self._lock:
+            job = self._owned(job_id, worker_id)
+            if job:
+                job["lease_expires"] = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+            return job is not None
+
+    def complete(self, job_id: str, worker_id: str, result_keys: List[str]) -> bool:
+        with self._lock:
+            job = self._owned(job_id, worker_id)
+            if job:
+                job.update(status="done", result_keys=result_keys, updated_at=datetime.utcnow())
+                job.pop("lease_owner", None)
+                job.pop("lease_expires", None)
+            return job is not None
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> Optional[str]:
+        with self._lock:
+            job = self._owned(job_id, worker_id)
+            if job is None:
+                return None
+            now = datetime.utcnow()
+            job.pop("lease_owner", None)
+            job.pop("lease_expires", None)
+            job.update(last_error=error, updated_at=now)
+            if job["attempts"] >= self.max_attempts:
+                job["status"] = "failed"
+            else:
+                delay = backoff_seconds(job["attempts"], self.backoff_base, self.backoff_max)
+                job.update(status="pending", available_at=now + timedelta(seconds=delay))
+            return job["status"]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self) -> Dict[str, int]:
+        counts = {status: 0 for status in STATUSES}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+        return counts
+
+
+class JobWorker:
+    """
+    작업 큐를 소비하는 워커. concurrency개의 스레드가 각자 작업을 임대해 handler(job)를 실행합니다.
+    - handler: 작업 문서를 받아 생성된 S3 키 목록을 반환 (예외 시 백오프 후 재시도)
+    - 처리 중에는 임대를 주기적으로 연장하므로, 오래 걸리는 생성도 다른 워커에게 중복 할당되지 않습니다.
+    """
+
+    def __init__(
+        self,
+        queue,
+        handler: Callable[[Dict[str, Any]], List[str]],
+        concurrency: int = 4,
+        poll_interval: float = 2.0,
+        worker_id: Optional[str] = None,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or default_worker_id()
+        self._stop = threading.Event()
+
+    def process_one(self) -> bool:
+        """작업 1건을 처리합니다. 처리할 작업이 없었으면 False."""
+        job = self.queue.lease(self.worker_id)
+        if job is None:
+            return False
+
+        job_id = job["_id"]
+        done = threading.Event()
+
+        def keep_leased():
+            while not done.wait(self.queue.lease_seconds / 3):
+                if not self.queue.extend(job_id, self.worker_id):
+                    return
+
+        threading.Thread(target=keep_leased, name=f"lease-{job_id}", daemon=True).start()
+        try:
+            keys = self.handler(job)
+        except Exception as e:
+            status = self.queue.fail(job_id, self.worker_id, str(e))
+            logger.warning(f"[job] {job_id} 실패 ({job['attempts']}회차) -> {status}: {e}")
+        else:
+            self.queue.complete(job_id, self.worker_id, keys)
+            logger.info(f"[job] {job_id} 완료: {len(keys)}장")
+        finally:
+            done.set()
+        return True
+
+    def run_until_empty(self) -> None:
+        """지금 실행 가능한 작업이 없어질 때까지 처리하고 반환합니다."""
+        threads = [
+            threading.Thread(target=self._drain, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _drain(self) -> None:
+        while not self._stop.is_set() and self.process_one():
+            pass
+
+    def run_forever(self) -> None:
+        threads = [
+            threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if not self.process_one():
+                    self._stop.wait(self.poll_interval)
+            except Exception as e:
+                logger.error(f"작업 워커 오류: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def from_config() -> MongoJobQueue:
+    """Config 설정으로 작업 큐를 만듭니다."""
+    return MongoJobQueue(
+        lease_seconds=Config.JOB_LEASE_SECONDS,
+        max_attempts=Config.JOB_MAX_ATTEMPTS,
+        backoff_base=Config.JOB_BACKOFF_BASE,
+        backoff_max=Config.JOB_BACKOFF_MAX,
+    )
@@ -0,0 +1,461 @@
+# maintenance.py
+"""
+저장소(S3/로컬) `generated/` 객체 유지보수 도구.
+
+- backfill-metadata: 기존 객체의 Content-Type / Cache-Control을 제자리 복사(copy_object, MetadataDirective=REPLACE)로
+  보정합니다. 이미 올바른 객체는 건너뛰고, 여러 객체를 병렬로 처리합니다.
+- backfill-variants: 변형본이 없는 카탈로그 이미지의 크기별 변형본을 만듭니다.
+- rekey: 예전 형식(`{slug}-{ts}-{uuid8}-{idx}.png`)의 이미지를 내용 해시 키로 옮기고,
+  저장된 quizSets(scores, quiz_pool)의 URL을 새 키로 바꿉니다.
+  옛 키 -> 새 키 대응은 카탈로그 문서의 `aliases`에 남기므로 중단 후 다시 실행해도 이어서 진행됩니다.
+  옛 객체는 지우지 않습니다. reconcile은 aliases에 있는 옛 키를 다시 등록하지 않고, gc가 참조 없는 객체로 정리합니다.
+- build-pack: 카테고리 퀴즈 이미지를 팩 파일({PACK_DIR}/{category}.pack)로 묶습니다 (packfile 참고).
+  팩 이름으로 쓸 수 없는 카테고리(공백이 든 나만퀴 키워드 등)는 경고만 남기고 건너뜁니다.
+- gc: `generated/`, `variants/` 아래에서 카탈로그와 저장된 quizSets 어디에서도 참조하지 않는 객체,
+  0바이트/디코딩 불가 객체를 찾아 묶음 삭제(delete_objects 1000개 단위)합니다.
+  카탈로그 도입 전에 올라간 이미지는 카탈로그에 없으므로, 삭제 대상을 고르기 전에 항상 catalog.reconcile로
+  저장소와 카탈로그를 먼저 동기화합니다 (건너뛰면 첫 gc가 기존 이미지 전체를 orphan으로 지웁니다).
+  업로드 직후 아직 카탈로그에 기록되지 않은 객체를 지우지 않도록 유예 시간보다 새 객체는 건너뜁니다.
+"""
+import argparse
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from typing import Dict, Iterator, List, Optional, Set
+
+from PIL import Image
+
+from pymongo import UpdateOne
+
+import catalog
+import crawling
+import image_utils
+import packfile
+import quiz_pool
+import storage
+import urls
+import variants
+from catalog import S3_BASE_PATH
+from config import Config
+from extensions import get_db
+
+logger = logging.getLogger(__name__)
+
+
+def _require_s3(store) -> "storage.S3Storage":
+    if not isinstance(store, storage.S3Storage):
+        raise SystemExit("이 작업은 S3 저장소(STORAGE_BACKEND=s3)에서만 의미가 있습니다.")
+    return store
+
+
+def _fix_metadata(s3_client, bucket: str, key: str, cache_control: str, dry_run: bool) -> str:
+    """객체 1개의 메타데이터를 확인/보정하고 결과('updated', 'skipped', 'unknown')를 반환합니다."""
+    content_type = image_utils.content_type_for_key(key)
+    if content_type is None:
+        return "unknown"
+
+    head = s3_client.head_object(Bucket=bucket, Key=key)
+    if head.get("ContentType") == content_type and head.get("CacheControl") == cache_control:
+        return "skipped"
+    if dry_run:
+        return "updated"
+
+    s3_client.copy_object(
+        Bucket=bucket,
+        Key=key,
+        CopySource={"Bucket": bucket, "Key": key},
+        MetadataDirective="REPLACE",
+        ContentType=content_type,
+        CacheControl=cache_control,
+        # REPLACE는 사용자 메타데이터도 교체하므로 기존 값을 그대로 옮깁니다.
+        Metadata=head.get("Metadata", {}),
+    )
+    return "updated"
+
+
+def backfill_metadata(
+    store: "storage.S3Storage",
+    prefix: str = f"{S3_BASE_PATH}/",
+    workers: int = 16,
+    cache_control: Optional[str] = None,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    prefix 아래 모든 객체에 올바른 Content-Type과 Cache-Control을 설정합니다.
+    반환: {'scanned': n, 'updated': n, 'skipped': n, 'unknown': n, 'failed': n}
+    """
+    cache_control = cache_control or Config.IMAGE_CACHE_CONTROL
+    summary = {"scanned": 0, "updated": 0, "skipped": 0, "unknown": 0, "failed": 0}
+
+    def work(key: str) -> str:
+        try:
+            return _fix_metadata(store.client, store.bucket, key, cache_control, dry_run)
+        except Exception as e:
+            logger.warning(f"메타데이터 보정 실패 ({key}): {e}")
+            return "failed"
+
+    def flush(executor, keys) -> None:
+        for result in executor.map(work, keys):
+            summary["scanned"] += 1
+            summary[result] += 1
+        print(f"[backfill] {summary}")
+
+    # 목록 페이지 단위(최대 1000개)로 나눠 처리해 대기 중인 작업이 무한정 쌓이지 않게 합니다.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        chunk = []
+        for obj in store.list(prefix):
+            chunk.append(obj["key"])
+            if len(chunk) >= 1000:
+                flush(executor, chunk)
+                chunk = []
+        if chunk:
+            flush(executor, chunk)
+    return summary
+
+
+def backfill_variants(
+    store: "storage.Storage",
+    category: Optional[str] = None,
+    workers: int = 4,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    카탈로그에서 변형본이 없는 이미지를 찾아 원본을 내려받고 변형본을 만듭니다.
+    인코딩은 variants의 프로세스 풀에서, 다운로드/업로드는 workers개 스레드에서 진행합니다.
+    """
+    query = {"variants": {"$exists": False}}
+    if category:
+        query["category"] = category
+    keys = [doc["key"] for doc in catalog.get_collection().find(query, {"_id": 0, "key": 1})]
+    summary = {"scanned": len(keys), "updated": 0, "failed": 0}
+    if dry_run:
+        return summary
+
+    def work(key: str) -> bool:
+        try:
+            variants.create_variants(store, key, store.get(key))
+            return True
+        except Exception as e:
+            logger.warning(f"변형본 생성 실패 ({key}): {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for ok in executor.map(work, keys):
+            summary["updated" if ok else "failed"] += 1
+    return summary
+
+
+CONTENT_KEY_PATTERN = re.compile(rf"^{S3_BASE_PATH}/.+/[0-9a-f]{{{crawling.CONTENT_HASH_LENGTH}}}\.\w+$")
+
+
+def _copy_object(store, old_key: str, new_key: str, data: Optional[bytes] = None) -> bytes:
+    """old_key의 내용을 new_key로 복사합니다. new_key가 이미 있으면(같은 내용) 업로드를 건너뜁니다."""
+    if data is None:
+        data = store.get(old_key)
+    if not store.exists(new_key):
+        store.put(new_key, data, content_type=image_utils.content_type_for_key(new_key),
+                  cache_control=Config.IMAGE_CACHE_CONTROL)
+    return data
+
+
+def _rekey_image(store, doc: Dict, dry_run: bool) -> Optional[str]:
+    """카탈로그 이미지 1장과 변형본을 내용 해시 키로 옮기고 새 키를 반환합니다."""
+    old_key = doc["key"]
+    data = store.get(old_key)
+    fmt = image_utils.sniff_format(data) or "png"
+    new_key = crawling.make_object_key(data, doc["category"], fmt)
+    if dry_run:
+        return new_key
+
+    _copy_object(store, old_key, new_key, data)
+    aliases = [{"from": old_key, "to": new_key}]
+    new_variants = {}
+    for width, old_vkey in (doc.get("variants") or {}).items():
+        # 변형본 키는 원본 파일명에서 나오므로 새 원본 키 기준으로 다시 만듭니다.
+        vdata = store.get(old_vkey)
+        new_vkey = variants.variant_key(new_key, int(width), image_utils.sniff_format(vdata) or variants.variant_format())
+        _copy_object(store, old_vkey, new_vkey, vdata)
+        new_variants[width] = new_vkey
+        aliases.append({"from": old_vkey, "to": new_vkey})
+
+    collection = catalog.get_collection()
+    if new_key != old_key and collection.count_documents({"key": new_key}, limit=1):
+        # 같은 바이트가 이미 새 키로 있으면 그 문서에 대응만 남기고 옛 문서는 지웁니다.
+        collection.update_one({"key": new_key}, {"$push": {"aliases": {"$each": aliases}}})
+        collection.delete_one({"_id": doc["_id"]})
+        return new_key
+
+    update = {"$set": {"key": new_key}, "$push": {"aliases": {"$each": aliases}}}
+    if new_variants:
+        update["$set"]["variants"] = new_variants
+    collection.update_one({"_id": doc["_id"]}, update)
+    return new_key
+
+
+def _rewrite_quiz_sets(quiz_sets: List[Dict], key_map: Dict[str, str]) -> bool:
+    """quizSets 안의 옛 키 이미지 URL을 새 키 URL로 제자리에서 바꾸고, 바뀐 것이 있으면 True."""
+    builder = urls.get_builder()
+    changed = False
+    for question in quiz_sets or []:
+        images = question.get("images") or []
+        for i, url in enumerate(images):
+            new_key = key_map.get(builder.key_from_url(url))
+            if new_key:
+                images[i] = builder.build(new_key)
+                changed = True
+    return changed
+
+
+def _rewrite_references(collection, key_map: Dict[str, str], dry_run: bool) -> int:
+    """컬렉션의 quizSets URL을 새 키 기준으로 바꾸고 바뀐 문서 수를 반환합니다."""
+    ops = []
+    for doc in collection.find({"quizSets": {"$exists": True}}, {"quizSets": 1}):
+        quiz_sets = doc["quizSets"]
+        if _rewrite_quiz_sets(quiz_sets, key_map):
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"quizSets": quiz_sets}}))
+    if ops and not dry_run:
+        for i in range(0, len(ops), 1000):
+            collection.bulk_write(ops[i:i + 1000], ordered=False)
+    return len(ops)
+
+
+def rekey(
+    store: "storage.Storage",
+    category: Optional[str] = None,
+    workers: int = 8,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    예전 형식 키의 이미지를 내용 해시 키로 옮기고 quizSets 참조를 다시 씁니다.
+    반환: {'scanned': n, 'rekeyed': n, 'failed': n, 'scores': n, 'quiz_pool': n}
+    """
+    collection = catalog.get_collection()
+    query = {"key": {"$regex": f"^{S3_BASE_PATH}/"}}
+    if category:
+        query["category"] = category
+    docs = [doc for doc in collection.find(query, {"key": 1, "category": 1, "variants": 1})
+            if not CONTENT_KEY_PATTERN.match(doc["key"])]
+    summary = {"scanned": len(docs), "rekeyed": 0, "failed": 0, "scores": 0, "quiz_pool": 0}
+
+    def work(doc: Dict) -> Optional[str]:
+        try:
+            return _rekey_image(store, doc, dry_run)
+        except Exception as e:
+            logger.warning(f"키 변경 실패 ({doc['key']}): {e}")
+            return None
+
+    key_map: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for doc, new_key in zip(docs, executor.map(work, docs)):
+            if new_key is None:
+                summary["failed"] += 1
+                continue
+            summary["rekeyed"] += 1
+            key_map[doc["key"]] = new_key
+    print(f"[rekey] {summary}")
+
+    # 이전 실행에서 옮긴 키까지 포함해 카탈로그의 aliases로 키 대응표를 만듭니다.
+    for doc in collection.find({"aliases": {"$exists": True}}, {"_id": 0, "aliases": 1}):
+        for alias in doc["aliases"]:
+            key_map[alias["from"]] = alias["to"]
+
+    if key_map:
+        summary["scores"] = _rewrite_references(get_db().scores, key_map, dry_run)
+        summary["quiz_pool"] = _rewrite_references(quiz_pool.get_collection(), key_map, dry_run)
+    return summary
+
+
+GC_PREFIXES = (f"{S3_BASE_PATH}/", f"{variants.VARIANT_BASE_PATH}/")
+
+
+def referenced_keys() -> Set[str]:
+    """카탈로그(원본/변형본)와 저장된 quizSets(scores, quiz_pool)가 참조하는 모든 키."""
+    builder = urls.get_builder()
+    keys: Set[str] = set()
+    for doc in catalog.get_collection().find({}, {"_id": 0, "key": 1, "variants": 1}):
+        keys.add(doc["key"])
+        keys.update((doc.get("variants") or {}).values())
+    for collection in (get_db().scores, quiz_pool.get_collection()):
+        for doc in collection.find({"quizSets": {"$exists": True}}, {"_id": 0, "quizSets": 1}):
+            for question in doc.get("quizSets") or []:
+                for url in question.get("images") or []:
+                    key = builder.key_from_url(url)
+                    if key:
+                        keys.add(key)
+    return keys
+
+
+def _is_decodable(data: bytes) -> bool:
+    if image_utils.sniff_format(data) is None:
+        return False
+    try:
+        with Image.open(BytesIO(data)) as img:
+            img.verify()
+        return True
+    except Exception:
+        return False
+
+
+def _chunks(items: Iterator, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def collect_garbage(
+    store: "storage.Storage",
+    workers: int = 16,
+    grace_hours: float = 24,
+    verify: bool = False,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    참조되지 않거나 깨진 객체를 삭제합니다.
+    먼저 catalog.reconcile로 카탈로그에 없는 예전 업로드를 등록하므로, 참조 여부는 동기화된 카탈로그 기준입니다.
+    - orphan: 카탈로그/quizSets 어디에서도 참조하지 않는 객체
+    - invalid: 0바이트 객체, verify=True면 디코딩되지 않는 객체도 (참조 중이면 카탈로그 항목도 제거)
+    목록은 페이지 단위로 흘려보내며 1000개씩 검사(workers개 스레드)/삭제합니다.
+    로컬 저장소면 마지막에 어떤 ref도 가리키지 않는 blob을 정리합니다.
+    반환: {'scanned', 'orphan', 'invalid', 'skipped_recent', 'deleted', 'bytes', 'failed', 'reconciled'}
+    """
+    synced = catalog.reconcile(store, dry_run=dry_run)
+    live = referenced_keys()
+    if dry_run and synced["added"]:
+        # dry-run은 카탈로그를 바꾸지 않으므로, reconcile이 등록했을 키도 참조 중으로 셉니다.
+        moved = catalog.aliased_keys()
+        live.update(
+            obj["key"] for obj in store.list(f"{S3_BASE_PATH}/")
+            if obj["key"] not in moved and catalog.category_of_key(obj["key"])
+        )
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+    summary = {"scanned": 0, "orphan": 0, "invalid": 0, "skipped_recent": 0, "deleted": 0, "bytes": 0, "failed": 0,
+               "reconciled": synced["added"]}
+
+    def check(obj: Dict) -> Optional[str]:
+        """삭제 사유('orphan', 'invalid') 또는 None(유지)."""
+        if obj["size"] == 0:
+            return "invalid"
+        if obj["key"] not in live:
+            return "orphan"
+        if verify:
+            try:
+                return None if _is_decodable(store.get(obj["key"])) else "invalid"
+            except storage.NotFound:
+                return None
+        return None
+
+    def recent(obj: Dict) -> bool:
+        modified = obj.get("last_modified")
+        if modified is None:
+            return False
+        if modified.tzinfo is None:
+            modified = modified.replace(tzinfo=timezone.utc)
+        return modified > cutoff
+
+    def delete(batch: List[str]) -> int:
+        try:
+            return store.delete_many(batch)
+        except Exception as e:
+            logger.warning(f"GC 삭제 실패 ({len(batch)}개): {e}")
+            return 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for prefix in GC_PREFIXES:
+            for page in _chunks(store.list(prefix), 1000):
+                summary["scanned"] += len(page)
+                candidates = []
+                for obj in page:
+                    if recent(obj):
+                        summary["skipped_recent"] += 1
+                    else:
+                        candidates.append(obj)
+
+                garbage, invalid_live = [], []
+                for obj, reason in zip(candidates, executor.map(check, candidates)):
+                    if reason is None:
+                        continue
+                    summary[reason] += 1
+                    summary["bytes"] += obj["size"]
+                    garbage.append(obj["key"])
+                    if reason == "invalid" and obj["key"] in live:
+                        invalid_live.append(obj["key"])
+
+                if dry_run or not garbage:
+                    continue
+                if invalid_live:
+                    # 깨진 이미지가 다시 퀴즈에 뽑히지 않도록 카탈로그에서도 뺍니다.
+                    catalog.get_collection().delete_many({"key": {"$in": invalid_live}})
+                # delete_many가 1000개 단위로 묶어 보내므로, 묶음을 스레드에 나눠 병렬로 삭제합니다.
+                deleted = sum(executor.map(delete, _chunks(iter(garbage), max(len(garbage) // workers, 100))))
+                summary["deleted"] += deleted
+                summary["failed"] += len(garbage) - deleted
+                print(f"[gc] {summary}")
+
+    if isinstance(store, storage.LocalStorage):
+        blobs = store.collect_blobs(min_age=grace_hours * 3600, dry_run=dry_run)
+        summary["blobs_deleted"] = blobs["deleted"]
+        summary["blob_bytes"] = blobs["bytes"]
+    return summary
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="S3 generated/ 객체 유지보수")
+    sub = parser.add_subparsers(dest="command", required=True)
+    backfill = sub.add_parser("backfill-metadata", help="Content-Type / Cache-Control 일괄 보정")
+    backfill.add_argument("--prefix", default=f"{S3_BASE_PATH}/", help="대상 prefix (기본: generated/)")
+    backfill.add_argument("--workers", type=int, default=16, help="동시 처리 수")
+    backfill.add_argument("--dry-run", action="store_true", help="변경 없이 대상 수만 출력")
+    backfill_var = sub.add_parser("backfill-variants", help="변형본이 없는 이미지의 크기별 변형본 생성")
+    backfill_var.add_argument("--category", help="특정 카테고리만 (생략 시 전체)")
+    backfill_var.add_argument("--workers", type=int, default=4, help="동시 처리 수")
+    backfill_var.add_argument("--dry-run", action="store_true", help="변경 없이 대상 수만 출력")
+    rekey_cmd = sub.add_parser("rekey", help="예전 키를 내용 해시 키로 옮기고 quizSets 참조 갱신")
+    rekey_cmd.add_argument("--category", help="특정 카테고리만 (생략 시 전체)")
+    rekey_cmd.add_argument("--workers", type=int, default=8, help="동시 처리 수")
+    rekey_cmd.add_argument("--dry-run", action="store_true", help="변경 없이 대상 수만 출력")
+    pack = sub.add_parser("build-pack", help="카테고리 이미지를 mmap 서빙용 팩 파일로 묶기")
+    pack.add_argument("--category", help="특정 카테고리만 (생략 시 카탈로그의 모든 카테고리)")
+    pack.add_argument("--include-originals", action="store_true", help="변형본 외에 원본도 포함")
+    gc = sub.add_parser("gc", help="참조되지 않거나 깨진 객체 일괄 삭제")
+    gc.add_argument("--workers", type=int, default=16, help="동시 처리 수 (검사/삭제)")
+    gc.add_argument("--grace-hours", type=float, default=24, help="이보다 새 객체는 건너뜀 (업로드 진행 중 보호)")
+    gc.add_argument("--verify", action="store_true", help="참조 중인 객체도 내려받아 디코딩 가능한지 검사")
+    gc.add_argument("--dry-run", action="store_true", help="삭제 없이 대상 수만 출력")
+    args = parser.parse_args(argv)
+
+    store = storage.get_storage()
+    if args.command == "backfill-metadata":
+        summary = backfill_metadata(_require_s3(store), args.prefix, workers=args.workers, dry_run=args.dry_run)
+        print(f"--- 메타데이터 보정 완료: {summary} ---")
+    elif args.command == "backfill-variants":
+        summary = backfill_variants(store, args.category, workers=args.workers, dry_run=args.dry_run)
+        print(f"--- 변형본 생성 완료: {summary} ---")
+    elif args.command == "rekey":
+        summary = rekey(store, args.category, workers=args.workers, dry_run=args.dry_run)
+        print(f"--- 키 변경 완료: {summary} ---")
+    elif args.command == "build-pack":
+        categories = [args.category] if args.category else sorted(catalog.get_collection().distinct("category"))
+        for category in categories:
+            try:
+                path = packfile.pack_path(category)
+            except ValueError:
+                # 공백/특수문자가 든 나만퀴 키워드는 팩 파일 이름으로 쓸 수 없어 원본 저장소에서 서빙합니다.
+                logger.warning(f"팩 생성 건너뜀: 팩 이름으로 쓸 수 없는 카테고리 '{category}'")
+                continue
+            summary = packfile.build_pack(store, category, include_originals=args.include_originals)
+            print(f"--- 팩 생성 완료 ({path}): {summary} ---")
+    elif args.command == "gc":
+        summary = collect_garbage(store, workers=args.workers, grace_hours=args.grace_hours,
+                                  verify=args.verify, dry_run=args.dry_run)
+        print(f"--- GC 완료: {summary} ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# metrics.py
+"""
+프로세스 내 간단한 메트릭 레지스트리.
+
+카운터/게이지/타이밍을 스레드 안전하게 모아두고 `/api/metrics`에서 스냅샷으로 노출합니다.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+_timings: Dict[str, Dict[str, float]] = {}
+
+
+def incr(name: str, value: float = 1) -> None:
+    """카운터를 value만큼 증가시킵니다."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    """게이지 값을 설정합니다."""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, value: float) -> None:
+    """타이밍(또는 분포) 값을 하나 기록합니다. count/sum/max/last를 유지합니다."""
+    with _lock:
+        stat = _timings.get(name)
+        if stat is None:
+            stat = _timings[name] = {"count": 0, "sum": 0.0, "max": 0.0, "last": 0.0}
+        stat["count"] += 1
+        stat["sum"] += value
+        stat["max"] = max(stat["max"], value)
+        stat["last"] = value
+
+
+@contextmanager
+def timer(name: str):
+    """블록 실행 시간을 밀리초 단위로 observe 합니다."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, (time.perf_counter() - start) * 1000)
+
+
+def snapshot() -> Dict[str, Dict]:
+    """현재 메트릭 전체를 복사해 반환합니다."""
+    with _lock:
+        timings = {
+            name: dict(stat, avg=(stat["sum"] / stat["count"]) if stat["count"] else 0.0)
+            for name, stat in _timings.items()
+        }
+        return {"counters": dict(_counters), "gauges": dict(_gauges), "timings": timings}
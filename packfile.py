@@ -0,0 +1,266 @@
+# packfile.py
+"""
+팩 파일: 카테고리의 퀴즈 이미지(변형본)를 파일 하나에 이어 붙이고 오프셋 색인을 둔 묶음.
+
+작은 이미지를 S3 객체나 개별 파일로 서빙하면 이미지마다 요청/open()이 한 번씩 필요합니다.
+팩 파일은 mmap으로 열어 두고 색인으로 찾은 구간만 잘라 응답하므로,
+단일 서버 배포에서는 카테고리 전체가 페이지 캐시에서 바로 서빙됩니다.
+
+파일 형식 ({PACK_DIR}/{category}.pack):
+    헤더 24바이트: 매직 b"AIPK" | 버전(u32) | 색인 오프셋(u64) | 색인 길이(u64)   (리틀 엔디언)
+    이미지 바이트를 이어 붙인 데이터 영역
+    색인(JSON): {key: [offset, length, content_type, etag]}
+색인이 같은 파일 끝에 있으므로 os.replace 한 번으로 팩 전체가 원자적으로 교체됩니다.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+from flask import Response
+
+import catalog
+import image_utils
+import metrics
+import variants
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"AIPK"
+VERSION = 1
+_HEADER = struct.Struct("<4sIQQ")
+PACK_EXTENSION = ".pack"
+
+_CATEGORY_PATTERN = re.compile(r"^[\w-]+$")
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+
+
+class PackEntry(NamedTuple):
+    offset: int
+    length: int
+    content_type: Optional[str]
+    etag: str
+
+
+class PackWriter:
+    """팩 파일 작성기. 임시 파일에 쓰고 close()에서 색인을 붙인 뒤 원자적으로 교체합니다."""
+
+    def __init__(self, path: os.PathLike):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-", suffix=PACK_EXTENSION)
+        self._file = os.fdopen(fd, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, 0, 0))
+        self._offset = _HEADER.size
+        self.entries: Dict[str, PackEntry] = {}
+
+    def add(self, key: str, data: image_utils.BufferLike, content_type: Optional[str] = None) -> None:
+        if key in self.entries:
+            return
+        view = memoryview(data).cast("B")
+        self._file.write(view)
+        self.entries[key] = PackEntry(
+            self._offset, len(view),
+            content_type or image_utils.content_type_for_key(key) or DEFAULT_CONTENT_TYPE,
+            hashlib.sha256(view).hexdigest()[:32],
+        )
+        self._offset += len(view)
+
+    def close(self) -> None:
+        try:
+            index = json.dumps({key: list(entry) for key, entry in self.entries.items()}).encode("utf-8")
+            self._file.write(index)
+            self._file.seek(0)
+            self._file.write(_HEADER.pack(MAGIC, VERSION, self._offset, len(index)))
+            self._file.close()
+            os.replace(self._tmp, self.path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self._tmp):
+            os.unlink(self._tmp)
+
+    def __enter__(self) -> "PackWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class PackReader:
+    """mmap으로 연 팩 파일. get()은 데이터를 복사하지 않는 memoryview를 돌려줍니다."""
+
+    def __init__(self, path: os.PathLike):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self.mtime = os.fstat(f.fileno()).st_mtime_ns
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_offset, index_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"팩 파일 형식이 아닙니다: {self.path}")
+        index = json.loads(self._mmap[index_offset:index_offset + index_length])
+        self.entries: Dict[str, PackEntry] = {key: PackEntry(*value) for key, value in index.items()}
+        self._view = memoryview(self._mmap)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def entry(self, key: str) -> Optional[PackEntry]:
+        return self.entries.get(key)
+
+    def get(self, key: str) -> memoryview:
+        entry = self.entries[key]
+        return self._view[entry.offset:entry.offset + entry.length]
+
+    def size(self) -> int:
+        return len(self._mmap)
+
+
+def select_range(range_header: Optional[str], length: int) -> Tuple[int, int, int]:
+    """
+    Range 헤더에서 응답할 구간을 고릅니다. 반환: (start, stop, status)
+    - 단일 구간(bytes=a-b, bytes=a-, bytes=-n): 206
+    - 헤더가 없거나, 여러 구간이거나, 형식이 잘못됐으면 Range를 무시하고 전체(200) (RFC 9110 14.2)
+    - 구간이 파일 밖이면 416
+    """
+    match = _RANGE_PATTERN.match(range_header.strip()) if range_header else None
+    if match is None or match.group(1) == match.group(2) == "":
+        return 0, length, 200
+    first, last = match.groups()
+    if first == "":
+        suffix = int(last)
+        if suffix == 0:
+            return 0, length, 416
+        return max(length - suffix, 0), length, 206
+    start = int(first)
+    stop = min(int(last) + 1, length) if last else length
+    if last and int(last) < start:
+        return 0, length, 200
+    if start >= length:
+        return 0, length, 416
+    return start, stop, 206
+
+
+def make_response(reader: PackReader, key: str, request) -> Response:
+    """
+    팩의 key 이미지를 Flask 응답으로 만듭니다. Range(단일 구간)/If-Range/ETag(304)를 지원합니다.
+    WSGI 응답은 bytes여야 하므로 요청된 구간만 페이지 캐시에서 한 번 복사합니다.
+    """
+    entry = reader.entry(key)
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': f'"{entry.etag}"',
+        'Cache-Control': Config.IMAGE_CACHE_CONTROL,
+    }
+    if request.if_none_match.contains(entry.etag):
+        return Response(status=304, headers=headers)
+
+    start, stop, status = 0, entry.length, 200
+    # If-Range의 ETag가 다르면(팩이 다시 만들어짐) 전체를 보냅니다.
+    if request.if_range.etag in (None, entry.etag):
+        start, stop, status = select_range(request.headers.get('Range'), entry.length)
+    if status == 416:
+        headers['Content-Range'] = f'bytes */{entry.length}'
+        return Response(status=416, headers=headers)
+    if status == 206:
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{entry.length}'
+    mimetype = entry.content_type or image_utils.content_type_for_key(key) or DEFAULT_CONTENT_TYPE
+    return Response(reader.get(key)[start:stop].tobytes(), status=status, mimetype=mimetype, headers=headers)
+
+
+_readers: Dict[str, PackReader] = {}
+_readers_lock = threading.Lock()
+
+
+def pack_path(category: str) -> Path:
+    if not _CATEGORY_PATTERN.match(category):
+        raise ValueError(f"잘못된 카테고리: {category}")
+    return Path(Config.PACK_DIR) / f"{category}{PACK_EXTENSION}"
+
+
+def get_pack(category: str) -> Optional[PackReader]:
+    """카테고리 팩을 엽니다 (프로세스 공용). 파일이 다시 만들어졌으면 새로 열고, 없으면 None."""
+    try:
+        path = pack_path(category)
+        mtime = path.stat().st_mtime_ns
+    except (ValueError, FileNotFoundError):
+        return None
+    with _readers_lock:
+        reader = _readers.get(category)
+        if reader is None or reader.mtime != mtime:
+            # 이전 reader는 닫지 않습니다. 응답 중인 memoryview가 있을 수 있어 참조가 모두 사라질 때 해제됩니다.
+            reader = PackReader(path)
+            _readers[category] = reader
+            metrics.incr("packfile.opened")
+        return reader
+
+
+def _category_of(key: str) -> Optional[str]:
+    """generated/{category}/x.png, variants/{category}/x.w640.webp -> category"""
+    parts = key.split("/")
+    return "/".join(parts[1:-1]) if len(parts) >= 3 else None
+
+
+def find(key: str) -> Optional[PackReader]:
+    """key가 들어 있는 팩을 반환합니다 (팩 서빙이 꺼져 있거나 없으면 None)."""
+    if not Config.PACKS_ENABLED:
+        return None
+    category = _category_of(key)
+    reader = get_pack(category) if category else None
+    return reader if reader is not None and key in reader else None
+
+
+def url_for(key: str) -> Optional[str]:
+    """팩에 있는 키면 팩 서빙 URL, 아니면 None."""
+    return Config.PACK_URL + quote(key, safe="/") if find(key) is not None else None
+
+
+def pack_keys(category: str, include_originals: bool = False) -> List[str]:
+    """팩에 담을 키: 난이도별로 실제 내려주는 키(변형본, 없으면 원본). include_originals면 원본도 포함."""
+    originals = catalog.list_image_keys(category)
+    keys = list(originals) if include_originals else []
+    for difficulty in variants.parse_difficulty_widths(Config.VARIANT_WIDTH_BY_DIFFICULTY):
+        keys.extend(variants.resolve_keys(originals, difficulty))
+    return list(dict.fromkeys(keys))
+
+
+def build_pack(store, category: str, keys: Optional[Iterable[str]] = None,
+               include_originals: bool = False) -> Dict[str, int]:
+    """
+    저장소(storage.Storage)에서 카테고리 이미지를 내려받아 팩 파일을 만듭니다.
+    반환: {'images': n, 'bytes': n, 'missing': n}
+    """
+    keys = list(keys) if keys is not None else pack_keys(category, include_originals)
+    summary = {"images": 0, "bytes": 0, "missing": 0}
+    with PackWriter(pack_path(category)) as writer:
+        for key in keys:
+            try:
+                data = store.get(key)
+            except KeyError:
+                logger.warning(f"팩 생성: 저장소에 없는 키 {key}")
+                summary["missing"] += 1
+                continue
+            writer.add(key, data)
+            summary["images"] += 1
+            summary["bytes"] += len(data)
+    return summary
@@ -0,0 +1,103 @@
+# pipeline.py
+"""
+생산자/소비자 파이프라인 단계.
+
+BoundedStage는 고정된 수의 워커 스레드가 크기가 제한된 큐를 소비하는 단계입니다.
+큐가 가득 차면 submit()이 블록되어 앞 단계(예: 이미지 생성)에 자연스럽게 배압(backpressure)을 겁니다.
+단계별 처리량과 큐 점유율은 metrics에 `pipeline.{name}.*`으로 기록됩니다.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BoundedStage:
+    """크기 제한 큐 + 전용 워커 스레드로 구성된 파이프라인 단계."""
+
+    def __init__(self, name: str, workers: int, queue_size: int):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._started_at = time.monotonic()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def submit(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Future:
+        """작업을 큐에 넣습니다. 큐가 가득 차면 자리가 날 때까지(또는 timeout까지) 블록됩니다."""
+        self._ensure_started()
+        future: Future = Future()
+        wait_start = time.perf_counter()
+        self._queue.put((future, fn, args, kwargs), timeout=timeout)
+        metrics.observe(f"pipeline.{self.name}.enqueue_wait_ms", (time.perf_counter() - wait_start) * 1000)
+        metrics.set_gauge(f"pipeline.{self.name}.queue", self._queue.qsize())
+        return future
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            future, fn, args, kwargs = item
+            metrics.set_gauge(f"pipeline.{self.name}.queue", self._queue.qsize())
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            with self._lock:
+                self._in_flight += 1
+            metrics.set_gauge(f"pipeline.{self.name}.in_flight", self._in_flight)
+            start = time.perf_counter()
+            try:
+                future.set_result(fn(*args, **kwargs))
+                ok = True
+            except BaseException as e:
+                future.set_exception(e)
+                ok = False
+            metrics.observe(f"pipeline.{self.name}.task_ms", (time.perf_counter() - start) * 1000)
+            with self._lock:
+                self._in_flight -= 1
+                if ok:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+            metrics.set_gauge(f"pipeline.{self.name}.in_flight", self._in_flight)
+            metrics.incr(f"pipeline.{self.name}.{'completed' if ok else 'failed'}")
+
+    def stats(self) -> Dict[str, Any]:
+        """큐 점유율과 누적 처리량."""
+        with self._lock:
+            elapsed = max(time.monotonic() - self._started_at, 1e-9)
+            return {
+                "workers": self.workers,
+                "queue": self._queue.qsize(),
+                "queue_size": self.queue_size,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "throughput_per_sec": self._completed / elapsed,
+            }
+
+    def shutdown(self) -> None:
+        for _ in self._threads:
+            self._queue.put(_STOP)
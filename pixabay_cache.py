@@ -0,0 +1,220 @@
+# pixabay_cache.py
+"""
+Pixabay 검색 결과 캐시.
+
+(query, image_type, per_page) 조합을 키로 검색 결과(hits)를 캐시합니다.
+- TTL 이내: 캐시 그대로 반환
+- TTL 초과 ~ TTL + stale_ttl 이내: 오래된 값을 즉시 반환하고 백그라운드에서 갱신 (stale-while-revalidate)
+- 그 이후: 동기 요청 후 저장
+항목 수는 LRU 방식으로 제한되며, 메모리/디스크 백엔드를 선택할 수 있습니다.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+import http_client
+import metrics
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+PIXABAY_API_URL = "https://pixabay.com/api/"
+
+
+class MemoryBackend:
+    """프로세스 메모리에 보관하는 LRU 백엔드."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class DiskBackend:
+    """
+    디렉터리에 항목별 JSON 파일로 보관하는 LRU 백엔드.
+    프로세스 재시작 후에도 캐시가 유지되며, 시작 시 파일 수정 시각 순으로 LRU 순서를 복원합니다.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 256):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        files = [f for f in os.listdir(directory) if f.endswith(".json")]
+        files.sort(key=lambda f: os.path.getmtime(os.path.join(directory, f)))
+        self._order: "OrderedDict[str, None]" = OrderedDict((f[:-5], None) for f in files)
+        self._evict_locked()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        name = self._name(key)
+        with self._lock:
+            if name not in self._order:
+                return None
+            try:
+                with open(self._path(name), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self._order.pop(name, None)
+                return None
+            self._order.move_to_end(name)
+            try:
+                os.utime(self._path(name))
+            except OSError:
+                pass
+            return entry
+
+    def set(self, key: str, entry: Dict) -> None:
+        name = self._name(key)
+        path = self._path(name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._order[name] = None
+            self._order.move_to_end(name)
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        while len(self._order) > self.max_entries:
+            name, _ = self._order.popitem(last=False)
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+
+def fetch_pixabay(query: str, image_type: str = "photo", per_page: int = 50) -> List[Dict]:
+    """Pixabay API를 직접 호출해 hits 목록을 반환합니다."""
+    response = http_client.get(
+        PIXABAY_API_URL,
+        params={"key": os.getenv("PIXABAY_API_KEY"), "q": query, "image_type": image_type, "per_page": per_page},
+    )
+    response.raise_for_status()
+    return response.json().get("hits", [])
+
+
+class PixabayCache:
+    """stale-while-revalidate 방식의 Pixabay 검색 캐시."""
+
+    def __init__(
+        self,
+        backend,
+        ttl: float = 3600,
+        stale_ttl: float = 86400,
+        fetch_fn: Callable[[str, str, int], List[Dict]] = fetch_pixabay,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.fetch_fn = fetch_fn
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, image_type: str, per_page: int) -> str:
+        return f"{query.strip().lower()}|{image_type}|{per_page}"
+
+    def search(self, query: str, image_type: str = "photo", per_page: int = 50) -> List[Dict]:
+        """캐시를 거쳐 Pixabay hits 목록을 반환합니다."""
+        key = self.make_key(query, image_type, per_page)
+        entry = self.backend.get(key)
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            if age < self.ttl:
+                metrics.incr("pixabay_cache.hit")
+                return entry["hits"]
+            if age < self.ttl + self.stale_ttl:
+                metrics.incr("pixabay_cache.stale")
+                self._refresh_async(key, query, image_type, per_page)
+                return entry["hits"]
+
+        metrics.incr("pixabay_cache.miss")
+        return self._refresh(key, query, image_type, per_page)
+
+    def _refresh(self, key: str, query: str, image_type: str, per_page: int) -> List[Dict]:
+        with metrics.timer("pixabay_cache.fetch_ms"):
+            hits = self.fetch_fn(query, image_type, per_page)
+        self.backend.set(key, {"hits": hits, "fetched_at": time.time()})
+        return hits
+
+    def _refresh_async(self, key: str, query: str, image_type: str, per_page: int) -> None:
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self._refresh(key, query, image_type, per_page)
+            except Exception as e:
+                # 갱신 실패 시 오래된 값을 계속 사용합니다.
+                logger.warning(f"Pixabay 캐시 갱신 실패 ({query}): {e}")
+                metrics.incr("pixabay_cache.refresh_error")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name="pixabay-refresh", daemon=True).start()
+
+    def warm(self, queries: Iterable[str], image_type: str = "photo", per_page: int = 50) -> None:
+        """고정 카테고리 검색어를 미리 캐시에 채워둡니다."""
+        for query in queries:
+            try:
+                self.search(query, image_type, per_page)
+            except Exception as e:
+                logger.warning(f"Pixabay 캐시 예열 실패 ({query}): {e}")
+
+
+_default_cache: Optional[PixabayCache] = None
+_default_lock = threading.Lock()
+
+
+def get_cache() -> PixabayCache:
+    """Config 설정으로 만든 프로세스 공용 캐시를 반환합니다."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            if Config.PIXABAY_CACHE_BACKEND == "disk":
+                backend = DiskBackend(Config.PIXABAY_CACHE_DIR, Config.PIXABAY_CACHE_MAX_ENTRIES)
+            else:
+                backend = MemoryBackend(Config.PIXABAY_CACHE_MAX_ENTRIES)
+            _default_cache = PixabayCache(
+                backend,
+                ttl=Config.PIXABAY_CACHE_TTL,
+                stale_ttl=Config.PIXABAY_CACHE_STALE_TTL,
+            )
+        return _default_cache
+
+
+def search(query: str, image_type: str = "photo", per_page: int = 50) -> List[Dict]:
+    """공용 캐시를 통한 Pixabay 검색."""
+    return get_cache().search(query, image_type, per_page)
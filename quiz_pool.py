@@ -0,0 +1,192 @@
+# quiz_pool.py
+"""
+미리 만들어 둔 퀴즈 세트(quizSets) 풀.
+
+백그라운드 빌더가 (category, difficulty) 조합마다 low/high 워터마크 사이로
+퀴즈 세트를 채워두고, /api/prepare-game 은 풀에서 하나를 원자적으로 꺼내(claim) 사용합니다.
+풀이 비어 있을 때만 기존의 인라인 생성 경로로 돌아갑니다.
+빌더 스레드는 앱 워커마다 뜨지만, MongoDB `background_leases`의 임대를 쥔 프로세스 하나만 풀을 채웁니다.
+claim 후 wake()는 같은 프로세스의 빌더만 깨우므로, 다른 프로세스에서 꺼낸 만큼은 임대 보유 빌더의 다음 주기
+(QUIZ_POOL_INTERVAL)에 채워집니다.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+import metrics
+from extensions import get_db
+
+logger = logging.getLogger(__name__)
+
+POOL_COLLECTION = "quiz_pool"
+LEASE_COLLECTION = "background_leases"
+BUILDER_LEASE = "quiz_pool_builder"
+DIFFICULTIES = ("easy", "hard")
+
+_indexes_ready = False
+
+
+def get_collection():
+    """풀 컬렉션을 반환합니다. 최초 호출 시 인덱스를 보장합니다."""
+    global _indexes_ready
+    collection = get_db()[POOL_COLLECTION]
+    if not _indexes_ready:
+        collection.create_index([("category", ASCENDING), ("difficulty", ASCENDING), ("created_at", ASCENDING)])
+        _indexes_ready = True
+    return collection
+
+
+def claim(category: str, difficulty: str) -> Optional[List[dict]]:
+    """풀에서 가장 오래된 퀴즈 세트 하나를 원자적으로 꺼냅니다. 비어 있으면 None."""
+    start = time.perf_counter()
+    doc = get_collection().find_one_and_delete(
+        {"category": category, "difficulty": difficulty},
+        sort=[("created_at", ASCENDING)],
+    )
+    metrics.observe("quiz_pool.claim_ms", (time.perf_counter() - start) * 1000)
+    metrics.incr("quiz_pool.claim_hit" if doc else "quiz_pool.claim_miss")
+    # 깊이 게이지는 빌더 주기에만 갱신되므로, 꺼낸 직후 다시 세어 /api/metrics가 실제보다 많게 보이지 않게 합니다.
+    metrics.set_gauge(f"quiz_pool.depth.{category}.{difficulty}", depth(category, difficulty) if doc else 0)
+    return doc["quizSets"] if doc else None
+
+
+def push(category: str, difficulty: str, quiz_sets: List[dict]) -> None:
+    """완성된 퀴즈 세트를 풀에 추가합니다."""
+    get_collection().insert_one({
+        "category": category,
+        "difficulty": difficulty,
+        "quizSets": quiz_sets,
+        "created_at": datetime.utcnow(),
+    })
+
+
+def depth(category: str, difficulty: str) -> int:
+    """풀에 남아 있는 퀴즈 세트 수를 반환합니다."""
+    return get_collection().count_documents({"category": category, "difficulty": difficulty})
+
+
+class QuizPoolBuilder:
+    """
+    (category, difficulty) 조합별로 풀 깊이를 감시하다가 low_watermark 미만이면
+    high_watermark까지 퀴즈 세트를 채우는 백그라운드 스레드.
+    - build_fn: (search_query, difficulty) -> quizSets
+    - lease_ttl: 배포 전체에서 한 프로세스만 채우도록 쥐는 Mongo 임대의 유효 시간.
+      조합/세트마다 갱신하므로, 임대를 쥔 프로세스가 죽으면 lease_ttl 뒤 다른 프로세스가 넘겨받습니다.
+    - distributed=False면 임대 없이 항상 채웁니다 (단일 프로세스/테스트용).
+    """
+
+    def __init__(
+        self,
+        build_fn: Callable[[str, str], List[dict]],
+        pairs: Iterable[Tuple[str, str]],
+        low_watermark: int = 3,
+        high_watermark: int = 10,
+        interval: float = 30.0,
+        lease_ttl: float = 300.0,
+        distributed: bool = True,
+    ):
+        if low_watermark > high_watermark:
+            raise ValueError("low_watermark는 high_watermark보다 클 수 없습니다.")
+        self.build_fn = build_fn
+        self.pairs = list(pairs)
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.interval = interval
+        self.lease_ttl = lease_ttl
+        self.distributed = distributed
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="quiz-pool-builder", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._release_lease()
+
+    def wake(self) -> None:
+        """
+        claim 직후 등 즉시 재확인이 필요할 때 호출합니다.
+        이 프로세스의 빌더만 깨웁니다. 임대를 쥔 빌더가 다른 프로세스에 있으면 그 빌더의 주기(interval)에 채워집니다.
+        """
+        self._wake.set()
+
+    # --- 배포 전체 단일 실행용 임대 ---
+    def hold_lease(self) -> bool:
+        """임대를 새로 얻거나 연장합니다. 다른 프로세스가 유효한 임대를 쥐고 있으면 False."""
+        if not self.distributed:
+            return True
+        now = datetime.utcnow()
+        try:
+            get_db()[LEASE_COLLECTION].find_one_and_update(
+                {"_id": BUILDER_LEASE, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.lease_ttl)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            # 문서는 있는데 조건(내 임대이거나 만료)이 맞지 않아 upsert가 충돌한 경우
+            return False
+
+    def _release_lease(self) -> None:
+        if not self.distributed:
+            return
+        try:
+            get_db()[LEASE_COLLECTION].delete_one({"_id": BUILDER_LEASE, "owner": self.owner})
+        except Exception as e:
+            logger.warning(f"퀴즈 풀 빌더 임대 해제 실패: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"퀴즈 풀 빌더 오류: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def run_once(self) -> None:
+        """
+        모든 조합에 대해 한 번씩 워터마크를 확인하고 필요하면 채웁니다.
+        임대를 쥐지 못했거나 도중에 잃으면(다른 프로세스가 채우는 중) 바로 돌아갑니다.
+        """
+        for category, difficulty in self.pairs:
+            if self._stop.is_set():
+                return
+            if not self.hold_lease():
+                metrics.incr("quiz_pool.lease_standby")
+                return
+            current = depth(category, difficulty)
+            metrics.set_gauge(f"quiz_pool.depth.{category}.{difficulty}", current)
+            if current >= self.low_watermark:
+                continue
+
+            logger.info(f"퀴즈 풀 보충: {category}/{difficulty} {current} -> {self.high_watermark}")
+            while current < self.high_watermark and not self._stop.is_set():
+                if not self.hold_lease():
+                    return
+                try:
+                    with metrics.timer("quiz_pool.build_ms"):
+                        quiz_sets = self.build_fn(category, difficulty)
+                except Exception as e:
+                    logger.warning(f"퀴즈 세트 생성 실패 ({category}/{difficulty}): {e}")
+                    metrics.incr("quiz_pool.build_error")
+                    break
+                push(category, difficulty, quiz_sets)
+                current += 1
+                metrics.set_gauge(f"quiz_pool.depth.{category}.{difficulty}", current)
@@ -0,0 +1,229 @@
+# replenisher.py
+"""
+카테고리별 이미지 풀 백그라운드 보충기.
+
+고정 카테고리(CATEGORY_CONFIG)와 자주 쓰이는 나만퀴 키워드의 카탈로그 이미지 수를 주기적으로 확인하고,
+임계치 미만이면 get_ai_prompts_for_category 프롬프트로 새 이미지를 미리 생성합니다.
+시간당 생성 예산(rate budget)은 MongoDB에 두고 모든 프로세스가 나눠 쓰므로,
+앱 워커마다 보충 스레드가 떠 있거나 `python crawling.py replenish`를 함께 실행해도 전체 생성량은 예산을 넘지 않습니다.
+사용자 요청과 같은 검색어는 single-flight로 합류합니다.
+"""
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Union
+
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+import catalog
+import metrics
+import singleflight
+from categories import get_ai_prompts_for_category, get_fixed_category_queries
+from config import Config
+from extensions import get_db
+
+logger = logging.getLogger(__name__)
+
+KEYWORD_STATS_COLLECTION = "keyword_stats"
+BUDGET_COLLECTION = "replenish_budget"
+
+
+def record_keyword_use(keyword: str) -> None:
+    """
+    나만퀴 키워드 사용 횟수를 기록합니다 (인기 키워드 선정용). 검색어/카탈로그 카테고리와 같은 정규화 키로 저장합니다.
+    REPLENISH_RECORD_KEYWORDS가 꺼져 있으면 아무것도 하지 않습니다 (보충기를 끄면 요청당 Mongo 쓰기도 없음).
+    """
+    if not Config.REPLENISH_RECORD_KEYWORDS or Config.REPLENISH_POPULAR_KEYWORDS <= 0:
+        return
+    key = singleflight.normalize_key(keyword)
+    if not key:
+        return
+    get_db()[KEYWORD_STATS_COLLECTION].update_one(
+        {"_id": key},
+        {"$inc": {"count": 1}, "$set": {"keyword": key, "last_used": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+def popular_keywords(limit: int, days: int = 7) -> List[str]:
+    """최근 days일 안에 쓰인 나만퀴 키워드 중 사용 횟수 상위 limit개."""
+    if limit <= 0:
+        return []
+    cursor = get_db()[KEYWORD_STATS_COLLECTION].find(
+        {"last_used": {"$gte": datetime.utcnow() - timedelta(days=days)}},
+        {"keyword": 1},
+    ).sort("count", DESCENDING).limit(limit)
+    return [doc["keyword"] for doc in cursor]
+
+
+class RateBudget:
+    """시간당 생성 가능한 이미지 수를 제한하는 토큰 버킷 (프로세스 내부용, 테스트/단독 실행)."""
+
+    def __init__(self, per_hour: int):
+        self.capacity = float(per_hour)
+        self.tokens = float(per_hour)
+        self.rate = per_hour / 3600.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, wanted: int) -> int:
+        """최대 wanted개까지 예산을 소모하고 실제로 허용된 개수를 반환합니다."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            granted = min(wanted, int(self.tokens))
+            self.tokens -= granted
+            return granted
+
+
+class SharedRateBudget:
+    """
+    MongoDB `replenish_budget` 문서 하나에 상태를 두는 프로세스 간 공용 토큰 버킷.
+    {_id: name, tokens, updated}를 읽어 보충/소모한 뒤, 읽은 값이 그대로일 때만 갱신합니다(compare-and-set).
+    다른 프로세스와 경합하면 다시 읽어 재시도하고, 끝내 실패하면 이번에는 0개를 허용합니다.
+    """
+
+    def __init__(self, per_hour: int, name: str = "replenisher", max_retries: int = 5):
+        self.capacity = float(per_hour)
+        self.rate = per_hour / 3600.0
+        self.name = name
+        self.max_retries = max_retries
+
+    def take(self, wanted: int) -> int:
+        """최대 wanted개까지 예산을 소모하고 실제로 허용된 개수를 반환합니다."""
+        collection = get_db()[BUDGET_COLLECTION]
+        for _ in range(self.max_retries):
+            now = datetime.utcnow()
+            doc = collection.find_one({"_id": self.name})
+            if doc is None:
+                tokens = self.capacity
+            else:
+                elapsed = max((now - doc["updated"]).total_seconds(), 0.0)
+                tokens = min(self.capacity, doc["tokens"] + elapsed * self.rate)
+            granted = max(min(wanted, int(tokens)), 0)
+            state = {"tokens": tokens - granted, "updated": now}
+
+            if doc is None:
+                try:
+                    collection.insert_one({"_id": self.name, **state})
+                    return granted
+                except DuplicateKeyError:
+                    continue
+            result = collection.update_one(
+                {"_id": self.name, "tokens": doc["tokens"], "updated": doc["updated"]},
+                {"$set": state},
+            )
+            if result.modified_count:
+                return granted
+        metrics.incr("replenisher.budget_contended")
+        return 0
+
+
+def _default_generate(query: str, count: int) -> Dict[str, List[str]]:
+    from crawling import generate_images_concurrent
+
+    prompts = get_ai_prompts_for_category(query)
+    return generate_images_concurrent(
+        prompts=random.sample(prompts, k=min(count, len(prompts))),
+        category=query,
+        repeat_per_prompt=1,
+        max_workers=Config.REPLENISH_MAX_WORKERS,
+    )
+
+
+class ImageReplenisher:
+    """
+    low-watermark 이미지 보충기.
+    - threshold: 검색어별로 유지할 최소 이미지 수
+    - batch_size: 한 번에 생성할 최대 이미지 수
+    - budget: 시간당 생성 예산 (기본: 프로세스 간 공용 SharedRateBudget)
+    """
+
+    def __init__(
+        self,
+        threshold: int = 30,
+        batch_size: int = 10,
+        interval: float = 300.0,
+        budget: Optional[Union[RateBudget, SharedRateBudget]] = None,
+        popular_limit: int = 5,
+        generate_fn: Callable[[str, int], Dict[str, List[str]]] = _default_generate,
+    ):
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.interval = interval
+        self.budget = budget or SharedRateBudget(Config.REPLENISH_BUDGET_PER_HOUR)
+        self.popular_limit = popular_limit
+        self.generate_fn = generate_fn
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def targets(self) -> List[str]:
+        """감시 대상 검색어: 고정 카테고리 + 인기 나만퀴 키워드."""
+        queries = get_fixed_category_queries()
+        for keyword in popular_keywords(self.popular_limit):
+            if keyword not in queries:
+                queries.append(keyword)
+        return queries
+
+    def run_once(self) -> int:
+        """모든 대상을 한 번 확인하고 필요한 만큼 생성합니다. 생성한 이미지 수를 반환합니다."""
+        generated = 0
+        for query in self.targets():
+            if self._stop.is_set():
+                break
+            count = catalog.count_images(query)
+            metrics.set_gauge(f"replenisher.images.{query}", count)
+            if count >= self.threshold:
+                continue
+
+            wanted = min(self.threshold - count, self.batch_size)
+            granted = self.budget.take(wanted)
+            if granted <= 0:
+                logger.info(f"보충 예산 소진 - '{query}' 건너뜀 ({count}/{self.threshold})")
+                metrics.incr("replenisher.budget_exhausted")
+                continue
+
+            logger.info(f"이미지 보충: '{query}' {count}장 -> +{granted}장")
+            try:
+                results = singleflight.get_flight().do(query, lambda: self.generate_fn(query, granted))
+            except Exception as e:
+                logger.error(f"이미지 보충 실패 ('{query}'): {e}")
+                metrics.incr("replenisher.error")
+                continue
+            if results:
+                made = sum(len(paths) for paths in results.values())
+                generated += made
+                metrics.incr("replenisher.generated", made)
+        return generated
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="image-replenisher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"이미지 보충기 오류: {e}")
+            self._stop.wait(self.interval)
+
+
+def from_config() -> ImageReplenisher:
+    """Config 설정으로 보충기를 만듭니다."""
+    return ImageReplenisher(
+        threshold=Config.REPLENISH_THRESHOLD,
+        batch_size=Config.REPLENISH_BATCH_SIZE,
+        interval=Config.REPLENISH_INTERVAL,
+        popular_limit=Config.REPLENISH_POPULAR_KEYWORDS,
+    )
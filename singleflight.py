@@ -0,0 +1,179 @@
+# singleflight.py
+"""
+동일 키(정규화된 검색어)에 대한 이미지 생성 중복 실행 방지.
+
+같은 키워드로 동시에 여러 게임이 시작되면, 첫 요청(leader)만 생성을 실행하고
+나머지 요청은 진행 중인 생성이 끝나기를 기다렸다가 그 결과를 함께 사용합니다.
+- 프로세스 내부: 키별 진행 중 호출 레지스트리 (threading.Event)
+- 프로세스 간: MongoDB `generation_locks` 컬렉션의 만료 시간이 있는 락
+  (락을 쥔 동안은 heartbeat 스레드가 lock_ttl/3마다 만료 시각을 연장하므로, 생성이 lock_ttl보다 길어져도
+   다른 프로세스가 넘겨받지 않습니다. 소유 프로세스가 죽으면 연장이 끊겨 lock_ttl 뒤 만료됩니다.)
+  (다른 프로세스가 락을 쥐고 있으면 풀릴 때까지 기다린 뒤 결과 없이(None) 반환하므로,
+   호출자는 카탈로그를 다시 조회해 그 프로세스가 만든 이미지를 사용합니다.)
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+import metrics
+from config import Config
+from extensions import get_db
+
+logger = logging.getLogger(__name__)
+
+LOCK_COLLECTION = "generation_locks"
+
+
+def normalize_key(query: str) -> str:
+    """대소문자/공백 차이를 없앤 키를 만듭니다."""
+    return " ".join(query.strip().lower().split())
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """키별로 한 번만 실행되도록 보장하는 생성 레지스트리."""
+
+    def __init__(self, lock_ttl: float = 300.0, poll_interval: float = 1.0, distributed: bool = True):
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.distributed = distributed
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._indexes_ready = False
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        key에 대해 fn을 한 번만 실행합니다.
+        - 이 프로세스에서 이미 실행 중이면 그 결과를 기다려 그대로 반환
+        - 다른 프로세스가 실행 중이면 끝날 때까지 기다린 뒤 None 반환
+        """
+        key = normalize_key(key)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.incr("singleflight.joined_local")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_locked(key, fn)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    # --- 프로세스 간 락 ---
+    def _collection(self):
+        collection = get_db()[LOCK_COLLECTION]
+        if not self._indexes_ready:
+            collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+            self._indexes_ready = True
+        return collection
+
+    def _acquire(self, key: str) -> bool:
+        collection = self._collection()
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lock_ttl)
+        try:
+            collection.insert_one({"_id": key, "owner": self.owner, "expires_at": expires_at})
+            return True
+        except DuplicateKeyError:
+            # 만료된 락(소유 프로세스가 죽은 경우)은 넘겨받습니다.
+            taken = collection.find_one_and_update(
+                {"_id": key, "expires_at": {"$lt": now}},
+                {"$set": {"owner": self.owner, "expires_at": expires_at}},
+            )
+            return taken is not None
+
+    def _renew(self, key: str) -> bool:
+        """내가 쥔 락의 만료 시각을 연장합니다. 이미 잃었으면(만료 후 다른 프로세스가 가져감) False."""
+        result = self._collection().update_one(
+            {"_id": key, "owner": self.owner},
+            {"$set": {"expires_at": datetime.utcnow() + timedelta(seconds=self.lock_ttl)}},
+        )
+        return result.matched_count > 0
+
+    def _heartbeat(self, key: str, stop: threading.Event) -> None:
+        while not stop.wait(self.lock_ttl / 3):
+            try:
+                if not self._renew(key):
+                    logger.warning(f"생성 락을 잃었습니다 ({key})")
+                    metrics.incr("singleflight.lock_lost")
+                    return
+            except Exception as e:
+                logger.warning(f"생성 락 연장 실패 ({key}): {e}")
+
+    def _release(self, key: str) -> None:
+        # owner 조건으로 지우므로, 만료 후 다른 프로세스가 가져간 락은 건드리지 않습니다.
+        try:
+            self._collection().delete_one({"_id": key, "owner": self.owner})
+        except Exception as e:
+            logger.warning(f"생성 락 해제 실패 ({key}): {e}")
+
+    def _wait_remote(self, key: str) -> None:
+        deadline = time.monotonic() + self.lock_ttl
+        collection = self._collection()
+        while time.monotonic() < deadline:
+            doc = collection.find_one({"_id": key})
+            if doc is None or doc["expires_at"] < datetime.utcnow():
+                return
+            time.sleep(self.poll_interval)
+
+    def _run_locked(self, key: str, fn: Callable[[], Any]) -> Any:
+        if not self.distributed:
+            metrics.incr("singleflight.leader")
+            return fn()
+
+        if not self._acquire(key):
+            metrics.incr("singleflight.joined_remote")
+            logger.info(f"다른 프로세스에서 '{key}' 생성 중 - 완료 대기")
+            self._wait_remote(key)
+            return None
+
+        metrics.incr("singleflight.leader")
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(key, stop), name="lock-heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            return fn()
+        finally:
+            stop.set()
+            self._release(key)
+
+
+_flight: Optional[SingleFlight] = None
+_flight_lock = threading.Lock()
+
+
+def get_flight() -> SingleFlight:
+    """프로세스 공용 생성 레지스트리를 반환합니다."""
+    global _flight
+    with _flight_lock:
+        if _flight is None:
+            _flight = SingleFlight(lock_ttl=Config.GENERATION_LOCK_TTL)
+        return _flight
@@ -0,0 +1,297 @@
+# storage.py
+"""
+이미지 저장소 추상화.
+
+앱/크롤러/카탈로그/유지보수 도구는 boto3를 직접 쓰지 않고 `get_storage()`가 돌려주는 저장소를 거칩니다.
+- S3Storage: 기존 S3 버킷 (STORAGE_BACKEND=s3, 기본값)
+- LocalStorage: 로컬 디스크. 내용 해시(sha256)로 샤딩된 디렉터리에 blob을 저장하고,
+  논리 키(generated/cat/a.png)는 blob 해시를 가리키는 ref 파일로 관리합니다.
+  단일 서버 배포나 AWS 없는 부하 테스트용이며, 이미지는 `/local-images/<key>`로 서빙됩니다.
+
+공통 인터페이스: put / get / exists / list / url / delete / delete_many
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+from urllib.parse import quote
+
+import image_utils
+from config import Config
+
+
+class NotFound(KeyError):
+    """저장소에 없는 키."""
+
+
+class Storage(ABC):
+    """저장소 인터페이스. list()는 {'key', 'size', 'last_modified'} dict를 순회합니다."""
+
+    @abstractmethod
+    def put(self, key: str, data: image_utils.BufferLike, content_type: Optional[str] = None,
+            cache_control: Optional[str] = None) -> str:
+        ...
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def list(self, prefix: str) -> Iterator[Dict]:
+        ...
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """여러 키를 삭제하고 삭제한 수를 반환합니다."""
+        count = 0
+        for key in keys:
+            self.delete(key)
+            count += 1
+        return count
+
+
+class S3Storage(Storage):
+    """S3 버킷 저장소."""
+
+    def __init__(self, bucket: str, region: str, client=None, max_pool_connections: int = 10):
+        self.bucket = bucket
+        self.region = region
+        if client is None:
+            import boto3
+            from botocore.config import Config as BotoConfig
+
+            client = boto3.client(
+                's3',
+                aws_access_key_id=Config.aws_access_key,
+                aws_secret_access_key=Config.aws_secret_key,
+                region_name=region,
+                config=BotoConfig(max_pool_connections=max_pool_connections),
+            )
+        self.client = client
+        self.base_url = f"https://{bucket}.s3.{region}.amazonaws.com/"
+
+    def put(self, key, data, content_type=None, cache_control=None):
+        extra = {}
+        if content_type:
+            extra["ContentType"] = content_type
+        if cache_control:
+            extra["CacheControl"] = cache_control
+        # 메모리에 있는 이미지 데이터를 복사 없이(memoryview) 업로드
+        self.client.upload_fileobj(image_utils.BufferReader(data), self.bucket, key, ExtraArgs=extra or None)
+        return key
+
+    def get(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            raise NotFound(key)
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def list(self, prefix):
+        """list_objects_v2 페이지네이션으로 prefix 아래 모든 객체를 순회합니다 (1000개 제한 없음)."""
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if not obj["Key"].endswith("/"):
+                    yield {"key": obj["Key"], "size": obj.get("Size", 0), "last_modified": obj.get("LastModified")}
+
+    def url(self, key):
+        # 한글/공백이 들어간 키(사용자 키워드 카테고리)도 올바른 URL이 되도록 퍼센트 인코딩합니다.
+        return self.base_url + quote(key, safe="/")
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def delete_many(self, keys):
+        """delete_objects로 최대 1000개씩 묶어 삭제합니다."""
+        keys = list(keys)
+        deleted = 0
+        for i in range(0, len(keys), 1000):
+            batch = keys[i:i + 1000]
+            response = self.client.delete_objects(
+                Bucket=self.bucket, Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True}
+            )
+            deleted += len(batch) - len(response.get("Errors", []))
+        return deleted
+
+
+class LocalStorage(Storage):
+    """
+    내용 주소 기반 로컬 저장소.
+    root/blobs/ab/cd/<sha256>   실제 바이트 (같은 내용은 한 번만 저장)
+    root/refs/<key>.json        {"hash", "size", "content_type", "cache_control", "created_at"}
+    """
+
+    def __init__(self, root: str, base_url: str = "/local-images/"):
+        self.root = Path(root)
+        self.base_url = base_url
+        self.blob_dir = self.root / "blobs"
+        self.ref_dir = self.root / "refs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.ref_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _ref_path(self, key: str) -> Path:
+        path = (self.ref_dir / f"{key}.json").resolve()
+        if self.ref_dir.resolve() not in path.parents:
+            raise ValueError(f"잘못된 키: {key}")
+        return path
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest[2:4] / digest
+
+    @staticmethod
+    def _atomic_write(path: Path, data) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def read_ref(self, key: str) -> Dict:
+        try:
+            with open(self._ref_path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise NotFound(key)
+
+    def put(self, key, data, content_type=None, cache_control=None):
+        view = memoryview(data).cast("B")
+        digest = hashlib.sha256(view).hexdigest()
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            self._atomic_write(blob, view)
+        ref = {
+            "hash": digest,
+            "size": len(view),
+            "content_type": content_type or image_utils.content_type_for_key(key),
+            "cache_control": cache_control,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._atomic_write(self._ref_path(key), json.dumps(ref).encode("utf-8"))
+        return key
+
+    def get(self, key):
+        ref = self.read_ref(key)
+        try:
+            return self.blob_path(ref["hash"]).read_bytes()
+        except FileNotFoundError:
+            raise NotFound(key)
+
+    def exists(self, key):
+        return self._ref_path(key).exists()
+
+    def list(self, prefix):
+        base = self.ref_dir
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                if not name.endswith(".json"):
+                    continue
+                path = Path(dirpath) / name
+                key = path.relative_to(base).as_posix()[:-len(".json")]
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        ref = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                yield {
+                    "key": key,
+                    "size": ref.get("size", 0),
+                    "last_modified": datetime.fromisoformat(ref["created_at"]) if ref.get("created_at") else None,
+                }
+
+    def url(self, key):
+        return self.base_url + quote(key, safe="/")
+
+    def delete(self, key):
+        # ref만 지웁니다. 다른 키가 같은 blob을 가리킬 수 있으므로 blob 정리는 GC가 담당합니다.
+        try:
+            self._ref_path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def collect_blobs(self, min_age: float = 3600, dry_run: bool = False) -> Dict[str, int]:
+        """
+        어떤 ref도 가리키지 않는 blob을 지웁니다.
+        min_age초보다 새 blob은 남깁니다 (blob을 쓰고 ref를 쓰기 직전인 업로드가 있을 수 있음).
+        반환: {'scanned': n, 'deleted': n, 'bytes': n}
+        """
+        live = set()
+        for dirpath, _, filenames in os.walk(self.ref_dir):
+            for name in filenames:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(Path(dirpath) / name, encoding="utf-8") as f:
+                        live.add(json.load(f)["hash"])
+                except (OSError, ValueError, KeyError):
+                    continue
+
+        summary = {"scanned": 0, "deleted": 0, "bytes": 0}
+        cutoff = datetime.now().timestamp() - min_age
+        for dirpath, _, filenames in os.walk(self.blob_dir):
+            for name in filenames:
+                if name.startswith(".tmp-"):
+                    continue
+                summary["scanned"] += 1
+                path = Path(dirpath) / name
+                if name in live:
+                    continue
+                stat = path.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                summary["deleted"] += 1
+                summary["bytes"] += stat.st_size
+                if not dry_run:
+                    path.unlink(missing_ok=True)
+        return summary
+
+
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    """STORAGE_BACKEND 설정에 맞는 프로세스 공용 저장소를 반환합니다."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if Config.STORAGE_BACKEND == "local":
+                _storage = LocalStorage(Config.LOCAL_STORAGE_DIR, Config.LOCAL_STORAGE_URL)
+            else:
+                _storage = S3Storage(Config.bucket_name, Config.region_name,
+                                     max_pool_connections=Config.S3_MAX_POOL_CONNECTIONS)
+        return _storage
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# 저장소 최상위 모듈(config, urls, ...)을 바로 import할 수 있게 합니다.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+# tests/test_game_jobs.py
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import game_jobs
+
+
+@pytest.fixture
+def db(monkeypatch):
+    mongomock = pytest.importorskip("mongomock", reason="게임 작업 테스트에는 mongomock이 필요합니다")
+    database = mongomock.MongoClient().db
+    monkeypatch.setattr(game_jobs, "get_db", lambda: database)
+    monkeypatch.setattr(game_jobs, "_indexes_ready", False)
+    return database
+
+
+def test_job_runs_to_done(db):
+    job_id = game_jobs.submit(lambda: [{"images": [], "correctAnswer": 0}], category="cat")
+    job = game_jobs.wait(job_id, timeout=5)
+    assert job["status"] == game_jobs.STATUS_DONE
+    assert job["quizSets"] == [{"images": [], "correctAnswer": 0}]
+    assert job["started_at"] is not None
+
+
+def test_submit_rejects_when_queue_is_full(db, monkeypatch):
+    monkeypatch.setattr(game_jobs, "_slots", threading.BoundedSemaphore(1))
+    release = threading.Event()
+    job_id = game_jobs.submit(lambda: release.wait(5) and [])
+    try:
+        with pytest.raises(game_jobs.JobQueueFull):
+            game_jobs.submit(lambda: [])
+    finally:
+        release.set()
+    game_jobs.wait(job_id, timeout=5)
+    # 끝난 작업의 자리는 다시 쓸 수 있습니다.
+    assert game_jobs.wait(game_jobs.submit(lambda: []), timeout=5)["status"] == game_jobs.STATUS_DONE
+
+
+def test_abandoned_running_job_is_failed_after_lease(db):
+    # 다른 프로세스가 실행하다 죽은 작업: running 상태로 임대만 끝나 있습니다.
+    collection = game_jobs.get_collection()
+    past = datetime.utcnow() - timedelta(seconds=1)
+    collection.insert_one({"_id": "j1", "status": game_jobs.STATUS_RUNNING, "created_at": past, "lease_expires": past})
+    collection.insert_one({"_id": "j2", "status": game_jobs.STATUS_RUNNING, "created_at": past,
+                           "lease_expires": datetime.utcnow() + timedelta(seconds=60)})
+
+    job = game_jobs.wait("j1", timeout=1)
+    assert job["status"] == game_jobs.STATUS_ERROR
+    assert job["message"] == game_jobs.LEASE_EXPIRED_MESSAGE and job["status_code"] == 503
+    assert game_jobs.get("j2")["status"] == game_jobs.STATUS_RUNNING
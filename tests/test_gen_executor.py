@@ -0,0 +1,111 @@
+# tests/test_gen_executor.py
+import threading
+import time
+
+import pytest
+
+import gen_executor
+
+
+class Throttled(Exception):
+    code = 429
+
+
+def make_executor(**kwargs):
+    options = dict(max_limit=8, min_limit=1, initial_limit=4, target_latency=1.0)
+    options.update(kwargs)
+    return gen_executor.GenerationExecutor(**options)
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "시간 초과"
+        time.sleep(0.01)
+
+
+def test_is_throttle_error():
+    assert gen_executor.is_throttle_error(Throttled())
+    assert gen_executor.is_throttle_error(RuntimeError("429 RESOURCE_EXHAUSTED"))
+    assert not gen_executor.is_throttle_error(RuntimeError("500 INTERNAL"))
+
+
+def test_additive_increase_on_fast_success():
+    executor = make_executor()
+    for _ in range(4):
+        executor._adjust_locked(latency=0.1, throttled=False)
+    # 한도 4에서 성공 4번이면 약 +1
+    assert executor.limit == 4
+    assert executor._limit == pytest.approx(4.93, abs=0.01)
+    executor._adjust_locked(latency=0.1, throttled=False)
+    assert executor.limit == 5
+
+
+def test_multiplicative_decrease_on_throttle_and_slow_response():
+    executor = make_executor()
+    executor._adjust_locked(latency=0.1, throttled=True)
+    assert executor._limit == pytest.approx(2.0)
+    executor._adjust_locked(latency=5.0, throttled=False)
+    assert executor._limit == pytest.approx(1.8)
+
+
+def test_limit_stays_within_bounds():
+    executor = make_executor(initial_limit=8)
+    for _ in range(50):
+        executor._adjust_locked(latency=0.1, throttled=False)
+    assert executor.limit == 8
+    for _ in range(10):
+        executor._adjust_locked(latency=0.1, throttled=True)
+    assert executor.limit == 1
+
+
+def test_throttled_task_lowers_limit_and_surfaces_error():
+    executor = make_executor()
+
+    def fail():
+        raise Throttled("RESOURCE_EXHAUSTED")
+
+    future = executor.submit(fail)
+    with pytest.raises(Throttled):
+        future.result(timeout=5)
+    # 한도 조정은 Future 완료 직후 워커에서 일어납니다.
+    wait_until(lambda: executor.stats()["in_flight"] == 0)
+    executor.shutdown()
+    assert executor.limit == 2
+
+
+def test_batch_cap_limits_in_flight_tasks():
+    executor = make_executor()
+    release = threading.Event()
+    running = []
+    lock = threading.Lock()
+
+    def task():
+        with lock:
+            running.append(1)
+        release.wait(5)
+        with lock:
+            running.pop()
+        return True
+
+    futures = [executor.submit(task, batch="b", max_in_flight=2) for _ in range(4)]
+    try:
+        wait_until(lambda: executor.stats()["in_flight"] == 2)
+        time.sleep(0.05)
+        assert executor.stats()["in_flight"] == 2
+        assert executor.stats()["queue_depth"] == 2
+    finally:
+        release.set()
+    assert all(f.result(timeout=5) for f in futures)
+    executor.shutdown()
+
+
+def test_completion_callbacks_are_not_counted_as_latency():
+    # 업로드 큐 배압처럼 완료 콜백에서 기다린 시간은 생성 지연으로 보지 않습니다.
+    executor = make_executor(target_latency=0.05)
+    future = executor.submit(lambda: time.sleep(0.02) or "payloads")
+    future.add_done_callback(lambda _: time.sleep(0.2))
+    assert future.result(timeout=5) == "payloads"
+    wait_until(lambda: executor.stats()["in_flight"] == 0)
+    executor.shutdown()
+    assert executor._limit > 4
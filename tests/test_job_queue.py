@@ -0,0 +1,73 @@
+# tests/test_job_queue.py
+from datetime import datetime, timedelta
+
+import pytest
+
+import job_queue
+
+
+def expire_lease(queue, job_id):
+    """임대 만료를 흉내냅니다 (워커가 fail()을 부르지 못하고 죽은 경우)."""
+    past = datetime.utcnow() - timedelta(seconds=1)
+    if isinstance(queue, job_queue.InMemoryJobQueue):
+        queue._jobs[job_id]["lease_expires"] = past
+    else:
+        queue._collection().update_one({"_id": job_id}, {"$set": {"lease_expires": past}})
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def queue(request):
+    options = dict(lease_seconds=60, max_attempts=2, backoff_base=0, backoff_max=0)
+    if request.param == "memory":
+        return job_queue.InMemoryJobQueue(**options)
+    mongomock = pytest.importorskip("mongomock", reason="MongoJobQueue 테스트에는 mongomock이 필요합니다")
+    collection = mongomock.MongoClient().db[job_queue.JOB_COLLECTION]
+    mongo_queue = job_queue.MongoJobQueue(**options)
+    mongo_queue._collection = lambda: collection
+    return mongo_queue
+
+
+def test_enqueue_is_idempotent(queue):
+    assert queue.enqueue("p", "cat", idempotency_key="k") == "k"
+    assert queue.enqueue("p", "cat", idempotency_key="k") == "k"
+    assert queue.stats()["pending"] == 1
+
+
+def test_lease_and_complete(queue):
+    job_id = queue.enqueue("p", "cat")
+    job = queue.lease("w1")
+    assert job["_id"] == job_id and job["attempts"] == 1
+    assert queue.lease("w2") is None
+    assert not queue.complete(job_id, "w2", ["x"])
+    assert queue.complete(job_id, "w1", ["generated/cat/a.png"])
+    assert queue.get(job_id)["status"] == "done"
+
+
+def test_fail_retries_then_fails(queue):
+    job_id = queue.enqueue("p", "cat")
+    queue.lease("w1")
+    assert queue.fail(job_id, "w1", "boom") == "pending"
+    queue.lease("w1")
+    assert queue.fail(job_id, "w1", "boom") == "failed"
+    assert queue.lease("w1") is None
+
+
+def test_expired_lease_is_released(queue):
+    job_id = queue.enqueue("p", "cat")
+    queue.lease("w1")
+    expire_lease(queue, job_id)
+    job = queue.lease("w2")
+    assert job["_id"] == job_id and job["lease_owner"] == "w2" and job["attempts"] == 2
+    assert not queue.extend(job_id, "w1")
+
+
+def test_expired_lease_over_max_attempts_fails(queue):
+    job_id = queue.enqueue("p", "cat")
+    queue.lease("w1")
+    expire_lease(queue, job_id)
+    queue.lease("w2")
+    expire_lease(queue, job_id)
+    # 두 번 다 워커가 죽었으므로 더 이상 임대하지 않고 failed로 옮깁니다.
+    assert queue.lease("w3") is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and job["last_error"] == job_queue.LEASE_EXPIRED_ERROR
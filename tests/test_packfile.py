@@ -0,0 +1,81 @@
+# tests/test_packfile.py
+import pytest
+from flask import Flask, request
+
+import packfile
+
+KEY = "variants/cat/abc.w640.webp"
+DATA = bytes(range(256)) * 4  # 1024바이트
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, (0, 1024, 200)),
+    ("bytes=0-9", (0, 10, 206)),
+    ("bytes=1000-", (1000, 1024, 206)),
+    ("bytes=1000-5000", (1000, 1024, 206)),
+    ("bytes=-24", (1000, 1024, 206)),
+    ("bytes=-5000", (0, 1024, 206)),
+    ("bytes=1024-", (0, 1024, 416)),
+    ("bytes=-0", (0, 1024, 416)),
+    # 여러 구간, 잘못된 형식은 Range를 무시하고 전체를 보냅니다.
+    ("bytes=0-9,20-29", (0, 1024, 200)),
+    ("bytes=9-0", (0, 1024, 200)),
+    ("items=0-9", (0, 1024, 200)),
+    ("bytes=-", (0, 1024, 200)),
+])
+def test_select_range(header, expected):
+    assert packfile.select_range(header, 1024) == expected
+
+
+@pytest.fixture
+def reader(tmp_path):
+    path = tmp_path / "cat.pack"
+    with packfile.PackWriter(path) as writer:
+        writer.add("generated/cat/a.png", b"\x89PNG....")
+        writer.add(KEY, DATA)
+        writer.add("generated/cat/blob", b"raw")
+    return packfile.PackReader(path)
+
+
+def test_round_trip(reader):
+    assert len(reader) == 3
+    assert bytes(reader.get(KEY)) == DATA
+    assert reader.entry(KEY).content_type == "image/webp"
+    # 확장자로 알 수 없는 키도 Content-Type 기본값을 갖습니다.
+    assert reader.entry("generated/cat/blob").content_type == packfile.DEFAULT_CONTENT_TYPE
+
+
+@pytest.fixture
+def client(reader):
+    app = Flask(__name__)
+
+    @app.route("/packed/<path:key>")
+    def packed(key):
+        return packfile.make_response(reader, key, request)
+
+    return app.test_client()
+
+
+def test_packed_full_and_single_range(client):
+    full = client.get(f"/packed/{KEY}")
+    assert full.status_code == 200 and full.data == DATA
+    assert full.headers["Content-Type"] == "image/webp"
+
+    part = client.get(f"/packed/{KEY}", headers={"Range": "bytes=10-19"})
+    assert part.status_code == 206 and part.data == DATA[10:20]
+    assert part.headers["Content-Range"] == "bytes 10-19/1024"
+
+
+def test_packed_multiple_ranges_fall_back_to_full_body(client):
+    response = client.get(f"/packed/{KEY}", headers={"Range": "bytes=0-1,5-6"})
+    assert response.status_code == 200 and response.data == DATA
+
+
+def test_packed_unsatisfiable_and_conditional(client, reader):
+    response = client.get(f"/packed/{KEY}", headers={"Range": "bytes=5000-"})
+    assert response.status_code == 416 and response.headers["Content-Range"] == "bytes */1024"
+
+    etag = reader.entry(KEY).etag
+    assert client.get(f"/packed/{KEY}", headers={"If-None-Match": f'"{etag}"'}).status_code == 304
+    stale = client.get(f"/packed/{KEY}", headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert stale.status_code == 200 and stale.data == DATA
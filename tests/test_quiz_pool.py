@@ -0,0 +1,56 @@
+# tests/test_quiz_pool.py
+from datetime import datetime, timedelta
+
+import pytest
+
+import metrics
+import quiz_pool
+
+
+@pytest.fixture
+def db(monkeypatch):
+    mongomock = pytest.importorskip("mongomock", reason="퀴즈 풀 테스트에는 mongomock이 필요합니다")
+    database = mongomock.MongoClient().db
+    monkeypatch.setattr(quiz_pool, "get_db", lambda: database)
+    monkeypatch.setattr(quiz_pool, "_indexes_ready", False)
+    return database
+
+
+def make_builder(calls):
+    def build(category, difficulty):
+        calls.append((category, difficulty))
+        return [{"images": [], "correctAnswer": 0}]
+    return quiz_pool.QuizPoolBuilder(build, [("cat", "easy")], low_watermark=1, high_watermark=2)
+
+
+def test_only_lease_holder_fills_pool(db):
+    first_calls, second_calls = [], []
+    first, second = make_builder(first_calls), make_builder(second_calls)
+    first.run_once()
+    second.run_once()
+    assert len(first_calls) == 2 and second_calls == []
+    assert quiz_pool.depth("cat", "easy") == 2
+
+
+def test_lease_moves_on_release_and_expiry(db):
+    first, second = make_builder([]), make_builder([])
+    assert first.hold_lease() and not second.hold_lease()
+    first.stop()
+    assert second.hold_lease() and not first.hold_lease()
+
+    # 임대를 쥔 프로세스가 죽어 갱신이 끊기면 만료 후 넘겨받습니다.
+    db[quiz_pool.LEASE_COLLECTION].update_one(
+        {"_id": quiz_pool.BUILDER_LEASE}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+    assert first.hold_lease() and not second.hold_lease()
+
+
+def test_claim_updates_depth_gauge(db):
+    for _ in range(2):
+        quiz_pool.push("cat", "easy", [{"images": [], "correctAnswer": 0}])
+    metrics.set_gauge("quiz_pool.depth.cat.easy", 2)
+    assert quiz_pool.claim("cat", "easy")
+    assert metrics.snapshot()["gauges"]["quiz_pool.depth.cat.easy"] == 1
+    quiz_pool.claim("cat", "easy")
+    assert quiz_pool.claim("cat", "easy") is None
+    assert metrics.snapshot()["gauges"]["quiz_pool.depth.cat.easy"] == 0
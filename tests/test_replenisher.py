@@ -0,0 +1,45 @@
+# tests/test_replenisher.py
+import pytest
+
+import replenisher
+
+
+@pytest.fixture
+def db(monkeypatch):
+    mongomock = pytest.importorskip("mongomock", reason="보충기 테스트에는 mongomock이 필요합니다")
+    database = mongomock.MongoClient().db
+    monkeypatch.setattr(replenisher, "get_db", lambda: database)
+    return database
+
+
+def test_shared_budget_is_split_across_processes(db):
+    # 워커 프로세스마다 따로 만든 예산 객체도 같은 Mongo 문서를 나눠 씁니다.
+    first = replenisher.SharedRateBudget(10)
+    second = replenisher.SharedRateBudget(10)
+    assert first.take(6) == 6
+    assert second.take(6) == 4
+    assert first.take(1) == 0
+
+
+def test_shared_budget_refills_over_time(db):
+    budget = replenisher.SharedRateBudget(3600)
+    assert budget.take(3600) == 3600
+    db[replenisher.BUDGET_COLLECTION].update_one(
+        {"_id": budget.name}, {"$inc": {"tokens": 5}}
+    )
+    assert budget.take(10) == 5
+
+
+def test_keyword_stats_store_normalized_keyword(db, monkeypatch):
+    monkeypatch.setattr(replenisher.Config, "REPLENISH_RECORD_KEYWORDS", True)
+    replenisher.record_keyword_use("  Golden   Retriever ")
+    replenisher.record_keyword_use("golden retriever")
+    doc = db[replenisher.KEYWORD_STATS_COLLECTION].find_one({"_id": "golden retriever"})
+    assert doc["count"] == 2 and doc["keyword"] == "golden retriever"
+    assert replenisher.popular_keywords(5) == ["golden retriever"]
+
+
+def test_keyword_use_is_not_recorded_when_disabled(db, monkeypatch):
+    monkeypatch.setattr(replenisher.Config, "REPLENISH_RECORD_KEYWORDS", False)
+    replenisher.record_keyword_use("golden retriever")
+    assert db[replenisher.KEYWORD_STATS_COLLECTION].count_documents({}) == 0
@@ -0,0 +1,116 @@
+# tests/test_singleflight.py
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import metrics
+import singleflight
+
+
+def joined_local():
+    return metrics.snapshot()["counters"].get("singleflight.joined_local", 0)
+
+
+def test_normalize_key():
+    assert singleflight.normalize_key("  Golden   Retriever ") == "golden retriever"
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = singleflight.SingleFlight(distributed=False)
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def generate():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"prompt": ["generated/x/a.png"]}
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("Cat", generate)))
+    leader.start()
+    assert started.wait(5)
+    # 대소문자/공백만 다른 키도 같은 생성에 합류합니다.
+    joined_before = joined_local()
+    followers = [threading.Thread(target=lambda: results.append(flight.do(" cat ", generate))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    deadline = time.monotonic() + 5
+    while joined_local() - joined_before < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 4 and all(r == {"prompt": ["generated/x/a.png"]} for r in results)
+
+
+def test_errors_propagate_and_next_call_runs_again():
+    flight = singleflight.SingleFlight(distributed=False)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("cat", fail)
+    assert flight.do("cat", lambda: "ok") == "ok"
+
+
+@pytest.fixture
+def distributed(monkeypatch):
+    mongomock = pytest.importorskip("mongomock", reason="프로세스 간 락 테스트에는 mongomock이 필요합니다")
+    database = mongomock.MongoClient().db
+    monkeypatch.setattr(singleflight, "get_db", lambda: database)
+    return database
+
+
+def test_other_process_waits_for_lock_and_returns_none(distributed):
+    holder = singleflight.SingleFlight(poll_interval=0.01)
+    waiter = singleflight.SingleFlight(lock_ttl=5, poll_interval=0.01)
+    assert holder._acquire("cat")
+
+    threading.Timer(0.05, holder._release, args=("cat",)).start()
+    calls = []
+    assert waiter.do("cat", lambda: calls.append(1)) is None
+    assert calls == []
+
+
+def test_expired_lock_is_taken_over(distributed):
+    holder = singleflight.SingleFlight()
+    assert holder._acquire("cat")
+    distributed[singleflight.LOCK_COLLECTION].update_one(
+        {"_id": "cat"}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+    assert singleflight.SingleFlight().do("cat", lambda: "ok") == "ok"
+
+
+def test_lock_is_renewed_while_generation_runs(distributed):
+    owner = singleflight.SingleFlight(lock_ttl=0.3, poll_interval=0.01)
+    other = singleflight.SingleFlight(lock_ttl=0.3, poll_interval=0.01)
+    taken = []
+
+    def generate():
+        # lock_ttl보다 오래 걸리는 생성 중에도 다른 프로세스는 락을 가져가지 못합니다.
+        for _ in range(5):
+            time.sleep(0.1)
+            taken.append(other._acquire("cat"))
+        return "ok"
+
+    assert owner.do("cat", generate) == "ok"
+    assert taken == [False] * 5
+    assert distributed[singleflight.LOCK_COLLECTION].find_one({"_id": "cat"}) is None
+
+
+def test_release_keeps_lock_taken_over_by_another_process(distributed):
+    first = singleflight.SingleFlight()
+    second = singleflight.SingleFlight()
+    assert first._acquire("cat")
+    distributed[singleflight.LOCK_COLLECTION].update_one(
+        {"_id": "cat"}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+    assert second._acquire("cat")
+    first._release("cat")
+    assert not first._renew("cat")
+    assert distributed[singleflight.LOCK_COLLECTION].find_one({"_id": "cat"})["owner"] == second.owner
@@ -0,0 +1,124 @@
+# tests/test_urls.py
+from urllib.parse import quote
+
+import pytest
+
+import urls
+from storage import LocalStorage
+
+KOREAN_KEY = "generated/고양이 사진/0123abcd.png"
+
+
+class FakePresignClient:
+    """boto3 generate_presigned_url 대역: S3처럼 키를 퍼센트 인코딩한 URL을 돌려줍니다."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.calls = 0
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        self.calls += 1
+        return f"{self.base_url}{quote(Params['Key'], safe='/')}?X-Amz-Expires={ExpiresIn}&X-Amz-Signature=abc"
+
+
+class FakeS3Store:
+    base_url = "https://bucket.s3.ap-northeast-2.amazonaws.com/"
+    bucket = "bucket"
+
+    def __init__(self):
+        self.client = FakePresignClient(self.base_url)
+
+    def url(self, key):
+        return self.base_url + quote(key, safe="/")
+
+
+def test_round_trip_non_ascii_key_hmac(tmp_path):
+    store = LocalStorage(str(tmp_path))
+    signer = urls.UrlSigner(urls._hmac_sign_fn("secret"), ttl=60)
+    builder = urls.UrlBuilder(store, cdn_origin="https://cdn.example.com", version="3", signer=signer)
+
+    url = builder.build(KOREAN_KEY)
+    assert "고양이" not in url
+    assert builder.key_from_url(url) == KOREAN_KEY
+    # 다시 만들어도 이중 인코딩되지 않습니다.
+    assert builder.refresh_quiz_sets([{"images": [url], "correctAnswer": 0}])[0]["images"][0] == url
+
+
+def test_round_trip_non_ascii_key_s3_presigned():
+    store = FakeS3Store()
+    signer = urls.UrlSigner(urls._s3_sign_fn(store), ttl=60)
+    builder = urls.UrlBuilder(store, signer=signer, presigned=True)
+
+    url = builder.build(KOREAN_KEY)
+    assert url.startswith(store.base_url)
+    assert builder.key_from_url(url) == KOREAN_KEY
+    assert builder.refresh_quiz_sets([{"images": [url], "correctAnswer": 0}])[0]["images"][0] == url
+
+
+@pytest.mark.parametrize("url", ["https://pixabay.com/get/generated/a.png", "https://cdn.other.com/x.png"])
+def test_key_from_url_ignores_external_images(tmp_path, url):
+    builder = urls.UrlBuilder(LocalStorage(str(tmp_path)), cdn_origin="https://cdn.example.com")
+    assert builder.key_from_url(url) is None
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock(1_000_000.0)
+    monkeypatch.setattr(urls.time, "time", fake.time)
+    return fake
+
+
+def counting_sign_fn(calls):
+    def sign(url, key, expires):
+        calls.append((key, expires))
+        return f"{url}?expires={expires}"
+    return sign
+
+
+def test_signer_reuses_url_within_ttl_window(clock):
+    calls = []
+    signer = urls.UrlSigner(counting_sign_fn(calls), ttl=60)
+    first = signer.sign("a", "/a")
+    expires = calls[0][1]
+    # 만료 시각은 구간 끝 + ttl이라 발급 시점의 남은 시간은 ttl~2*ttl입니다.
+    assert 60 <= expires - clock.now <= 120
+
+    clock.now = expires - 60  # 남은 시간이 정확히 ttl이면 아직 재사용
+    assert signer.sign("a", "/a") == first
+    assert len(calls) == 1
+
+    clock.now += 1
+    second = signer.sign("a", "/a")
+    assert second != first and len(calls) == 2
+    assert calls[1][1] - clock.now >= 60
+
+
+def test_signer_evicts_least_recently_used(clock):
+    calls = []
+    signer = urls.UrlSigner(counting_sign_fn(calls), ttl=60, max_entries=2)
+    signer.sign_many([("a", "/a"), ("b", "/b")])
+    signer.sign("a", "/a")  # a를 최근 사용으로
+    signer.sign("c", "/c")  # b가 밀려남
+    assert len(calls) == 3
+    signer.sign("a", "/a")
+    assert len(calls) == 3
+    signer.sign("b", "/b")
+    assert len(calls) == 4
+
+
+def test_hmac_signed_url_verifies_until_expiry(clock):
+    builder = urls.UrlBuilder(FakeS3Store(), signer=urls.UrlSigner(urls._hmac_sign_fn("secret"), ttl=60))
+    parts = urls.urlsplit(builder.build("generated/cat/a.png"))
+    params = dict(p.split("=", 1) for p in parts.query.split("&"))
+    expires = int(params["expires"])
+    assert urls.verify("secret", parts.path, expires, params["sig"], now=clock.now)
+    assert not urls.verify("other", parts.path, expires, params["sig"], now=clock.now)
+    assert not urls.verify("secret", parts.path, expires, params["sig"], now=expires + 1)
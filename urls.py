@@ -0,0 +1,219 @@
+# urls.py
+"""
+이미지 URL 생성.
+
+응답에 들어가는 생성 이미지 URL은 모두 `build()` / `build_many()`를 거칩니다.
+- 팩 파일(PACKS_ENABLED)에 있는 키는 팩 서빙 URL, 아니면 저장소 URL (storage.url)
+- IMAGE_CDN_ORIGIN이 있으면 URL의 호스트를 CDN으로 바꿉니다 (경로는 그대로).
+  버킷/앱 앞에 CDN을 두어도 템플릿이나 저장된 키를 바꿀 필요가 없습니다.
+- IMAGE_URL_VERSION이 있으면 `?v=` 토큰을 붙여, 값을 바꾸는 것만으로 CDN/브라우저 캐시를 한꺼번에 무효화합니다.
+- IMAGE_URL_SIGNING이 'hmac'이면 만료 시각과 HMAC 서명(`expires`, `sig`)을 붙이고(엣지에서 같은 비밀키로 verify),
+  's3'면 S3 presigned URL을 씁니다 (이 경우 CDN 호스트 변경은 적용하지 않음).
+  서명은 키별로 캐시하며, 남은 유효 시간이 IMAGE_URL_TTL 이상인 URL은 다시 서명하지 않습니다.
+  만료 시각을 TTL 단위 구간에 맞추므로 같은 구간 안에서는 모든 사용자가 같은 URL을 받아 CDN 캐시도 공유됩니다.
+"""
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlencode, urlsplit
+
+import metrics
+import packfile
+import storage
+from config import Config
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}" if parts.netloc else ""
+
+
+def _with_query(url: str, params: Dict[str, str]) -> str:
+    if not params:
+        return url
+    return url + ("&" if "?" in url else "?") + urlencode(params)
+
+
+class UrlSigner:
+    """
+    키별 서명 URL 캐시 (LRU, 최대 max_entries개).
+    - sign_fn(url, key, expires) -> 서명된 URL
+    - 만료 시각은 ttl 단위 구간 끝 + ttl이라 발급 시점의 남은 유효 시간은 ttl~2*ttl입니다.
+      남은 시간이 ttl 이상인 동안(= 같은 구간 안)은 캐시된 URL을 그대로 돌려줍니다.
+    """
+
+    def __init__(self, sign_fn, ttl: int = 3600, max_entries: int = 10000):
+        self.sign_fn = sign_fn
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expires(self, now: float) -> int:
+        return (int(now // self.ttl) + 2) * self.ttl
+
+    def sign_many(self, items: List[Tuple[str, str]]) -> List[str]:
+        """[(key, unsigned_url), ...]를 한 번에 서명합니다. 아직 유효한 캐시 항목은 재사용합니다."""
+        now = time.time()
+        results: List[Optional[str]] = [None] * len(items)
+        misses = []
+        with self._lock:
+            for i, (key, url) in enumerate(items):
+                cached = self._cache.get(url)
+                if cached is not None and cached[1] - now >= self.ttl:
+                    self._cache.move_to_end(url)
+                    results[i] = cached[0]
+                else:
+                    misses.append(i)
+        metrics.incr("urls.sign_hit", len(items) - len(misses))
+        if not misses:
+            return results
+
+        # 서명(HMAC/presign)은 락 밖에서 계산합니다.
+        expires = self._expires(now)
+        signed = {}
+        for i in misses:
+            key, url = items[i]
+            if url not in signed:
+                signed[url] = self.sign_fn(url, key, expires)
+            results[i] = signed[url]
+        metrics.incr("urls.sign_miss", len(signed))
+
+        with self._lock:
+            for url, signed_url in signed.items():
+                self._cache[url] = (signed_url, expires)
+                self._cache.move_to_end(url)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return results
+
+    def sign(self, key: str, url: str) -> str:
+        return self.sign_many([(key, url)])[0]
+
+
+def hmac_signature(secret: str, path: str, expires: int) -> str:
+    """'{path}:{expires}'의 HMAC-SHA256 (URL-safe base64, 패딩 없음)."""
+    digest = hmac.new(secret.encode("utf-8"), f"{path}:{expires}".encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def verify(secret: str, path: str, expires: int, signature: str, now: Optional[float] = None) -> bool:
+    """hmac 방식 서명 URL 검증 (엣지/프록시 구현 참고용)."""
+    if expires < (now if now is not None else time.time()):
+        return False
+    return hmac.compare_digest(hmac_signature(secret, path, expires), signature)
+
+
+def _hmac_sign_fn(secret: str):
+    def sign(url: str, key: str, expires: int) -> str:
+        return _with_query(url, {"expires": str(expires), "sig": hmac_signature(secret, urlsplit(url).path, expires)})
+    return sign
+
+
+def _s3_sign_fn(store: "storage.S3Storage"):
+    def sign(url: str, key: str, expires: int) -> str:
+        return store.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": store.bucket, "Key": key},
+            ExpiresIn=max(int(expires - time.time()), 1),
+        )
+    return sign
+
+
+class UrlBuilder:
+    """저장소 키 -> 응답에 넣을 이미지 URL."""
+
+    def __init__(self, store: "storage.Storage", cdn_origin: str = "", version: str = "",
+                 signer: Optional[UrlSigner] = None, presigned: bool = False):
+        self.store = store
+        self.cdn_origin = cdn_origin.rstrip("/")
+        self.version = version
+        self.signer = signer
+        # S3 presigned URL은 서명에 버킷 호스트가 들어가므로 CDN/버전 토큰을 붙이지 않습니다.
+        self.presigned = presigned
+
+    def _raw(self, key: str) -> str:
+        url = packfile.url_for(key) or self.store.url(key)
+        if self.presigned:
+            return url
+        if self.cdn_origin:
+            url = self.cdn_origin + urlsplit(url).path
+        return _with_query(url, {"v": self.version} if self.version else {})
+
+    def build_many(self, keys: Iterable[str]) -> List[str]:
+        keys = list(keys)
+        raw = [self._raw(key) for key in keys]
+        if self.signer is None:
+            return raw
+        return self.signer.sign_many(list(zip(keys, raw)))
+
+    def build(self, key: str) -> str:
+        return self.build_many([key])[0]
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        """
+        이 빌더(또는 예전 설정)가 만든 URL을 저장소 키로 되돌립니다. 외부 이미지(Pixabay 등)면 None.
+        쿼리(버전 토큰/서명)는 무시하고, 퍼센트 인코딩된 경로(한글/공백 키)는 디코딩합니다.
+        """
+        origin = _origin(url)
+        if origin and origin not in {_origin(self.store.url("")), self.cdn_origin}:
+            return None
+        path = unquote(urlsplit(url).path)
+        for base in (urlsplit(Config.PACK_URL).path, urlsplit(self.store.url("")).path):
+            if base and path.startswith(base):
+                return path[len(base):] or None
+        return None
+
+    def refresh_quiz_sets(self, quiz_sets: List[Dict]) -> List[Dict]:
+        """
+        저장된 quizSets(퀴즈 풀, 진행 중 게임)의 생성 이미지 URL을 지금 설정으로 다시 만듭니다.
+        서명 만료/CDN 변경 후에도 이어서 쓸 수 있으며, 정답 위치(correctAnswer)는 바뀌지 않습니다.
+        """
+        positions, keys = [], []
+        for qi, question in enumerate(quiz_sets or []):
+            for ii, url in enumerate(question.get("images") or []):
+                key = self.key_from_url(url)
+                if key:
+                    positions.append((qi, ii))
+                    keys.append(key)
+        for (qi, ii), url in zip(positions, self.build_many(keys)):
+            quiz_sets[qi]["images"][ii] = url
+        return quiz_sets
+
+
+_builder: Optional[UrlBuilder] = None
+_builder_lock = threading.Lock()
+
+
+def get_builder() -> UrlBuilder:
+    """설정(IMAGE_CDN_ORIGIN, IMAGE_URL_VERSION, IMAGE_URL_SIGNING)에 맞는 프로세스 공용 URL 빌더."""
+    global _builder
+    with _builder_lock:
+        if _builder is None:
+            store = storage.get_storage()
+            mode = Config.IMAGE_URL_SIGNING
+            signer = None
+            if mode == "hmac":
+                if not Config.IMAGE_URL_SIGNING_SECRET:
+                    raise RuntimeError("IMAGE_URL_SIGNING=hmac 에는 IMAGE_URL_SIGNING_SECRET이 필요합니다.")
+                signer = UrlSigner(_hmac_sign_fn(Config.IMAGE_URL_SIGNING_SECRET),
+                                   Config.IMAGE_URL_TTL, Config.IMAGE_URL_SIGNER_CACHE)
+            elif mode == "s3":
+                if not isinstance(store, storage.S3Storage):
+                    raise RuntimeError("IMAGE_URL_SIGNING=s3 는 S3 저장소에서만 사용할 수 있습니다.")
+                signer = UrlSigner(_s3_sign_fn(store), Config.IMAGE_URL_TTL, Config.IMAGE_URL_SIGNER_CACHE)
+            _builder = UrlBuilder(store, Config.IMAGE_CDN_ORIGIN, Config.IMAGE_URL_VERSION,
+                                  signer=signer, presigned=(mode == "s3"))
+        return _builder
+
+
+def build(key: str) -> str:
+    return get_builder().build(key)
+
+
+def build_many(keys: Iterable[str]) -> List[str]:
+    return get_builder().build_many(keys)
@@ -0,0 +1,90 @@
+# variants.py
+"""
+생성 이미지의 크기별 변형본(variant).
+
+원본(Gemini PNG)은 그대로 두고, 너비 320/640/1024px의 WebP(또는 AVIF) 변형본을 만들어
+`variants/{category}/{원본 파일명}.w{width}.{ext}` 키로 업로드한 뒤 카탈로그 문서의 `variants`에 기록합니다.
+prepare_game은 난이도별 그리드 크기에 맞는 너비의 변형본 URL을 돌려줍니다 (없으면 원본).
+
+디코딩/리사이즈/인코딩은 CPU 작업이라 GIL 경합을 피하도록 image_service의 프로세스 풀에서 실행합니다.
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from PIL import features
+
+import catalog
+import image_service
+import image_utils
+import metrics
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+VARIANT_BASE_PATH = "variants"
+
+
+def parse_widths(spec: str) -> Tuple[int, ...]:
+    """'320,640,1024' -> (320, 640, 1024)"""
+    return tuple(sorted(int(w) for w in spec.split(",") if w.strip()))
+
+
+def parse_difficulty_widths(spec: str) -> Dict[str, int]:
+    """'easy=1024,hard=640' -> {'easy': 1024, 'hard': 640}"""
+    widths = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        difficulty, _, width = item.partition("=")
+        widths[difficulty.strip()] = int(width)
+    return widths
+
+
+def variant_format() -> str:
+    """설정된 변형본 포맷. AVIF 인코더가 없는 Pillow라면 WebP로 대체합니다."""
+    fmt = Config.VARIANT_FORMAT.lower()
+    if fmt == "avif" and not features.check("avif"):
+        return "webp"
+    return fmt
+
+
+def variant_key(key: str, width: int, fmt: str) -> str:
+    """generated/cat/a-1.png -> variants/cat/a-1.w640.webp"""
+    _, _, rest = key.partition("/")
+    stem = rest.rsplit(".", 1)[0]
+    return f"{VARIANT_BASE_PATH}/{stem}.w{width}.{image_utils.EXTENSIONS[fmt]}"
+
+
+def create_variants(store, key: str, data: image_utils.BufferLike) -> Dict[str, str]:
+    """
+    원본 key의 변형본을 인코딩(image_service 프로세스 풀) -> 저장소에 업로드 -> 카탈로그 기록합니다.
+    - store: storage.Storage (S3 또는 로컬)
+    반환: {str(width): variant_key}
+    """
+    fmt = variant_format()
+    widths = parse_widths(Config.VARIANT_WIDTHS)
+    with metrics.timer("variants.encode_ms"):
+        encoded = image_service.get_service().variants(data, widths, fmt, Config.VARIANT_QUALITY)
+
+    variants: Dict[str, str] = {}
+    for width, payload in encoded:
+        vkey = variant_key(key, width, fmt)
+        store.put(vkey, payload, content_type=image_utils.CONTENT_TYPES[fmt], cache_control=Config.IMAGE_CACHE_CONTROL)
+        variants[str(width)] = vkey
+        metrics.observe("variants.bytes", len(payload))
+    if variants:
+        catalog.record_variants(key, variants)
+    metrics.incr("variants.created", len(variants))
+    return variants
+
+
+def pick_width(difficulty: str) -> Optional[int]:
+    """난이도(그리드 크기)에 맞는 변형본 너비. 설정이 없으면 None(원본 사용)."""
+    return parse_difficulty_widths(Config.VARIANT_WIDTH_BY_DIFFICULTY).get(difficulty)
+
+
+def resolve_keys(keys: List[str], difficulty: str) -> List[str]:
+    """원본 키 목록을 난이도에 맞는 변형본 키로 바꿉니다. 변형본이 없는 키는 원본을 그대로 씁니다."""
+    width = pick_width(difficulty)
+    if width is None or not keys:
+        return list(keys)
+    mapping = catalog.variant_keys(keys, width)
+    return [mapping.get(key, key) for key in keys]